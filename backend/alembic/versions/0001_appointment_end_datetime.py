@@ -0,0 +1,148 @@
+"""Store appointment end time and forbid overlapping active appointments
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Adds appointments.end_datetime, backfilled from each appointment's treatment
+duration. On PostgreSQL active appointments of a dentist are kept disjoint by
+a GiST exclusion constraint; on SQLite the same rule is enforced by triggers.
+
+The overlap check used so far measured existing appointments with the new
+treatment's duration, so a database can already hold double bookings. Before
+the rule is enforced, the later booking of every overlapping pair is
+cancelled and logged so the clinic can rebook it.
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OVERLAP_CONSTRAINT = "appointments_no_overlap"
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+appointments = sa.table(
+    "appointments",
+    sa.column("id", sa.Integer()),
+    sa.column("dentist_id", sa.Integer()),
+    sa.column("datetime", sa.DateTime()),
+    sa.column("end_datetime", sa.DateTime()),
+    sa.column("status", sa.String()),
+)
+
+SQLITE_OVERLAP_CHECK = f"""
+    SELECT RAISE(ABORT, '{OVERLAP_CONSTRAINT}')
+    WHERE EXISTS (
+        SELECT 1 FROM appointments
+        WHERE dentist_id = NEW.dentist_id
+          AND id IS NOT NEW.id
+          AND status IN ('SCHEDULED', 'CONFIRMED')
+          AND datetime < NEW.end_datetime
+          AND end_datetime > NEW.datetime
+    );
+"""
+
+
+def cancel_overlapping_appointments(connection: sa.Connection) -> None:
+    """
+    Cancel active appointments that overlap an earlier one of the same dentist.
+
+    Appointments are swept per dentist in start order; the first of each
+    overlapping run is kept and every appointment starting before the kept one
+    ends is cancelled and logged.
+    """
+    rows = connection.execute(
+        sa.select(appointments.c.id, appointments.c.dentist_id, appointments.c.datetime, appointments.c.end_datetime)
+        .where(appointments.c.status.in_(("SCHEDULED", "CONFIRMED")))
+        .order_by(appointments.c.dentist_id, appointments.c.datetime, appointments.c.id)
+    ).all()
+
+    cancelled = []
+    kept = None
+    for row in rows:
+        if kept is not None and row.dentist_id == kept.dentist_id and row.datetime < kept.end_datetime:
+            logger.warning(
+                "Cancelling appointment %s of dentist %s at %s: it overlaps appointment %s at %s",
+                row.id, row.dentist_id, row.datetime, kept.id, kept.datetime
+            )
+            cancelled.append(row.id)
+        else:
+            kept = row
+
+    for offset in range(0, len(cancelled), 500):
+        connection.execute(
+            appointments.update()
+            .where(appointments.c.id.in_(cancelled[offset:offset + 500]))
+            .values(status="CANCELLED")
+        )
+    if cancelled:
+        logger.warning("Cancelled %d overlapping appointments", len(cancelled))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    op.add_column("appointments", sa.Column("end_datetime", sa.DateTime(), nullable=True))
+
+    if dialect == "postgresql":
+        op.execute(
+            "UPDATE appointments AS a "
+            "SET end_datetime = a.datetime + t.duration_minutes * interval '1 minute' "
+            "FROM treatments AS t WHERE t.id = a.treatment_id"
+        )
+    else:
+        # Keep SQLAlchemy's "YYYY-MM-DD HH:MM:SS.ffffff" storage format
+        op.execute(
+            "UPDATE appointments SET end_datetime = "
+            "strftime('%Y-%m-%d %H:%M:%S', datetime, '+' || ("
+            "SELECT duration_minutes FROM treatments WHERE treatments.id = appointments.treatment_id"
+            ") || ' minutes') || substr(datetime, 20)"
+        )
+
+    with op.batch_alter_table("appointments") as batch_op:
+        batch_op.alter_column("end_datetime", existing_type=sa.DateTime(), nullable=False)
+
+    cancel_overlapping_appointments(op.get_bind())
+
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        op.execute(
+            f"ALTER TABLE appointments ADD CONSTRAINT {OVERLAP_CONSTRAINT} "
+            "EXCLUDE USING gist (dentist_id WITH =, tsrange(datetime, end_datetime, '[)') WITH &&) "
+            "WHERE (status IN ('SCHEDULED', 'CONFIRMED'))"
+        )
+    elif dialect == "sqlite":
+        for suffix, trigger_event in (
+            ("insert", "INSERT"),
+            ("update", "UPDATE OF datetime, end_datetime, status, dentist_id"),
+        ):
+            op.execute(
+                f"CREATE TRIGGER {OVERLAP_CONSTRAINT}_{suffix} "
+                f"BEFORE {trigger_event} ON appointments "
+                f"WHEN NEW.status IN ('SCHEDULED', 'CONFIRMED') "
+                f"BEGIN {SQLITE_OVERLAP_CHECK} END"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute(f"ALTER TABLE appointments DROP CONSTRAINT IF EXISTS {OVERLAP_CONSTRAINT}")
+    elif dialect == "sqlite":
+        op.execute(f"DROP TRIGGER IF EXISTS {OVERLAP_CONSTRAINT}_insert")
+        op.execute(f"DROP TRIGGER IF EXISTS {OVERLAP_CONSTRAINT}_update")
+
+    with op.batch_alter_table("appointments") as batch_op:
+        batch_op.drop_column("end_datetime")
@@ -0,0 +1,34 @@
+"""Track a schedule version per dentist
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+Adds dentists.schedule_version, bumped in the same transaction as every change
+to a dentist's appointments. The schedule endpoint serves it as an ETag.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "dentists",
+        sa.Column("schedule_version", sa.Integer(), nullable=False, server_default="0")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("dentists") as batch_op:
+        batch_op.drop_column("schedule_version")
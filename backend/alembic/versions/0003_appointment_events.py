@@ -0,0 +1,60 @@
+"""Record appointment history in an append-only event table
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+Adds appointment_events. Status changes and their notes are inserted there
+instead of being appended to appointments.notes. Existing notes are left as
+they are.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATUSES = ("SCHEDULED", "CONFIRMED", "COMPLETED", "CANCELLED", "NO_SHOW")
+EVENT_TYPES = ("CREATED", "STATUS_CHANGED", "NOTE")
+
+
+def status_type() -> sa.types.TypeEngine:
+    # The appointmentstatus type already exists on PostgreSQL
+    return sa.Enum(*STATUSES, name="appointmentstatus").with_variant(
+        postgresql.ENUM(*STATUSES, name="appointmentstatus", create_type=False), "postgresql"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "appointment_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("appointment_id", sa.Integer(), sa.ForeignKey("appointments.id"), nullable=False),
+        sa.Column("event_type", sa.Enum(*EVENT_TYPES, name="appointmenteventtype"), nullable=False),
+        sa.Column("from_status", status_type()),
+        sa.Column("to_status", status_type()),
+        sa.Column("note", sa.Text()),
+        sa.Column("actor_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        "ix_appointment_events_appointment_id_id",
+        "appointment_events",
+        ["appointment_id", "id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_appointment_events_appointment_id_id", table_name="appointment_events")
+    op.drop_table("appointment_events")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TYPE IF EXISTS appointmenteventtype")
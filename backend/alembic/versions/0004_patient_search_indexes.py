@@ -0,0 +1,80 @@
+"""Index patient search
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+Adds users.phone_digits, the phone number reduced to digits, with a btree
+index for exact and prefix matches. On PostgreSQL names and emails get
+pg_trgm GIN indexes; on SQLite they are indexed by an FTS5 trigram table kept
+in sync by triggers.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+USER_SEARCH_FTS = "users_fts"
+
+SQLITE_SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE {USER_SEARCH_FTS} USING fts5("
+    f"full_name, email, content='users', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER {USER_SEARCH_FTS}_insert AFTER INSERT ON users BEGIN "
+    f"INSERT INTO {USER_SEARCH_FTS}(rowid, full_name, email) VALUES (NEW.id, NEW.full_name, NEW.email); END",
+    f"CREATE TRIGGER {USER_SEARCH_FTS}_delete AFTER DELETE ON users BEGIN "
+    f"INSERT INTO {USER_SEARCH_FTS}({USER_SEARCH_FTS}, rowid, full_name, email) "
+    f"VALUES ('delete', OLD.id, OLD.full_name, OLD.email); END",
+    f"CREATE TRIGGER {USER_SEARCH_FTS}_update AFTER UPDATE OF full_name, email ON users BEGIN "
+    f"INSERT INTO {USER_SEARCH_FTS}({USER_SEARCH_FTS}, rowid, full_name, email) "
+    f"VALUES ('delete', OLD.id, OLD.full_name, OLD.email); "
+    f"INSERT INTO {USER_SEARCH_FTS}(rowid, full_name, email) VALUES (NEW.id, NEW.full_name, NEW.email); END",
+    # Index the rows that already exist
+    f"INSERT INTO {USER_SEARCH_FTS}({USER_SEARCH_FTS}) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    op.add_column("users", sa.Column("phone_digits", sa.String(), nullable=True))
+    if dialect == "postgresql":
+        op.execute("UPDATE users SET phone_digits = NULLIF(regexp_replace(phone_number, '\\D', '', 'g'), '')")
+    else:
+        digits = "phone_number"
+        for char in (" ", "-", "(", ")", "+", "."):
+            digits = f"replace({digits}, '{char}', '')"
+        op.execute(f"UPDATE users SET phone_digits = NULLIF({digits}, '')")
+    op.create_index("ix_users_phone_digits", "users", ["phone_digits"])
+
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_users_full_name_trgm ON users USING gin (full_name gin_trgm_ops)")
+        op.execute("CREATE INDEX ix_users_email_trgm ON users USING gin (email gin_trgm_ops)")
+    elif dialect == "sqlite":
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_users_email_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_users_full_name_trgm")
+    elif dialect == "sqlite":
+        for suffix in ("insert", "delete", "update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {USER_SEARCH_FTS}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {USER_SEARCH_FTS}")
+
+    op.drop_index("ix_users_phone_digits", table_name="users")
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("phone_digits")
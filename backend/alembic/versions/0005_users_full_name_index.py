@@ -0,0 +1,29 @@
+"""Index users by name for keyset listings
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+Patient listings are paged by (full_name, patient id); an index on
+users (full_name, id) lets each page start with an index seek.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_users_full_name_id", "users", ["full_name", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_full_name_id", table_name="users")
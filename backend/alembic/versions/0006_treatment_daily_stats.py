@@ -0,0 +1,47 @@
+"""Roll up completed treatments per day
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+Adds treatment_daily_stats, the count and revenue of completed appointments
+per (day, treatment, dentist), and fills it from the existing appointments.
+From then on the appointment service keeps it current on status changes;
+scripts/backfill_treatment_stats.py rebuilds it if needed.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "treatment_daily_stats",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("treatment_id", sa.Integer(), sa.ForeignKey("treatments.id"), primary_key=True),
+        sa.Column("dentist_id", sa.Integer(), sa.ForeignKey("dentists.id"), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+    )
+    day = "date(a.datetime)" if op.get_bind().dialect.name == "sqlite" else "CAST(a.datetime AS DATE)"
+    op.execute(
+        "INSERT INTO treatment_daily_stats (day, treatment_id, dentist_id, count, revenue) "
+        f"SELECT {day}, a.treatment_id, a.dentist_id, count(*), sum(t.price) "
+        "FROM appointments a JOIN treatments t ON a.treatment_id = t.id "
+        "WHERE a.status = 'COMPLETED' "
+        f"GROUP BY {day}, a.treatment_id, a.dentist_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("treatment_daily_stats")
@@ -0,0 +1,36 @@
+"""Version counters for cached catalogs
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+
+Adds catalog_versions with a row for the treatment catalog. Every change to
+a treatment increments it, and workers reload their cached catalog when it
+moves.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    catalog_versions = op.create_table(
+        "catalog_versions",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+    )
+    op.bulk_insert(catalog_versions, [{"name": "treatments", "version": 0}])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("catalog_versions")
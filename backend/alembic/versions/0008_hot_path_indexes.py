@@ -0,0 +1,61 @@
+"""Index the hot appointment and schedule query paths
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+
+Adds indexes matched to the service queries:
+
+- appointments (dentist_id, datetime, id) for active appointments only:
+  conflict checks, schedule pages and availability
+- appointments (dentist_id, datetime): utilization reports and exports
+- appointments (patient_id, status, datetime): treatment history and charts
+- appointments (status, datetime): clinic-wide exports, statistics
+  backfills and status sweeps
+- dentist_schedules (dentist_id, day_of_week): working windows
+
+On PostgreSQL the indexes are built CONCURRENTLY so bookings are not blocked
+while they build.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_PREDICATE = sa.text("status IN ('SCHEDULED', 'CONFIRMED')")
+
+INDEXES = [
+    ("ix_appointments_dentist_active", "appointments", ["dentist_id", "datetime", "id"], ACTIVE_PREDICATE),
+    ("ix_appointments_dentist_datetime", "appointments", ["dentist_id", "datetime"], None),
+    ("ix_appointments_patient_status_datetime", "appointments", ["patient_id", "status", "datetime"], None),
+    ("ix_appointments_status_datetime", "appointments", ["status", "datetime"], None),
+    ("ix_dentist_schedules_dentist_day", "dentist_schedules", ["dentist_id", "day_of_week"], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_where=where, sqlite_where=where,
+                postgresql_concurrently=concurrently
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=concurrently)
@@ -0,0 +1,39 @@
+"""Record the price of completed appointments
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+
+Adds appointments.completed_price, the treatment price when an appointment
+moved into COMPLETED, and fills it for completed appointments from today's
+prices, which is what the rollup counted for them. Reversing a completion
+subtracts this price from treatment_daily_stats instead of the treatment's
+current one.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, Sequence[str], None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("appointments", sa.Column("completed_price", sa.Float()))
+    op.execute(
+        "UPDATE appointments SET completed_price = "
+        "(SELECT t.price FROM treatments t WHERE t.id = appointments.treatment_id) "
+        "WHERE status = 'COMPLETED'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("appointments") as batch_op:
+        batch_op.drop_column("completed_price")
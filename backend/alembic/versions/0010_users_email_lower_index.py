@@ -0,0 +1,40 @@
+"""Index users by lowercased email
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+
+The patient import lowercases incoming emails and rejects those already
+registered in any letter case, comparing lower(email). An expression index
+on lower(email) lets each chunk's lookup seek instead of scanning users. On
+PostgreSQL it is built CONCURRENTLY so sign-ups are not blocked meanwhile.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, Sequence[str], None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_email_lower", "users", [sa.text("lower(email)")],
+            postgresql_concurrently=concurrently
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_users_email_lower", table_name="users", postgresql_concurrently=concurrently)
@@ -3,31 +3,64 @@ Appointment management API endpoints.
 These routes handle all appointment-related operations in the dental clinic system.
 """
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from datetime import datetime
+from typing import AsyncContextManager, AsyncIterator, Callable, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime
 
-from app.core.dependencies import get_db, get_current_user
+from app.core.dependencies import get_async_db, get_async_read_db, get_async_read_sessions, require_permissions
 from app.schemas.appointment import (
     AppointmentCreate,
     AppointmentUpdate,
-    AppointmentResponse
+    AppointmentResponse,
+    AppointmentEventResponse,
+    AvailableSlot,
+    BulkBookingResult,
+    ScheduleEntryResponse,
+    StatusTransitionRequest,
+    StatusTransitionResult
 )
-from app.services.appointment_service import AppointmentSystem
-from app.models.appointments import AppointmentStatus
+from app.services.appointment_service import AsyncAppointmentSystem
+from app.services.schedule_cache import (
+    CachedSchedule,
+    etag_matches,
+    schedule_cache,
+    schedule_etag,
+    window_key
+)
+from app.models.appointments import Appointment, AppointmentStatus
 
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 
+schedule_adapter = TypeAdapter(List[ScheduleEntryResponse])
+
+async def _schedule_lines(
+    open_session: Callable[[], AsyncContextManager[AsyncSession]],
+    dentist_id: int,
+    start_date: datetime,
+    end_date: datetime
+) -> AsyncIterator[str]:
+    """NDJSON lines of a schedule, read on a session owned by the stream since it outlives the request."""
+    async with open_session() as db:
+        async for row in AsyncAppointmentSystem.stream_dentist_schedule(
+            db=db,
+            dentist_id=dentist_id,
+            start_date=start_date,
+            end_date=end_date
+        ):
+            yield ScheduleEntryResponse.model_validate(dict(row)).model_dump_json() + "\n"
+
 @router.post("/", response_model=AppointmentResponse)
-def create_appointment(
+async def create_appointment(
     appointment: AppointmentCreate,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_permissions("appointments:write"))
 ):
     """Create a new appointment."""
     try:
-        return AppointmentSystem.schedule_appointment(
+        return await AsyncAppointmentSystem.schedule_appointment(
             db=db,
             patient_id=appointment.patient_id,
             dentist_id=appointment.dentist_id,
@@ -39,49 +72,172 @@ def create_appointment(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/bulk", response_model=List[BulkBookingResult])
+async def create_appointments_bulk(
+    appointments: List[AppointmentCreate],
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_permissions("appointments:write"))
+):
+    """Create many appointments in one transaction, reporting the outcome of each."""
+    return await AsyncAppointmentSystem.schedule_appointments_bulk(
+        db=db,
+        bookings=[appointment.model_dump() for appointment in appointments],
+        created_by_id=current_user.id
+    )
+
+@router.post("/status-transitions", response_model=StatusTransitionResult)
+async def transition_statuses(
+    transition: StatusTransitionRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_permissions("appointments:write"))
+):
+    """Move all matching appointments to a new status in one statement, e.g. at close of day."""
+    try:
+        appointment_ids = await AsyncAppointmentSystem.transition_statuses(
+            db=db, **transition.model_dump(), actor_id=current_user.id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StatusTransitionResult(new_status=transition.new_status, appointment_ids=appointment_ids)
+
+@router.get("/available-slots", response_model=List[AvailableSlot])
+async def find_available_slots(
+    treatment_id: int,
+    start_date: date,
+    end_date: date,
+    dentist_ids: List[int] = Query(...),
+    step_minutes: int = 15,
+    db: AsyncSession = Depends(get_async_db),
+    _current_user = Depends(require_permissions("appointments:read"))
+):
+    """Find free slots for a treatment across dentists and days."""
+    try:
+        return await AsyncAppointmentSystem.find_available_slots(
+            db=db,
+            dentist_ids=dentist_ids,
+            treatment_id=treatment_id,
+            date_range=(start_date, end_date),
+            step_minutes=step_minutes
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/{appointment_id}", response_model=AppointmentResponse)
-def get_appointment(
+async def get_appointment(
     appointment_id: int,
-    db: Session = Depends(get_db),
-    _current_user = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    _current_user = Depends(require_permissions("appointments:read"))
 ):
     """Get appointment details by ID."""
-    appointment = db.query(Appointment).filter(
-        Appointment.id == appointment_id
-    ).first()
+    appointment = await db.get(Appointment, appointment_id)
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return appointment
 
 @router.patch("/{appointment_id}/status", response_model=AppointmentResponse)
-def update_appointment_status(
+async def update_appointment_status(
     appointment_id: int,
     status: AppointmentStatus,
-    db: Session = Depends(get_db),
-    _current_user = Depends(get_current_user)
+    notes: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_permissions("appointments:write"))
 ):
     """Update the status of an appointment."""
     try:
-        return AppointmentSystem.update_appointment_status(
+        return await AsyncAppointmentSystem.update_appointment_status(
             db=db,
             appointment_id=appointment_id,
-            new_status=status
+            new_status=status,
+            notes=notes,
+            actor_id=current_user.id
         )
     except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
+        status_code = 404 if str(e) == "Appointment not found" else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
 
-@router.get("/dentist/{dentist_id}/schedule", response_model=List[AppointmentResponse])
-def get_dentist_schedule(
+@router.get("/{appointment_id}/events", response_model=List[AppointmentEventResponse])
+async def get_appointment_events(
+    appointment_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+    _current_user = Depends(require_permissions("appointments:read"))
+):
+    """Page through an appointment's history; the next page's token is sent as X-Next-Cursor."""
+    try:
+        events, next_cursor = await AsyncAppointmentSystem.get_appointment_events(
+            db=db,
+            appointment_id=appointment_id,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return events
+
+@router.get("/dentist/{dentist_id}/schedule", response_model=List[ScheduleEntryResponse])
+async def get_dentist_schedule(
     dentist_id: int,
     start_date: datetime,
     end_date: datetime,
-    db: Session = Depends(get_db),
-    _current_user = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=1000),
+    stream: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_read_db),
+    open_session = Depends(get_async_read_sessions),
+    _current_user = Depends(require_permissions("appointments:read"))
 ):
-    """Get a dentist's schedule for a specific date range."""
-    return AppointmentSystem.get_dentist_schedule(
-        db=db,
-        dentist_id=dentist_id,
-        start_date=start_date,
-        end_date=end_date
-    )
\ No newline at end of file
+    """
+    Get a dentist's schedule for a specific date range.
+
+    Results are paged; when more appointments follow, the token for the next
+    page is returned in the X-Next-Cursor header. With stream=true the whole
+    range is sent as NDJSON instead, one appointment per line.
+
+    Pages carry the dentist's schedule version as ETag. A matching
+    If-None-Match is answered with 304 after reading only that version, and
+    serialized pages are reused from an in-process cache until it changes.
+    The schedule is read from a replica when one is usable, so a new booking
+    can take up to REPLICA_MAX_LAG_SECONDS to appear.
+    """
+    if stream:
+        return StreamingResponse(
+            _schedule_lines(open_session, dentist_id, start_date, end_date),
+            media_type="application/x-ndjson"
+        )
+
+    version = await AsyncAppointmentSystem.get_schedule_version(db, dentist_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Dentist not found")
+    etag = schedule_etag(dentist_id, version)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    window = window_key(start_date, end_date, cursor, limit)
+    cached = schedule_cache.get(dentist_id, version, window)
+    if cached is None:
+        try:
+            appointments, next_cursor = await AsyncAppointmentSystem.get_dentist_schedule_page(
+                db=db,
+                dentist_id=dentist_id,
+                start_date=start_date,
+                end_date=end_date,
+                cursor=cursor,
+                limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        body = schedule_adapter.dump_json(
+            schedule_adapter.validate_python(appointments, from_attributes=True)
+        )
+        cached = CachedSchedule(body, next_cursor)
+        schedule_cache.put(dentist_id, version, window, cached)
+
+    headers = {"ETag": etag}
+    if cached.next_cursor:
+        headers["X-Next-Cursor"] = cached.next_cursor
+    return Response(content=cached.body, media_type="application/json", headers=headers)
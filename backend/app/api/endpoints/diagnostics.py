@@ -0,0 +1,24 @@
+"""
+Diagnostics API endpoints.
+These routes publish connection pool, replica and cache gauges for monitoring.
+"""
+
+from fastapi import APIRouter, Depends
+
+from app.core.dependencies import require_permissions
+from app.db.base import async_engine, async_read_router, engine
+from app.db.instrumentation import pool_gauges
+from app.services.principal_cache import principal_cache
+from app.services.treatment_catalog import treatment_catalog
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"])
+
+@router.get("/database")
+async def get_database_gauges(current_user = Depends(require_permissions("diagnostics:read"))):
+    """Pool gauges per engine, replica health and treatment catalog and principal cache counters."""
+    return {
+        'pools': {'sync': pool_gauges(engine), 'async': pool_gauges(async_engine)},
+        'replicas': async_read_router.status(),
+        'treatment_catalog': treatment_catalog.stats(),
+        'principal_cache': principal_cache.stats()
+    }
@@ -0,0 +1,25 @@
+"""
+Patient management API endpoints.
+These routes handle patient-related operations in the dental clinic system.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dependencies import get_async_db, require_permissions
+from app.schemas.patient import PatientChart
+from app.services.patient_services import AsyncPatientManagement
+
+router = APIRouter(prefix="/patients", tags=["patients"])
+
+@router.get("/{patient_id}/chart", response_model=PatientChart)
+async def get_patient_chart(
+    patient_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(require_permissions("patients:read"))
+):
+    """Get a patient's chart: profile, treatments and appointments with their dentists."""
+    patient = await AsyncPatientManagement.get_patient_chart(db, patient_id)
+    if patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return PatientChart.from_patient(patient)
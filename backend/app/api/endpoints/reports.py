@@ -0,0 +1,38 @@
+"""
+Reporting API endpoints.
+These routes serve management reports for the dental clinic system.
+"""
+
+from datetime import date
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dependencies import get_async_read_db, require_permissions
+from app.schemas.report import UtilizationRow
+from app.services.utilization import compute_utilization, load_utilization_data
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+@router.get("/utilization", response_model=List[UtilizationRow])
+async def get_dentist_utilization(
+    start_date: date,
+    end_date: date,
+    period: Literal["day", "week"] = "day",
+    dentist_id: Optional[List[int]] = Query(None),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(require_permissions("reports:read"))
+):
+    """
+    Report booked, no-show and idle minutes per dentist and day or week.
+
+    Pass dentist_id several times to restrict the report to some dentists.
+    The arrays are loaded through the session and reduced in a worker thread,
+    so a large report does not stall the event loop.
+    """
+    try:
+        data = await db.run_sync(load_utilization_data, start_date, end_date, dentist_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await run_in_threadpool(compute_utilization, data, period)
@@ -0,0 +1,106 @@
+"""
+Treatment management API endpoints.
+These routes handle treatment-related operations in the dental clinic system.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Optional
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dependencies import get_async_read_sessions, require_permissions
+from app.services.treatment_service import EXPORT_COLUMNS, AsyncTreatmentManagement
+
+router = APIRouter(prefix="/treatments", tags=["treatments"])
+
+# Rows serialized per chunk written to the response
+EXPORT_CHUNK_ROWS = 500
+
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+def _export_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def _csv_chunks(rows: AsyncIterator[RowMapping]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    count = 0
+    async for row in rows:
+        writer.writerow([_export_value(row[field]) for field in EXPORT_FIELDS])
+        count += 1
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+async def _ndjson_chunks(rows: AsyncIterator[RowMapping]) -> AsyncIterator[str]:
+    lines = []
+    async for row in rows:
+        lines.append(json.dumps({field: _export_value(row[field]) for field in EXPORT_FIELDS}) + "\n")
+        if len(lines) == EXPORT_CHUNK_ROWS:
+            yield "".join(lines)
+            lines.clear()
+    yield "".join(lines)
+
+
+async def _export_chunks(
+    open_session: Callable[[], AsyncContextManager[AsyncSession]],
+    format: ExportFormat,
+    **filters: Any
+) -> AsyncIterator[str]:
+    # The body is sent after the endpoint returns, so it reads on a session of its own
+    async with open_session() as db:
+        rows = AsyncTreatmentManagement.stream_treatment_history(db=db, **filters)
+        chunks = _csv_chunks(rows) if format == ExportFormat.CSV else _ndjson_chunks(rows)
+        async for chunk in chunks:
+            yield chunk
+
+
+@router.get("/history/export")
+async def export_treatment_history(
+    format: ExportFormat = ExportFormat.NDJSON,
+    patient_id: Optional[int] = None,
+    dentist_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    open_session = Depends(get_async_read_sessions),
+    current_user = Depends(require_permissions("reports:read"))
+):
+    """
+    Export completed treatments as CSV or NDJSON, newest first.
+
+    Filter by patient for an insurance export, or leave the patient out for a
+    clinic-wide one. Rows are streamed from the database as they are written,
+    so the export size does not affect memory use.
+    """
+    chunks = _export_chunks(
+        open_session,
+        format,
+        patient_id=patient_id,
+        dentist_id=dentist_id,
+        start_date=start_date,
+        end_date=end_date
+    )
+    if format == ExportFormat.CSV:
+        return StreamingResponse(
+            chunks,
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="treatment-history.csv"'}
+        )
+    return StreamingResponse(chunks, media_type="application/x-ndjson")
@@ -0,0 +1,123 @@
+"""
+FastAPI dependencies shared by the API endpoints.
+This module provides database sessions, on a read replica for read-only routes,
+and resolves and authorizes the authenticated user.
+"""
+
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncIterator, Awaitable, Callable, Iterator
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.db.base import AsyncSessionLocal, ReadSessionLocal, SessionLocal, async_read_router
+from app.services.principal_cache import Principal, permission_mask, principal_cache, token_id
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+
+
+def get_db() -> Iterator[Session]:
+    """Provide a sync database session that is closed after the request."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Provide an async database session that is closed after the request."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db() -> Iterator[Session]:
+    """
+    Provide a sync session for read-only work, on a replica when one is usable.
+
+    Replicas may trail the primary by up to REPLICA_MAX_LAG_SECONDS, so reads
+    that must see the caller's own writes use get_db instead.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def async_read_session() -> AsyncIterator[AsyncSession]:
+    """Open an async session for read-only work, closed on leaving the block. See get_read_db."""
+    async with AsyncSessionLocal(bind=await async_read_router.read_engine()) as db:
+        yield db
+
+
+async def get_async_read_db() -> AsyncIterator[AsyncSession]:
+    """Provide an async session for read-only work. See get_read_db."""
+    async with async_read_session() as db:
+        yield db
+
+
+def get_async_read_sessions() -> Callable[[], AsyncContextManager[AsyncSession]]:
+    """
+    Provide an opener of async read sessions, for reads that outlive the endpoint.
+
+    A streamed response body is produced after the endpoint has returned, and
+    depending on the FastAPI version the request's get_async_read_db session
+    is closed by then. Streams therefore open and close their own session.
+    """
+    return async_read_session
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    Resolve the principal of the active user identified by a bearer token.
+
+    The token's "sub" claim carries the user id and its "jti" claim, if any,
+    the id the principal is cached under. A cached principal is returned
+    without touching the database.
+
+    Raises:
+        HTTPException: 401 if the token is invalid or revoked, or the user is unknown or inactive
+    """
+    credentials_error = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        user_id = int(payload["sub"])
+    except (JWTError, KeyError, ValueError):
+        raise credentials_error
+
+    principal = await principal_cache.aresolve(db, token_id(token, payload), user_id, payload.get("exp"))
+    if principal is None:
+        raise credentials_error
+    return principal
+
+
+def require_permissions(*names: str) -> Callable[..., Awaitable[Principal]]:
+    """
+    Dependency resolving the current principal if it holds every named permission.
+
+    The names are compiled into a bitset once, when the route is declared, so
+    each request costs one bit test.
+
+    Raises:
+        HTTPException: 403 if a permission is missing
+    """
+    required = permission_mask(names)
+
+    async def check_permissions(principal: Principal = Depends(get_current_user)) -> Principal:
+        if not principal.has(required):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+        return principal
+
+    return check_permissions
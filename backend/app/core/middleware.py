@@ -0,0 +1,48 @@
+"""
+ASGI middleware for the dental clinic API.
+This module tracks the database work done by each request and can expose it
+as a response header, so N+1 regressions show up in staging.
+"""
+
+import logging
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.db.instrumentation import track_queries
+
+logger = logging.getLogger(__name__)
+
+QUERY_STATS_HEADER = "X-DB-Stats"
+
+
+class QueryStatsMiddleware:
+    """
+    Collect query statistics per HTTP request.
+
+    With expose_header set, responses carry an X-DB-Stats header such as
+    "queries=3; db_ms=4.1; pool_wait_ms=0.0; slow_queries=0". The header is
+    written when the response starts, so it leaves out queries a streaming
+    response runs while sending its body; the debug log line at the end of the
+    request includes them.
+    """
+
+    def __init__(self, app: ASGIApp, expose_header: bool = False):
+        self.app = app
+        self.expose_header = expose_header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_with_stats(message: Message) -> None:
+                if self.expose_header and message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((QUERY_STATS_HEADER.lower().encode(), stats.header_value().encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_stats)
+            finally:
+                logger.debug("%s %s: %s", scope["method"], scope["path"], stats.header_value())
@@ -4,11 +4,17 @@ This module handles all configuration settings for the dental clinic system,
 including database connections, API settings, and security configurations.
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import PostgresDsn, validator
+from sqlalchemy.engine import make_url
 import secrets
 
+def to_async_url(url: str) -> str:
+    """A PostgreSQL URL with its driver switched to asyncpg."""
+    return make_url(url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
 class Settings(BaseSettings):
     # API Configuration
     API_V1_STR: str = "/api/v1"
@@ -17,6 +23,9 @@ class Settings(BaseSettings):
     # Security
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+    JWT_ALGORITHM: str = "HS256"
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0  # longest a role or account change can go unnoticed by another worker
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
     
     # Database Configuration
     POSTGRES_SERVER: str = "localhost"
@@ -40,10 +49,36 @@ class Settings(BaseSettings):
             username=values.get("POSTGRES_USER"),
             password=values.get("POSTGRES_PASSWORD"),
             host=values.get("POSTGRES_SERVER"),
-            port=values.get("POSTGRES_PORT"),
-            path=f"/{values.get('POSTGRES_DB') or ''}"
+            port=int(values.get("POSTGRES_PORT")),
+            path=values.get('POSTGRES_DB') or ''
         )
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        """DATABASE_URL with its driver switched to asyncpg."""
+        return to_async_url(str(self.DATABASE_URL))
+
+    # Read replicas for read-only work, e.g. '["postgresql://reader@replica1/dentsync"]'
+    REPLICA_DATABASE_URLS: List[str] = []
+    REPLICA_MAX_LAG_SECONDS: float = 5.0       # lagging replicas are skipped
+    REPLICA_CHECK_INTERVAL_SECONDS: float = 5.0  # how often a replica's health is re-read
+    REPLICA_CONNECT_TIMEOUT: int = 2           # seconds before an unreachable replica counts as down
+
+    @property
+    def ASYNC_REPLICA_DATABASE_URLS(self) -> List[str]:
+        """REPLICA_DATABASE_URLS with their drivers switched to asyncpg."""
+        return [to_async_url(url) for url in self.REPLICA_DATABASE_URLS]
+
+    # Connection pool, per engine: at most DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800    # seconds before a connection is replaced
+
+    # Query instrumentation
+    SLOW_QUERY_MS: float = 200.0     # statements slower than this are logged
+    QUERY_STATS_HEADER: bool = False  # add per-request query stats to responses (staging)
+
     # CORS Configuration
     BACKEND_CORS_ORIGINS: list = ["http://localhost:8000", "http://localhost:3000"]
 
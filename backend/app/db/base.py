@@ -1,21 +1,92 @@
 """
 Database configuration and session management.
-This module sets up the SQLAlchemy engine and session factory for database operations.
+This module sets up the SQLAlchemy engines and session factories for database operations.
+The sync engine serves scripts and migrations; the async engine serves the API.
+Optional replica engines take read-only work; see app.db.replicas.
 """
 
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy import create_engine
 from app.core.settings import settings
+from app.db.instrumentation import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_engine
+from app.db.replicas import AsyncReplicaRouter, ReplicaRouter
+
+# Pool sizing shared by both engines
+POOL_OPTIONS = dict(
+    pool_pre_ping=True,  # Enables connection pool "pre-ping" feature
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE
+)
 
 # Create database engine using settings
 engine = create_engine(
     str(settings.DATABASE_URL),
-    pool_pre_ping=True  # Enables connection pool "pre-ping" feature
+    poolclass=TimedQueuePool,
+    **POOL_OPTIONS
 )
+instrument_engine(engine, settings.SLOW_QUERY_MS)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Same database through asyncpg, so requests wait on Postgres without holding a thread
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    **POOL_OPTIONS
+)
+instrument_engine(async_engine, settings.SLOW_QUERY_MS)
+
+# Objects stay usable after commit; async sessions cannot lazily refresh them
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Replica engines, routed to while healthy and caught up
+replica_engines = [
+    create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        connect_args={"connect_timeout": settings.REPLICA_CONNECT_TIMEOUT},
+        **POOL_OPTIONS
+    )
+    for url in settings.REPLICA_DATABASE_URLS
+]
+async_replica_engines = [
+    create_async_engine(
+        url,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        connect_args={"timeout": settings.REPLICA_CONNECT_TIMEOUT},
+        **POOL_OPTIONS
+    )
+    for url in settings.ASYNC_REPLICA_DATABASE_URLS
+]
+for replica_engine in replica_engines + async_replica_engines:
+    instrument_engine(replica_engine, settings.SLOW_QUERY_MS)
+
+read_router = ReplicaRouter(
+    engine,
+    replica_engines,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_CHECK_INTERVAL_SECONDS
+)
+async_read_router = AsyncReplicaRouter(
+    async_engine,
+    async_replica_engines,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_CHECK_INTERVAL_SECONDS
+)
+
+
+def ReadSessionLocal() -> Session:
+    """Open a session for read-only work on a healthy replica, or on the primary."""
+    return SessionLocal(bind=read_router.read_engine())
+
 # Create declarative base for models
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
@@ -0,0 +1,170 @@
+"""
+Query Instrumentation
+
+This module hooks SQLAlchemy engine and pool events to see what the database
+layer does on behalf of each request:
+
+- per-request statistics: statements executed, time spent in them and time
+  spent waiting for a pooled connection, collected while track_queries is
+  active (the QueryStatsMiddleware opens one scope per request)
+- a slow-query log: statements slower than a threshold are logged with their
+  parameters redacted to their types, so no patient data reaches the logs
+- pool gauges: size, overflow and checked-out connections of an engine
+
+Statistics follow the request through contextvars, which SQLAlchemy carries
+into the greenlets that run async sessions and Starlette into worker threads.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Union
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Rows of an executemany shown in the slow-query log
+MAX_LOGGED_PARAMETER_SETS = 3
+
+
+class QueryStats:
+    """Counters of one tracked scope; times are in seconds."""
+
+    __slots__ = ("queries", "db_time", "pool_wait", "slow_queries")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.pool_wait = 0.0
+        self.slow_queries = 0
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        """Counters with times in milliseconds."""
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'pool_wait_ms': round(self.pool_wait * 1000, 2),
+            'slow_queries': self.slow_queries
+        }
+
+    def header_value(self) -> str:
+        """Counters rendered for a response header, e.g. "queries=3; db_ms=4.1; ..."."""
+        return "; ".join(f"{name}={value}" for name, value in self.as_dict().items())
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    """Statistics of the innermost active track_queries scope, or None."""
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect statistics for the statements executed inside the block."""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Replace bound parameter values with their type names, keeping the shape."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: a sequence of parameter sets
+            shown = [redact_parameters(p) for p in parameters[:MAX_LOGGED_PARAMETER_SETS]]
+            if len(parameters) > MAX_LOGGED_PARAMETER_SETS:
+                shown.append(f"... {len(parameters) - MAX_LOGGED_PARAMETER_SETS} more")
+            return shown
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class TimedPoolMixin:
+    """Pool mixin adding the time spent waiting for a connection to the current stats."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            stats = _current_stats.get()
+            if stats is not None:
+                stats.pool_wait += time.perf_counter() - started
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    """QueuePool that reports checkout waits; for sync engines."""
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that reports checkout waits; for async engines."""
+
+
+def instrument_engine(engine: Union[Engine, AsyncEngine], slow_query_ms: float) -> None:
+    """
+    Record statement counts and timings of an engine and log its slow statements.
+
+    Args:
+        engine: Engine to instrument; an AsyncEngine's sync engine is used
+        slow_query_ms: Statements taking at least this long are logged
+    """
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+    threshold = slow_query_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = _current_stats.get()
+        slow = elapsed >= threshold
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            stats.slow_queries += slow
+        if slow:
+            logger.warning(
+                "Slow query (%.1f ms): %s parameters=%s",
+                elapsed * 1000, statement, redact_parameters(parameters)
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _discard_timer(exception_context):
+        # Failed statements never reach after_cursor_execute
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            conn.info["query_started"].pop()
+
+
+def pool_gauges(engine: Union[Engine, AsyncEngine]) -> Dict[str, int]:
+    """
+    Current size, overflow and checked-out connections of an engine's pool.
+
+    Pools without a fixed size (such as SQLite's) report checked_out only
+    when they track it, and nothing else.
+    """
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        return {
+            'size': pool.size(),
+            'overflow': max(pool.overflow(), 0),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin()
+        }
+    if hasattr(pool, "checkedout"):
+        return {'checked_out': pool.checkedout()}
+    return {}
@@ -0,0 +1,164 @@
+"""
+Read Replica Routing
+
+This module picks the engine read-only work runs on. Replicas are used in
+turn while they are reachable and trail the primary by at most max_lag
+seconds; otherwise reads fall back to the primary. Each replica's health is
+re-read at most once per check interval, so routing normally costs no extra
+round trip, and a replica that drops a connection is skipped until its next
+check.
+
+Only sessions opened for read-only work are routed. Writes, and reads that
+must see the caller's own writes, keep using the primary session factories.
+"""
+
+import itertools
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Zero when caught up with everything received, otherwise the age of the last replayed commit
+LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery()"
+    " OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def replication_lag(conn: Connection) -> Optional[float]:
+    """
+    Seconds the database behind conn trails its primary.
+
+    Databases without streaming replication (such as SQLite files) report 0.
+    None means the lag is unknown, e.g. a replica that has replayed nothing yet.
+    """
+    if conn.dialect.name != "postgresql":
+        return 0.0
+    lag = conn.scalar(LAG_QUERY)
+    return float(lag) if lag is not None else None
+
+
+class _Replica:
+    """A replica engine and what its last health check found."""
+
+    __slots__ = ("engine", "usable", "lag", "checked_at")
+
+    def __init__(self, engine: Union[Engine, AsyncEngine]):
+        self.engine = engine
+        self.usable = False
+        self.lag: Optional[float] = None
+        self.checked_at = float("-inf")
+
+
+class _ReplicaRouting:
+    """Health bookkeeping shared by the sync and async routers."""
+
+    def __init__(
+        self,
+        primary: Union[Engine, AsyncEngine],
+        replicas: Sequence[Union[Engine, AsyncEngine]],
+        max_lag: float,
+        check_interval: float,
+        lag_probe: Callable[[Connection], Optional[float]] = replication_lag
+    ):
+        self.primary = primary
+        self.replicas = [_Replica(replica) for replica in replicas]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self._turn = itertools.count()
+        for replica in self.replicas:
+            sync_engine = getattr(replica.engine, "sync_engine", replica.engine)
+            event.listen(sync_engine, "handle_error", self._error_listener(replica))
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Last known health of each replica, passwords hidden."""
+        return [
+            {'url': replica.engine.url.render_as_string(hide_password=True),
+             'usable': replica.usable, 'lag_seconds': replica.lag}
+            for replica in self.replicas
+        ]
+
+    def _rotation(self) -> List[_Replica]:
+        """Replicas in the order to try them, starting with the next in turn."""
+        start = next(self._turn) % len(self.replicas)
+        return self.replicas[start:] + self.replicas[:start]
+
+    def _claim_check(self, replica: _Replica) -> bool:
+        """True if the replica is due a health check, which the caller then runs."""
+        now = time.monotonic()
+        if now - replica.checked_at < self.check_interval:
+            return False
+        # Claimed before probing so concurrent callers keep the previous verdict
+        replica.checked_at = now
+        return True
+
+    def _record(self, replica: _Replica, lag: Optional[float]) -> None:
+        """Store a health check result."""
+        usable = lag is not None and lag <= self.max_lag
+        if replica.usable and not usable:
+            logger.warning(
+                "Replica %s unusable (lag %s s), reading from the primary",
+                replica.engine.url.render_as_string(hide_password=True), lag
+            )
+        replica.usable, replica.lag = usable, lag
+
+    @staticmethod
+    def _error_listener(replica: _Replica) -> Callable:
+        def mark_down(exception_context):
+            if exception_context.is_disconnect:
+                replica.usable = False
+                replica.checked_at = time.monotonic()
+        return mark_down
+
+
+class ReplicaRouter(_ReplicaRouting):
+    """Routes read-only sync sessions to a healthy replica."""
+
+    def read_engine(self) -> Engine:
+        """A usable replica's engine, or the primary if none is usable."""
+        if not self.replicas:
+            return self.primary
+        for replica in self._rotation():
+            if self._claim_check(replica):
+                self._record(replica, self._probe(replica.engine))
+            if replica.usable:
+                return replica.engine
+        return self.primary
+
+    def _probe(self, engine: Engine) -> Optional[float]:
+        """Replication lag of a replica, or None if it cannot be read."""
+        try:
+            with engine.connect() as conn:
+                return self.lag_probe(conn)
+        except (SQLAlchemyError, OSError):
+            return None
+
+
+class AsyncReplicaRouter(_ReplicaRouting):
+    """Routes read-only async sessions to a healthy replica."""
+
+    async def read_engine(self) -> AsyncEngine:
+        """A usable replica's engine, or the primary if none is usable."""
+        if not self.replicas:
+            return self.primary
+        for replica in self._rotation():
+            if self._claim_check(replica):
+                self._record(replica, await self._probe(replica.engine))
+            if replica.usable:
+                return replica.engine
+        return self.primary
+
+    async def _probe(self, engine: AsyncEngine) -> Optional[float]:
+        """Replication lag of a replica, or None if it cannot be read."""
+        try:
+            async with engine.connect() as conn:
+                return await conn.run_sync(self.lag_probe)
+        except (SQLAlchemyError, OSError):
+            return None
@@ -1,5 +1,8 @@
 # app/models/appointments.py
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, String, Text, Enum
+from datetime import datetime as dt
+from typing import Iterable
+from sqlalchemy import Column, Integer, DateTime, Float, ForeignKey, String, Text, Enum, Index, DDL, bindparam, event, func, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from sqlalchemy.orm import relationship
 import enum
 from .base import Base, TimeStampMixin
@@ -11,13 +14,44 @@ class AppointmentStatus(enum.Enum):
     CANCELLED = "cancelled"
     NO_SHOW = "no_show"
 
+class AppointmentEventType(enum.Enum):
+    CREATED = "created"
+    STATUS_CHANGED = "status_changed"
+    NOTE = "note"
+
+# Statuses that occupy a dentist's time
+ACTIVE_STATUSES = (AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED)
+
+# ACTIVE_STATUSES as SQL, the predicate of the partial indexes and the overlap constraint
+ACTIVE_PREDICATE = "status IN ('SCHEDULED', 'CONFIRMED')"
+
+# Statuses an appointment may move to from each status; the others are final
+ALLOWED_TRANSITIONS = {
+    AppointmentStatus.SCHEDULED: (
+        AppointmentStatus.CONFIRMED,
+        AppointmentStatus.COMPLETED,
+        AppointmentStatus.CANCELLED,
+        AppointmentStatus.NO_SHOW
+    ),
+    AppointmentStatus.CONFIRMED: (
+        AppointmentStatus.COMPLETED,
+        AppointmentStatus.CANCELLED,
+        AppointmentStatus.NO_SHOW
+    ),
+}
+
+# Name reported by the database when two active appointments would overlap
+OVERLAP_CONSTRAINT = "appointments_no_overlap"
+
 class Appointment(Base, TimeStampMixin):
     __tablename__ = "appointments"
 
     id = Column(Integer, primary_key=True)
     datetime = Column(DateTime, nullable=False)
+    end_datetime = Column(DateTime, nullable=False)  # datetime plus treatment duration at booking
     status = Column(Enum(AppointmentStatus), default=AppointmentStatus.SCHEDULED)
     notes = Column(Text)
+    completed_price = Column(Float)  # Treatment price when the appointment was last completed
     
     # Foreign Keys
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
@@ -29,4 +63,91 @@ class Appointment(Base, TimeStampMixin):
     patient = relationship("Patient", back_populates="appointments")
     dentist = relationship("Dentist", back_populates="appointments")
     treatment = relationship("Treatment", back_populates="appointments")
-    created_by = relationship("User")
\ No newline at end of file
+    created_by = relationship("User")
+
+    __table_args__ = (
+        # Active appointments of one dentist may never overlap (PostgreSQL)
+        ExcludeConstraint(
+            (dentist_id, "="),
+            (func.tsrange(datetime, end_datetime, "[)"), "&&"),
+            name=OVERLAP_CONSTRAINT,
+            using="gist",
+            where=text(ACTIVE_PREDICATE)
+        ).ddl_if(dialect="postgresql"),
+        # Conflict checks, schedules and availability: active appointments of a dentist by time
+        Index(
+            "ix_appointments_dentist_active", dentist_id, datetime, id,
+            postgresql_where=text(ACTIVE_PREDICATE), sqlite_where=text(ACTIVE_PREDICATE)
+        ),
+        # Utilization reports and per-dentist exports, over every status
+        Index("ix_appointments_dentist_datetime", dentist_id, datetime),
+        # Patient treatment history and charts
+        Index("ix_appointments_patient_status_datetime", patient_id, status, datetime),
+        # Clinic-wide history exports, statistics backfills and status sweeps
+        Index("ix_appointments_status_datetime", status, datetime),
+    )
+
+def status_in(statuses: Iterable[AppointmentStatus]):
+    """
+    Appointment.status IN statuses, with the statuses rendered into the SQL.
+
+    A planner only uses a partial index when it can prove the query implies
+    the index predicate, which it cannot do for bound parameters.
+    """
+    return Appointment.status.in_(
+        bindparam(None, tuple(statuses), expanding=True, literal_execute=True)
+    )
+
+class AppointmentEvent(Base):
+    """Append-only history of an appointment: creation, status changes and notes."""
+    __tablename__ = "appointment_events"
+
+    id = Column(Integer, primary_key=True)
+    appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=False)
+    event_type = Column(Enum(AppointmentEventType), nullable=False)
+    from_status = Column(Enum(AppointmentStatus))
+    to_status = Column(Enum(AppointmentStatus))
+    note = Column(Text)
+    actor_id = Column(Integer, ForeignKey("users.id"))  # User who caused the event
+    created_at = Column(DateTime, nullable=False, default=dt.utcnow)
+
+    # Relationships
+    appointment = relationship("Appointment")
+    actor = relationship("User")
+
+    __table_args__ = (
+        # Serves paging through one appointment's events in id order
+        Index("ix_appointment_events_appointment_id_id", appointment_id, id),
+    )
+
+# The exclusion constraint compares dentist_id with "=" inside a GiST index
+event.listen(
+    Appointment.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql")
+)
+
+# SQLite has no exclusion constraints; triggers enforce the same rule there
+SQLITE_OVERLAP_CHECK = """
+    SELECT RAISE(ABORT, '{constraint}')
+    WHERE EXISTS (
+        SELECT 1 FROM appointments
+        WHERE dentist_id = NEW.dentist_id
+          AND id IS NOT NEW.id
+          AND status IN ('SCHEDULED', 'CONFIRMED')
+          AND datetime < NEW.end_datetime
+          AND end_datetime > NEW.datetime
+    );
+""".format(constraint=OVERLAP_CONSTRAINT)
+
+for trigger_event in ("INSERT", "UPDATE OF datetime, end_datetime, status, dentist_id"):
+    event.listen(
+        Appointment.__table__,
+        "after_create",
+        DDL(
+            f"CREATE TRIGGER {OVERLAP_CONSTRAINT}_{trigger_event.split()[0].lower()} "
+            f"BEFORE {trigger_event} ON appointments "
+            f"WHEN NEW.status IN ('SCHEDULED', 'CONFIRMED') "
+            f"BEGIN {SQLITE_OVERLAP_CHECK} END"
+        ).execute_if(dialect="sqlite")
+    )
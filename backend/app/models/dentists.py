@@ -10,6 +10,7 @@ class Dentist(Base, TimeStampMixin):
     staff_id = Column(Integer, ForeignKey("staff.id"), unique=True)
     specialization = Column(String)
     license_number = Column(String, unique=True)
+    schedule_version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped on every appointment change
 
     # Relationships
     appointments = relationship("Appointment", back_populates="dentist")
@@ -1,5 +1,5 @@
 # app/models/schedules.py
-from sqlalchemy import Column, Integer, Time, String, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, Time, String, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from .base import Base, TimeStampMixin
 
@@ -14,4 +14,9 @@ class DentistSchedule(Base, TimeStampMixin):
     is_active = Column(Boolean, default=True)
 
     # Relationship
-    dentist = relationship("Dentist", back_populates="schedules")
\ No newline at end of file
+    dentist = relationship("Dentist", back_populates="schedules")
+
+    __table_args__ = (
+        # Working windows are always read per dentist
+        Index("ix_dentist_schedules_dentist_day", "dentist_id", "day_of_week"),
+    )
\ No newline at end of file
@@ -1,6 +1,6 @@
 # app/models/treatments.py
-from sqlalchemy import Column, Integer, String, Float, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Date, DDL, ForeignKey, Integer, String, Float, Text, event, update
+from sqlalchemy.orm import object_session, relationship
 from .base import Base, TimeStampMixin
 
 class Treatment(Base, TimeStampMixin):
@@ -15,4 +15,48 @@ class Treatment(Base, TimeStampMixin):
 
     # Relationships
     appointments = relationship("Appointment", back_populates="treatment")
-    patients = relationship("Patient", secondary="patient_treatments", back_populates="treatments")
\ No newline at end of file
+    patients = relationship("Patient", secondary="patient_treatments", back_populates="treatments")
+
+class CatalogVersion(Base):
+    """Change counter of a cached catalog; workers compare it to decide whether to reload."""
+    __tablename__ = "catalog_versions"
+
+    name = Column(String, primary_key=True)  # e.g. "treatments"
+    version = Column(Integer, nullable=False, default=0)
+
+# Name of the treatment catalog's row in catalog_versions
+TREATMENT_CATALOG = "treatments"
+
+def catalog_version_bump(name):
+    """UPDATE statement incrementing a catalog's version."""
+    return update(CatalogVersion).where(CatalogVersion.name == name).values(
+        version=CatalogVersion.version + 1
+    )
+
+event.listen(
+    CatalogVersion.__table__,
+    "after_create",
+    DDL(f"INSERT INTO catalog_versions (name, version) VALUES ('{TREATMENT_CATALOG}', 0)")
+)
+
+# Any ORM change to a treatment, in the service layer or not, bumps the catalog version
+@event.listens_for(Treatment, "after_insert")
+@event.listens_for(Treatment, "after_delete")
+def _bump_treatment_catalog(mapper, connection, target):
+    connection.execute(catalog_version_bump(TREATMENT_CATALOG))
+
+@event.listens_for(Treatment, "after_update")
+def _bump_treatment_catalog_on_update(mapper, connection, target):
+    # Collection changes such as a patient gaining a treatment leave the catalog as it is
+    if object_session(target).is_modified(target, include_collections=False):
+        connection.execute(catalog_version_bump(TREATMENT_CATALOG))
+
+class TreatmentDailyStats(Base):
+    """Completed appointments and their revenue per day, treatment and dentist."""
+    __tablename__ = "treatment_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    treatment_id = Column(Integer, ForeignKey("treatments.id"), primary_key=True)
+    dentist_id = Column(Integer, ForeignKey("dentists.id"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)  # Treatment prices at the time of completion
@@ -1,6 +1,7 @@
 # app/models/users.py
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, JSON, Table
-from sqlalchemy.orm import relationship
+import re
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, JSON, Table, Index, DDL, event, func
+from sqlalchemy.orm import relationship, validates
 from .base import Base, TimeStampMixin
 
 # Association table for User-Role relationship
@@ -11,12 +12,21 @@ user_roles = Table(
     Column('role_id', Integer, ForeignKey('roles.id'), primary_key=True)
 )
 
+# Full-text index over users on SQLite; PostgreSQL uses trigram indexes instead
+USER_SEARCH_FTS = "users_fts"
+
+def normalize_phone(phone_number):
+    """Digits of a phone number, or None if it has none."""
+    digits = re.sub(r"\D", "", phone_number or "")
+    return digits or None
+
 class User(Base, TimeStampMixin):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
     phone_number = Column(String)
+    phone_digits = Column(String)  # phone_number reduced to digits, for exact and prefix search
     full_name = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
@@ -27,6 +37,28 @@ class User(Base, TimeStampMixin):
     patient_profile = relationship("Patient", back_populates="user", uselist=False)
     staff_profile = relationship("Staff", back_populates="user", uselist=False)
 
+    __table_args__ = (
+        Index("ix_users_phone_digits", "phone_digits"),
+        # Name-ordered patient listings walk this index page by page
+        Index("ix_users_full_name_id", "full_name", "id"),
+        # Case-insensitive email lookups, e.g. the patient import's duplicate check
+        Index("ix_users_email_lower", func.lower(email)),
+        # Serve substring and similarity search on PostgreSQL
+        Index(
+            "ix_users_full_name_trgm", "full_name",
+            postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_users_email_trgm", "email",
+            postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    @validates("phone_number")
+    def _sync_phone_digits(self, key, phone_number):
+        self.phone_digits = normalize_phone(phone_number)
+        return phone_number
+
 class Role(Base):
     __tablename__ = "roles"
 
@@ -36,4 +68,35 @@ class Role(Base):
     permissions = Column(JSON)
 
     # Relationships
-    users = relationship("User", secondary=user_roles, back_populates="roles")
\ No newline at end of file
+    users = relationship("User", secondary=user_roles, back_populates="roles")
+
+# The trigram indexes need the pg_trgm operator classes
+event.listen(
+    User.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
+# SQLite: an external-content FTS5 table with the trigram tokenizer, kept in sync by triggers
+SQLITE_SEARCH_DDL = [
+    f"CREATE VIRTUAL TABLE {USER_SEARCH_FTS} USING fts5("
+    f"full_name, email, content='users', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER {USER_SEARCH_FTS}_insert AFTER INSERT ON users BEGIN "
+    f"INSERT INTO {USER_SEARCH_FTS}(rowid, full_name, email) VALUES (NEW.id, NEW.full_name, NEW.email); END",
+    f"CREATE TRIGGER {USER_SEARCH_FTS}_delete AFTER DELETE ON users BEGIN "
+    f"INSERT INTO {USER_SEARCH_FTS}({USER_SEARCH_FTS}, rowid, full_name, email) "
+    f"VALUES ('delete', OLD.id, OLD.full_name, OLD.email); END",
+    f"CREATE TRIGGER {USER_SEARCH_FTS}_update AFTER UPDATE OF full_name, email ON users BEGIN "
+    f"INSERT INTO {USER_SEARCH_FTS}({USER_SEARCH_FTS}, rowid, full_name, email) "
+    f"VALUES ('delete', OLD.id, OLD.full_name, OLD.email); "
+    f"INSERT INTO {USER_SEARCH_FTS}(rowid, full_name, email) VALUES (NEW.id, NEW.full_name, NEW.email); END",
+]
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(User.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+event.listen(
+    User.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {USER_SEARCH_FTS}").execute_if(dialect="sqlite")
+)
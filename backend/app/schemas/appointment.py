@@ -0,0 +1,89 @@
+"""
+Pydantic schemas for appointment requests and responses.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.models.appointments import AppointmentEventType, AppointmentStatus
+
+
+class AppointmentBase(BaseModel):
+    patient_id: int
+    dentist_id: int
+    treatment_id: int
+    datetime: datetime
+    notes: Optional[str] = None
+
+
+class AppointmentCreate(AppointmentBase):
+    pass
+
+
+class AppointmentUpdate(BaseModel):
+    status: Optional[AppointmentStatus] = None
+    notes: Optional[str] = None
+
+
+class AppointmentResponse(AppointmentBase):
+    id: int
+    status: AppointmentStatus
+    created_by_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ScheduleEntryResponse(BaseModel):
+    id: int
+    patient_id: int
+    dentist_id: int
+    treatment_id: int
+    datetime: datetime
+    status: AppointmentStatus
+    created_by_id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class AvailableSlot(BaseModel):
+    dentist_id: int
+    start: datetime
+    end: datetime
+
+
+class BulkBookingResult(BaseModel):
+    index: int
+    status: str
+    appointment_id: Optional[int] = None
+    reason: Optional[str] = None
+
+
+class StatusTransitionRequest(BaseModel):
+    new_status: AppointmentStatus
+    dentist_id: Optional[int] = None
+    before: Optional[datetime] = None
+    from_statuses: Optional[List[AppointmentStatus]] = None
+    appointment_ids: Optional[List[int]] = None
+    notes: Optional[str] = None
+
+
+class StatusTransitionResult(BaseModel):
+    new_status: AppointmentStatus
+    appointment_ids: List[int]
+
+
+class AppointmentEventResponse(BaseModel):
+    id: int
+    appointment_id: int
+    event_type: AppointmentEventType
+    from_status: Optional[AppointmentStatus] = None
+    to_status: Optional[AppointmentStatus] = None
+    note: Optional[str] = None
+    actor_id: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
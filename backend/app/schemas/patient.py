@@ -0,0 +1,80 @@
+"""
+Pydantic schemas for patient requests and responses.
+"""
+
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.models.appointments import AppointmentStatus
+from app.models.patients import Patient
+
+
+class TreatmentSummary(BaseModel):
+    id: int
+    name: str
+    category: Optional[str] = None
+    duration_minutes: int
+    price: float
+
+    class Config:
+        from_attributes = True
+
+
+class ChartAppointment(BaseModel):
+    id: int
+    datetime: datetime
+    end_datetime: datetime
+    status: AppointmentStatus
+    notes: Optional[str] = None
+    treatment: TreatmentSummary
+    dentist_id: int
+    dentist_name: Optional[str] = None
+
+
+class PatientChart(BaseModel):
+    id: int
+    full_name: str
+    email: str
+    phone_number: Optional[str] = None
+    medical_history: Optional[str] = None
+    allergies: Optional[str] = None
+    emergency_contact: Optional[str] = None
+    under_treatment: Optional[bool] = None
+    notes: Optional[str] = None
+    treatments: List[TreatmentSummary]
+    appointments: List[ChartAppointment]
+
+    @classmethod
+    def from_patient(cls, patient: Patient) -> "PatientChart":
+        """Build a chart from a patient loaded by PatientManagement.chart_statement; appointments newest first."""
+        appointments = sorted(patient.appointments, key=lambda a: (a.datetime, a.id), reverse=True)
+        return cls(
+            id=patient.id,
+            full_name=patient.user.full_name,
+            email=patient.user.email,
+            phone_number=patient.user.phone_number,
+            medical_history=patient.medical_history,
+            allergies=patient.allergies,
+            emergency_contact=patient.emergency_contact,
+            under_treatment=patient.under_treatment,
+            notes=patient.notes,
+            treatments=patient.treatments,
+            appointments=[
+                ChartAppointment(
+                    id=a.id,
+                    datetime=a.datetime,
+                    end_datetime=a.end_datetime,
+                    status=a.status,
+                    notes=a.notes,
+                    treatment=a.treatment,
+                    dentist_id=a.dentist_id,
+                    dentist_name=(
+                        a.dentist.staff.user.full_name
+                        if a.dentist.staff is not None and a.dentist.staff.user is not None
+                        else None
+                    )
+                )
+                for a in appointments
+            ]
+        )
@@ -0,0 +1,17 @@
+"""
+Pydantic schemas for report responses.
+"""
+
+from datetime import date
+from pydantic import BaseModel
+
+
+class UtilizationRow(BaseModel):
+    dentist_id: int
+    period_start: date
+    available_minutes: int
+    booked_minutes: int
+    no_show_minutes: int
+    idle_minutes: int
+    idle_gaps: int
+    utilization: float
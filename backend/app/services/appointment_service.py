@@ -4,15 +4,60 @@ Appointment Management Service
 This module provides the core functionality for managing dental appointments.
 It handles scheduling, conflict detection, and appointment status management.
 The service ensures proper coordination between patients, dentists, and treatments.
+AsyncAppointmentSystem offers the same operations over an AsyncSession for the API.
 """
 
-from datetime import datetime, timedelta
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from models.appointments import Appointment, AppointmentStatus
-from models.treatments import Treatment
-from models.dentists import Dentist
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
+from sqlalchemy import Select, Update, and_, insert, literal, select, tuple_, update
+from sqlalchemy.engine import Row
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.exc import IntegrityError
+from app.models.appointments import (
+    ACTIVE_STATUSES,
+    ALLOWED_TRANSITIONS,
+    OVERLAP_CONSTRAINT,
+    Appointment,
+    AppointmentEvent,
+    AppointmentEventType,
+    AppointmentStatus,
+    status_in
+)
+from app.models.dentists import Dentist
+from app.models.schedules import DentistSchedule
+from app.services import availability
+from app.services.pagination import decode_cursor, split_page
+from app.services.booking_lock import (
+    async_dentist_locks,
+    async_with_retry,
+    dentist_locks,
+    with_retry
+)
+from app.services.interval_index import IntervalSet, appointment_index
+from app.services.treatment_catalog import treatment_catalog
+from app.services.treatment_stats import COMPLETION_PRICE, rollup_statements
+
+# Columns streamed for schedule exports, matching the schedule entry schema.
+# Notes are left out: the legacy column can hold long history blobs that no
+# schedule view shows.
+SCHEDULE_COLUMNS = (
+    Appointment.id,
+    Appointment.patient_id,
+    Appointment.dentist_id,
+    Appointment.treatment_id,
+    Appointment.datetime,
+    Appointment.status,
+    Appointment.created_by_id
+)
+
+def schedule_version_bump(dentist_ids: Iterable[int]) -> Update:
+    """Statement advancing the schedule version of dentists whose appointments change."""
+    return update(Dentist).where(Dentist.id.in_(set(dentist_ids))).values(
+        schedule_version=Dentist.schedule_version + 1
+    )
 
 class AppointmentSystem:
     """
@@ -39,6 +84,11 @@ class AppointmentSystem:
         This method creates a new appointment after verifying that the time slot
         is available for the specified dentist. It considers the duration of the
         requested treatment when checking for conflicts.
+
+        The check and the insert run under the dentist's booking lock, so
+        concurrent requests for the same dentist are serialized across worker
+        processes while other dentists are booked in parallel. Transient
+        serialization failures are retried a bounded number of times.
         
         Args:
             db: Database session for performing operations
@@ -56,24 +106,229 @@ class AppointmentSystem:
             ValueError: If the time slot is not available or if any referenced
                        entities (patient, dentist, treatment) don't exist
         """
-        # Check for scheduling conflicts
-        if AppointmentSystem.has_conflict(db, dentist_id, datetime, treatment_id):
-            raise ValueError("Time slot is not available for the specified dentist")
-
-        appointment = Appointment(
-            patient_id=patient_id,
-            dentist_id=dentist_id,
-            treatment_id=treatment_id,
-            datetime=datetime,
-            notes=notes,
-            status=AppointmentStatus.SCHEDULED,
-            created_by_id=created_by_id
-        )
-        db.add(appointment)
-        db.commit()
+        def book() -> Appointment:
+            with dentist_locks(db, [dentist_id]):
+                # Check for scheduling conflicts
+                if AppointmentSystem.has_conflict(db, dentist_id, datetime, treatment_id):
+                    raise ValueError("Time slot is not available for the specified dentist")
+                db.execute(schedule_version_bump([dentist_id]))
+
+                duration = treatment_catalog.get(db, treatment_id).duration_minutes
+                appointment = Appointment(
+                    patient_id=patient_id,
+                    dentist_id=dentist_id,
+                    treatment_id=treatment_id,
+                    datetime=datetime,
+                    end_datetime=datetime + timedelta(minutes=duration),
+                    notes=notes,
+                    status=AppointmentStatus.SCHEDULED,
+                    created_by_id=created_by_id
+                )
+                db.add(appointment)
+                db.add(AppointmentEvent(
+                    appointment=appointment,
+                    event_type=AppointmentEventType.CREATED,
+                    to_status=AppointmentStatus.SCHEDULED,
+                    note=notes or None,
+                    actor_id=created_by_id
+                ))
+                AppointmentSystem._commit_booking(db, [dentist_id])
+            return appointment
+
+        appointment = with_retry(db, book)
         db.refresh(appointment)
+
+        appointment_index.add(
+            dentist_id,
+            appointment.datetime,
+            appointment.end_datetime,
+            appointment.id
+        )
         return appointment
 
+    @staticmethod
+    @contextmanager
+    def _reporting_overlap(db: Session) -> Iterator[None]:
+        """Roll back on an integrity error, reporting a database-detected overlap as a ValueError."""
+        try:
+            yield
+        except IntegrityError as e:
+            db.rollback()
+            if OVERLAP_CONSTRAINT in str(e.orig):
+                raise ValueError("Time slot is not available for the specified dentist") from e
+            raise
+
+    @staticmethod
+    def _commit_booking(db: Session, dentist_ids: Iterable[int]) -> None:
+        """
+        Commit new bookings, reporting a database-detected overlap as a ValueError.
+
+        Such an overlap is a booking the interval index has not seen yet, so the
+        dentists' windows are dropped and reloaded by their next lookup.
+        """
+        try:
+            with AppointmentSystem._reporting_overlap(db):
+                db.commit()
+        except ValueError:
+            for dentist_id in set(dentist_ids):
+                appointment_index.invalidate(dentist_id)
+            raise
+
+    @staticmethod
+    def schedule_appointments_bulk(
+        db: Session,
+        bookings: List[Dict[str, Any]],
+        created_by_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Schedule many appointments in a single transaction.
+        
+        Treatments come from the catalog cache and the existing intervals of
+        every dentist involved are loaded once. Each booking is then checked in memory against those intervals and
+        against the bookings accepted earlier in the same batch, and all accepted
+        bookings are written with one bulk INSERT. The booking locks of all
+        dentists involved are held from the interval load until the commit.
+        
+        Args:
+            db: Database session
+            bookings: Dictionaries with patient_id, dentist_id, treatment_id,
+                      datetime and optional notes
+            created_by_id: Optional ID of user creating the appointments
+        
+        Returns:
+            One dictionary per booking, in input order, with its index, a status of
+            "booked" or "rejected", the new appointment_id and a rejection reason
+        """
+        results = AppointmentSystem._bulk_results(bookings)
+        if not bookings:
+            return results
+
+        def book() -> List[Tuple[Tuple[int, datetime], int]]:
+            with dentist_locks(db, {b['dentist_id'] for b in bookings}):
+                return AppointmentSystem._book_batch(db, bookings, created_by_id, results)
+
+        AppointmentSystem._record_batch(bookings, results, with_retry(db, book))
+        return results
+
+    @staticmethod
+    def _bulk_results(bookings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Initial per-booking results of schedule_appointments_bulk, all rejected."""
+        return [
+            {'index': i, 'status': 'rejected', 'appointment_id': None, 'reason': None}
+            for i in range(len(bookings))
+        ]
+
+    @staticmethod
+    def _book_batch(
+        db: Session,
+        bookings: List[Dict[str, Any]],
+        created_by_id: Optional[int],
+        results: List[Dict[str, Any]]
+    ) -> List[Tuple[Tuple[int, datetime], int]]:
+        """
+        Check, insert and commit one attempt at a batch of bookings.
+
+        The caller holds the booking locks of every dentist in the batch and
+        retries on transient failures. Rejection reasons are written to results.
+
+        Returns:
+            ((index, end_datetime), appointment_id) of every booking inserted
+        """
+        treatments = [
+            treatment_catalog.get(db, treatment_id)
+            for treatment_id in {b['treatment_id'] for b in bookings}
+        ]
+        durations = {t.id: t.duration_minutes for t in treatments if t is not None}
+
+        dentist_ids = {b['dentist_id'] for b in bookings}
+        earliest = min(b['datetime'] for b in bookings)
+        latest = max(
+            b['datetime'] + timedelta(minutes=durations.get(b['treatment_id'], 0))
+            for b in bookings
+        )
+
+        existing: Dict[int, List[Tuple[datetime, datetime, int]]] = {}
+        for appointment_id, dentist_id, start, end in db.query(
+            Appointment.id,
+            Appointment.dentist_id,
+            Appointment.datetime,
+            Appointment.end_datetime
+        ).filter(
+            Appointment.dentist_id.in_(dentist_ids),
+            status_in(ACTIVE_STATUSES),
+            Appointment.datetime < latest,
+            Appointment.end_datetime > earliest
+        ):
+            existing.setdefault(dentist_id, []).append((start, end, appointment_id))
+        intervals = {
+            dentist_id: IntervalSet(existing.get(dentist_id, []))
+            for dentist_id in dentist_ids
+        }
+
+        accepted = []
+        for i, booking in enumerate(bookings):
+            results[i]['reason'] = None
+            duration = durations.get(booking['treatment_id'])
+            if duration is None:
+                results[i]['reason'] = "Treatment not found"
+                continue
+            start = booking['datetime']
+            end = start + timedelta(minutes=duration)
+            dentist_intervals = intervals[booking['dentist_id']]
+            if dentist_intervals.overlaps(start, end):
+                results[i]['reason'] = "Time slot is not available for the specified dentist"
+                continue
+            # Batch members get negative placeholder ids until they are inserted
+            dentist_intervals.add(start, end, -(i + 1))
+            accepted.append((i, end))
+
+        new_ids: List[int] = []
+        if accepted:
+            rows = [
+                {
+                    'patient_id': bookings[i]['patient_id'],
+                    'dentist_id': bookings[i]['dentist_id'],
+                    'treatment_id': bookings[i]['treatment_id'],
+                    'datetime': bookings[i]['datetime'],
+                    'end_datetime': end,
+                    'notes': bookings[i].get('notes') or "",
+                    'status': AppointmentStatus.SCHEDULED,
+                    'created_by_id': created_by_id
+                }
+                for i, end in accepted
+            ]
+            new_ids = db.scalars(
+                insert(Appointment).returning(Appointment.id, sort_by_parameter_order=True),
+                rows
+            ).all()
+            db.execute(insert(AppointmentEvent), [
+                {
+                    'appointment_id': appointment_id,
+                    'event_type': AppointmentEventType.CREATED,
+                    'to_status': AppointmentStatus.SCHEDULED,
+                    'note': bookings[i].get('notes') or None,
+                    'actor_id': created_by_id
+                }
+                for (i, _), appointment_id in zip(accepted, new_ids)
+            ])
+            db.execute(schedule_version_bump(bookings[i]['dentist_id'] for i, _ in accepted))
+        # Ending the transaction also releases the dentists' locks
+        AppointmentSystem._commit_booking(db, dentist_ids)
+        return list(zip(accepted, new_ids))
+
+    @staticmethod
+    def _record_batch(
+        bookings: List[Dict[str, Any]],
+        results: List[Dict[str, Any]],
+        booked: List[Tuple[Tuple[int, datetime], int]]
+    ) -> None:
+        """Mark committed batch bookings in results and add them to the interval index."""
+        for (i, end), appointment_id in booked:
+            results[i].update(status='booked', appointment_id=appointment_id)
+            appointment_index.add(
+                bookings[i]['dentist_id'], bookings[i]['datetime'], end, appointment_id
+            )
+
     @staticmethod
     def has_conflict(
         db: Session,
@@ -87,6 +342,12 @@ class AppointmentSystem:
         This method performs a detailed check to ensure that the proposed appointment
         time doesn't overlap with any existing appointments, considering the duration
         of both the proposed and existing treatments.
+
+        The treatment's duration comes from the in-process catalog cache and the
+        answer from the in-process interval index, whose windows reflect other
+        processes' changes within its TTL. A booking the index has not seen yet
+        is still caught by the database's overlap constraint when the new
+        appointment is committed.
         
         Args:
             db: Database session
@@ -97,72 +358,330 @@ class AppointmentSystem:
         Returns:
             True if there is a conflict, False if the time slot is available
         """
-        treatment = db.query(Treatment).filter(Treatment.id == treatment_id).first()
+        treatment = treatment_catalog.get(db, treatment_id)
         if not treatment:
             raise ValueError("Treatment not found")
         
         end_time = datetime + timedelta(minutes=treatment.duration_minutes)
-        
-        existing = db.query(Appointment).filter(
+
+        return appointment_index.lookup(db, dentist_id, datetime, end_time)
+
+    @staticmethod
+    def find_overlapping_appointment(
+        db: Session,
+        dentist_id: int,
+        start_time: datetime,
+        end_time: datetime
+    ) -> Optional[int]:
+        """
+        Find an active appointment overlapping a time interval in the database.
+
+        Uses the stored end time of each appointment, so the check is a single
+        range predicate that an index on (dentist_id, datetime) can serve.
+
+        Args:
+            db: Database session
+            dentist_id: ID of the dentist to check
+            start_time: Start of the interval
+            end_time: End of the interval
+
+        Returns:
+            ID of an overlapping appointment, or None if the interval is free
+        """
+        return db.query(Appointment.id).filter(
             and_(
                 Appointment.dentist_id == dentist_id,
-                Appointment.status.in_([
-                    AppointmentStatus.SCHEDULED,
-                    AppointmentStatus.CONFIRMED
-                ]),
-                or_(
-                    # Check if new appointment starts during an existing one
-                    and_(
-                        Appointment.datetime >= datetime,
-                        Appointment.datetime < end_time
-                    ),
-                    # Check if existing appointment overlaps with new one
-                    and_(
-                        Appointment.datetime <= datetime,
-                        Appointment.datetime + timedelta(minutes=treatment.duration_minutes) > datetime
-                    )
-                )
+                status_in(ACTIVE_STATUSES),
+                Appointment.datetime < end_time,
+                Appointment.end_datetime > start_time
             )
-        ).first()
-        
-        return existing is not None
+        ).limit(1).scalar()
 
     @staticmethod
     def update_appointment_status(
         db: Session,
         appointment_id: int,
         new_status: AppointmentStatus,
-        notes: Optional[str] = None
+        notes: Optional[str] = None,
+        actor_id: Optional[int] = None
     ) -> Appointment:
         """
         Update the status of an existing appointment.
         
         This method allows tracking the lifecycle of appointments from scheduled
-        through completed or cancelled states.
+        through completed or cancelled states. The change and its note are
+        recorded as an appointment event; the appointment row only holds the
+        current status. Moving into or out of COMPLETED also updates the
+        treatment statistics rollup in the same transaction.
         
         Args:
             db: Database session
             appointment_id: ID of the appointment to update
             new_status: New status to set
             notes: Optional notes about the status change
+            actor_id: Optional ID of the user making the change
         
         Returns:
             Updated Appointment object
+        
+        Raises:
+            ValueError: If the appointment doesn't exist, its status was changed
+                        by a concurrent request, or reactivating it would overlap
+                        another active appointment of the dentist
+        """
+        row = AppointmentSystem._change_status(db, appointment_id, new_status, notes, actor_id)
+        appointment = db.get(Appointment, row.id, populate_existing=True)
+        AppointmentSystem._reindex_transitioned([row], new_status)
+        return appointment
+
+    @staticmethod
+    def _change_status(
+        db: Session,
+        appointment_id: int,
+        new_status: AppointmentStatus,
+        notes: Optional[str],
+        actor_id: Optional[int]
+    ) -> Row:
         """
-        appointment = db.query(Appointment).filter(
-            Appointment.id == appointment_id
+        Apply one status change with its event and rollup update, and commit.
+
+        The UPDATE only matches the row while it still has the status read
+        before it, so of two concurrent changes from the same status exactly
+        one applies and is counted in the rollup; the other raises. Moving into
+        COMPLETED records the treatment's current price on the appointment.
+
+        Returns:
+            The appointment's id, dentist_id, datetime and end_datetime
+        """
+        current = db.execute(
+            select(Appointment.status).where(Appointment.id == appointment_id)
         ).first()
-        
-        if not appointment:
+        if current is None:
             raise ValueError("Appointment not found")
+
+        values: Dict[str, Any] = {'status': new_status}
+        if new_status == AppointmentStatus.COMPLETED and current.status != AppointmentStatus.COMPLETED:
+            values['completed_price'] = COMPLETION_PRICE
+        with AppointmentSystem._reporting_overlap(db):
+            row = db.execute(
+                update(Appointment).where(
+                    Appointment.id == appointment_id,
+                    Appointment.status == current.status
+                ).values(**values).returning(
+                    Appointment.id,
+                    Appointment.dentist_id,
+                    Appointment.datetime,
+                    Appointment.end_datetime
+                ).execution_options(synchronize_session=False)
+            ).first()
+            if row is None:
+                db.rollback()
+                raise ValueError("Appointment status was changed by another request")
+
+            db.add(AppointmentEvent(
+                appointment_id=row.id,
+                event_type=AppointmentEventType.STATUS_CHANGED,
+                from_status=current.status,
+                to_status=new_status,
+                note=notes,
+                actor_id=actor_id
+            ))
+            for statement in rollup_statements(
+                db.get_bind().dialect.name, [(row.id, current.status)], new_status
+            ):
+                db.execute(statement)
+            db.execute(schedule_version_bump([row.dentist_id]))
+            db.commit()
+        return row
+
+    @staticmethod
+    def transition_statuses(
+        db: Session,
+        new_status: AppointmentStatus,
+        dentist_id: Optional[int] = None,
+        before: Optional[datetime] = None,
+        from_statuses: Optional[List[AppointmentStatus]] = None,
+        appointment_ids: Optional[List[int]] = None,
+        notes: Optional[str] = None,
+        actor_id: Optional[int] = None
+    ) -> List[int]:
+        """
+        Move every matching appointment to a new status in one statement.
         
-        appointment.status = new_status
-        if notes:
-            appointment.notes = (appointment.notes or "") + f"\n[{datetime.now()}] {notes}"
+        Intended for end-of-day processing, e.g. marking all scheduled and
+        confirmed appointments of a dentist before a given time as NO_SHOW. On
+        PostgreSQL the change runs as a single UPDATE ... RETURNING. Only
+        appointments whose current status may move to `new_status` are touched,
+        so invalid transitions are filtered out by the database rather than in
+        Python. One event per affected appointment is then written with a
+        single multi-row INSERT, and the treatment statistics rollup is
+        adjusted with one upsert.
         
+        Args:
+            db: Database session
+            new_status: Status to move the appointments to
+            dentist_id: Optional dentist whose appointments are affected
+            before: Optional bound; only appointments starting earlier are affected
+            from_statuses: Optional subset of current statuses to transition
+            appointment_ids: Optional explicit list of appointments
+            notes: Optional note recorded with each transition event
+            actor_id: Optional ID of the user making the change
+        
+        Returns:
+            IDs of the appointments that changed status
+        
+        Raises:
+            ValueError: If no filter is given or no status can move to new_status
+        """
+        statements = AppointmentSystem.transition_statements(
+            db.get_bind().dialect.name, new_status, dentist_id, before, from_statuses, appointment_ids
+        )
+        rows = [row for statement in statements for row in db.execute(statement)]
+        if rows:
+            db.execute(
+                insert(AppointmentEvent),
+                AppointmentSystem._transition_events(rows, new_status, notes, actor_id)
+            )
+            db.execute(schedule_version_bump({row.dentist_id for row in rows}))
+            for statement in rollup_statements(
+                db.get_bind().dialect.name, [(row.id, row.from_status) for row in rows], new_status
+            ):
+                db.execute(statement)
         db.commit()
-        db.refresh(appointment)
-        return appointment
+
+        AppointmentSystem._reindex_transitioned(rows, new_status)
+        return [row.id for row in rows]
+
+    @staticmethod
+    def transition_statements(
+        dialect_name: str,
+        new_status: AppointmentStatus,
+        dentist_id: Optional[int] = None,
+        before: Optional[datetime] = None,
+        from_statuses: Optional[List[AppointmentStatus]] = None,
+        appointment_ids: Optional[List[int]] = None
+    ) -> List[Update]:
+        """
+        Build the UPDATE ... RETURNING statements behind transition_statuses.
+
+        Every returned row also carries the status it had before the update. On
+        PostgreSQL this is one statement joining the matching rows from a
+        materialized CTE. SQLite cannot return columns of joined tables, so there
+        one statement per eligible source status is built instead (at most two).
+        """
+        if dentist_id is None and before is None and appointment_ids is None:
+            raise ValueError("A dentist, a time bound or appointment IDs are required")
+        sources = [
+            status for status, targets in ALLOWED_TRANSITIONS.items()
+            if new_status in targets and (from_statuses is None or status in from_statuses)
+        ]
+        if not sources:
+            raise ValueError(f"No appointment can move to {new_status.value}")
+
+        filters = []
+        if dentist_id is not None:
+            filters.append(Appointment.dentist_id == dentist_id)
+        if before is not None:
+            filters.append(Appointment.datetime < before)
+        if appointment_ids is not None:
+            filters.append(Appointment.id.in_(appointment_ids))
+        returned = (
+            Appointment.id,
+            Appointment.dentist_id,
+            Appointment.datetime,
+            Appointment.end_datetime
+        )
+
+        if dialect_name == "postgresql":
+            # Materialized so that the old status is read before any row is updated
+            previous = select(Appointment.id, Appointment.status).where(
+                Appointment.status.in_(sources), *filters
+            ).cte('previous').prefix_with('MATERIALIZED')
+            statements = [
+                update(Appointment).where(
+                    Appointment.id == previous.c.id,
+                    # Re-checked on the row being updated in case it changed concurrently
+                    Appointment.status.in_(sources)
+                ).returning(*returned, previous.c.status.label('from_status'))
+            ]
+        else:
+            statements = [
+                update(Appointment).where(Appointment.status == source, *filters).returning(
+                    *returned, literal(source, Appointment.status.type).label('from_status')
+                )
+                for source in sources
+            ]
+        values: Dict[str, Any] = {'status': new_status}
+        if new_status == AppointmentStatus.COMPLETED:
+            values['completed_price'] = COMPLETION_PRICE
+        return [
+            statement.values(**values).execution_options(synchronize_session=False)
+            for statement in statements
+        ]
+
+    @staticmethod
+    def _transition_events(
+        rows: List[Row],
+        new_status: AppointmentStatus,
+        notes: Optional[str],
+        actor_id: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        """Event rows recording status transitions returned by transition_statement."""
+        return [
+            {
+                'appointment_id': row.id,
+                'event_type': AppointmentEventType.STATUS_CHANGED,
+                'from_status': row.from_status,
+                'to_status': new_status,
+                'note': notes,
+                'actor_id': actor_id
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _reindex_transitioned(rows: List[Row], new_status: AppointmentStatus) -> None:
+        """Apply committed status transitions to the interval index."""
+        for row in rows:
+            appointment_index.discard(row.dentist_id, row.datetime, row.id)
+            if new_status in ACTIVE_STATUSES:
+                appointment_index.add(row.dentist_id, row.datetime, row.end_datetime, row.id)
+
+    @staticmethod
+    def get_appointment_events(
+        db: Session,
+        appointment_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[AppointmentEvent], Optional[str]]:
+        """
+        Retrieve one page of an appointment's history, oldest first.
+        
+        Args:
+            db: Database session
+            appointment_id: ID of the appointment
+            cursor: Token returned with the previous page, or None for the first
+            limit: Maximum number of events per page
+        
+        Returns:
+            The events of the page and the token of the next page, or None if
+            this is the last one
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        statement = AppointmentSystem.events_statement(appointment_id, cursor)
+        rows = db.scalars(statement.limit(limit + 1)).all()
+        return split_page(rows, limit, 'id')
+
+    @staticmethod
+    def events_statement(appointment_id: int, cursor: Optional[str] = None) -> Select:
+        """Build the keyset query over an appointment's events ordered by id."""
+        statement = select(AppointmentEvent).where(AppointmentEvent.appointment_id == appointment_id)
+        if cursor:
+            (after_id,) = decode_cursor(cursor, 1)
+            statement = statement.where(AppointmentEvent.id > after_id)
+        return statement.order_by(AppointmentEvent.id)
 
     @staticmethod
     def get_dentist_schedule(
@@ -184,16 +703,511 @@ class AppointmentSystem:
             end_date: End of the date range
         
         Returns:
-            List of appointments within the specified date range
+            List of appointments within the specified date range; their notes
+            are loaded only when accessed
         """
-        return db.query(Appointment).filter(
+        return db.query(Appointment).options(defer(Appointment.notes)).filter(
             and_(
                 Appointment.dentist_id == dentist_id,
                 Appointment.datetime >= start_date,
                 Appointment.datetime <= end_date,
-                Appointment.status.in_([
-                    AppointmentStatus.SCHEDULED,
-                    AppointmentStatus.CONFIRMED
-                ])
+                status_in(ACTIVE_STATUSES)
+            )
+        ).order_by(Appointment.datetime).all()
+
+    @staticmethod
+    def get_schedule_version(db: Session, dentist_id: int) -> Optional[int]:
+        """
+        Read a dentist's schedule version.
+        
+        The version changes in the same transaction as any booking or status
+        change of the dentist's appointments, so equal versions mean an
+        unchanged schedule. Only the dentists table is read.
+        
+        Args:
+            db: Database session
+            dentist_id: ID of the dentist
+        
+        Returns:
+            The current version, or None if the dentist doesn't exist
+        """
+        return db.scalar(select(Dentist.schedule_version).where(Dentist.id == dentist_id))
+
+    @staticmethod
+    def schedule_statement(
+        selectable: Any,
+        dentist_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        cursor: Optional[str] = None
+    ) -> Select:
+        """
+        Build the schedule query ordered by (datetime, id).
+
+        Args:
+            selectable: Entity or columns to select
+            dentist_id: ID of the dentist
+            start_date: Start of the date range
+            end_date: End of the date range
+            cursor: Optional token from a previous page; only later rows are selected
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        statement = select(*selectable).where(
+            Appointment.dentist_id == dentist_id,
+            Appointment.datetime >= start_date,
+            Appointment.datetime <= end_date,
+            status_in(ACTIVE_STATUSES)
+        )
+        if cursor:
+            after_datetime, after_id = decode_cursor(cursor, 2)
+            statement = statement.where(
+                tuple_(Appointment.datetime, Appointment.id) > tuple_(after_datetime, after_id)
+            )
+        return statement.order_by(Appointment.datetime, Appointment.id)
+
+    @staticmethod
+    def get_dentist_schedule_page(
+        db: Session,
+        dentist_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Appointment], Optional[str]]:
+        """
+        Retrieve one page of a dentist's schedule.
+        
+        Pages are keyed on (datetime, id), so each page is an index range scan
+        whatever its depth, and bookings made while paging do not shift rows
+        between pages.
+        
+        Args:
+            db: Database session
+            dentist_id: ID of the dentist
+            start_date: Start of the date range
+            end_date: End of the date range
+            cursor: Token returned with the previous page, or None for the first
+            limit: Maximum number of appointments per page
+        
+        Returns:
+            The appointments of the page, with their notes deferred, and the
+            token of the next page, or None if this is the last one
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        statement = AppointmentSystem.schedule_statement(
+            (Appointment,), dentist_id, start_date, end_date, cursor
+        ).options(defer(Appointment.notes))
+        rows = db.scalars(statement.limit(limit + 1)).all()
+        return split_page(rows, limit, 'datetime', 'id')
+
+    @staticmethod
+    def iter_dentist_schedule(
+        db: Session,
+        dentist_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        batch_size: int = 500
+    ) -> Iterator[RowMapping]:
+        """
+        Stream a dentist's schedule as column rows.
+        
+        Rows are fetched `batch_size` at a time through a server-side cursor
+        where the driver supports one, and no ORM objects are built, so memory
+        use does not depend on the size of the range.
+        
+        Args:
+            db: Database session
+            dentist_id: ID of the dentist
+            start_date: Start of the date range
+            end_date: End of the date range
+            batch_size: Number of rows fetched per round trip
+        
+        Returns:
+            Iterator of mappings with the SCHEDULE_COLUMNS of each appointment
+        """
+        statement = AppointmentSystem.schedule_statement(
+            SCHEDULE_COLUMNS, dentist_id, start_date, end_date
+        ).execution_options(yield_per=batch_size)
+        yield from db.execute(statement).mappings()
+
+    @staticmethod
+    def find_available_slots(
+        db: Session,
+        dentist_ids: List[int],
+        treatment_id: int,
+        date_range: Tuple[date, date],
+        step_minutes: int = 15
+    ) -> List[Dict[str, Any]]:
+        """
+        Find open appointment slots for a treatment across several dentists.
+        
+        Working windows from DentistSchedule are combined into per-day minute
+        bitmaps, booked intervals are subtracted, and slot starts long enough for
+        the treatment are extracted in bulk. Each table is queried once regardless
+        of how many dentists or days are requested.
+        
+        Args:
+            db: Database session
+            dentist_ids: IDs of the dentists to search
+            treatment_id: ID of the treatment to be scheduled
+            date_range: Inclusive (first_day, last_day) to search
+            step_minutes: Granularity of the returned slot start times
+        
+        Returns:
+            List of dictionaries with dentist_id, start and end of each free slot,
+            ordered by start time and dentist
+        
+        Raises:
+            ValueError: If the treatment doesn't exist or the range is invalid
+        """
+        first_day, last_day = date_range
+        if last_day < first_day:
+            raise ValueError("End of date range must not precede its start")
+        if step_minutes <= 0:
+            raise ValueError("Slot step must be positive")
+
+        treatment = treatment_catalog.get(db, treatment_id)
+        if not treatment:
+            raise ValueError("Treatment not found")
+        duration = treatment.duration_minutes
+
+        windows: Dict[Tuple[int, int], List[Tuple[time, time]]] = {}
+        for dentist_id, day_of_week, start_time, end_time in db.query(
+            DentistSchedule.dentist_id,
+            DentistSchedule.day_of_week,
+            DentistSchedule.start_time,
+            DentistSchedule.end_time
+        ).filter(
+            DentistSchedule.dentist_id.in_(dentist_ids),
+            DentistSchedule.is_active.is_(True)
+        ):
+            weekday = availability.weekday_index(day_of_week)
+            if weekday is not None:
+                windows.setdefault((dentist_id, weekday), []).append((start_time, end_time))
+
+        range_start = datetime.combine(first_day, time.min)
+        range_end = datetime.combine(last_day + timedelta(days=1), time.min)
+        booked: Dict[int, List[Tuple[datetime, datetime]]] = {}
+        for dentist_id, start, end in db.query(
+            Appointment.dentist_id,
+            Appointment.datetime,
+            Appointment.end_datetime
+        ).filter(
+            Appointment.dentist_id.in_(dentist_ids),
+            status_in(ACTIVE_STATUSES),
+            Appointment.datetime < range_end,
+            Appointment.end_datetime > range_start
+        ):
+            booked.setdefault(dentist_id, []).append((start, end))
+
+        slots = []
+        for offset in range((last_day - first_day).days + 1):
+            day = first_day + timedelta(days=offset)
+            midnight = datetime.combine(day, time.min)
+            for dentist_id in dentist_ids:
+                day_windows = windows.get((dentist_id, day.weekday()))
+                if not day_windows:
+                    continue
+                free = availability.working_mask(day_windows) & ~availability.booked_mask(
+                    day, booked.get(dentist_id, [])
+                )
+                for minute in availability.slot_starts(free, duration, step_minutes):
+                    start = midnight + timedelta(minutes=minute)
+                    slots.append({
+                        'dentist_id': dentist_id,
+                        'start': start,
+                        'end': start + timedelta(minutes=duration)
+                    })
+
+        slots.sort(key=lambda slot: (slot['start'], slot['dentist_id']))
+        return slots
+
+
+class AsyncAppointmentSystem:
+    """
+    Async counterparts of the AppointmentSystem operations.
+
+    Queries are awaited on an AsyncSession, so a request waiting on the database
+    does not hold a worker thread. The bitmap slot finder and the bulk batch check
+    are CPU-bound and reuse the sync implementations through run_sync on the same
+    connection.
+    """
+
+    @staticmethod
+    async def schedule_appointment(
+        db: AsyncSession,
+        patient_id: int,
+        dentist_id: int,
+        treatment_id: int,
+        datetime: datetime,
+        notes: str = "",
+        created_by_id: Optional[int] = None
+    ) -> Appointment:
+        """
+        Schedule a new appointment with conflict checking.
+
+        See AppointmentSystem.schedule_appointment.
+
+        Raises:
+            ValueError: If the time slot is not available or the treatment doesn't exist
+        """
+        async def book() -> Appointment:
+            async with async_dentist_locks(db, [dentist_id]):
+                if await AsyncAppointmentSystem.has_conflict(db, dentist_id, datetime, treatment_id):
+                    raise ValueError("Time slot is not available for the specified dentist")
+                await db.execute(schedule_version_bump([dentist_id]))
+
+                duration = (await treatment_catalog.aget(db, treatment_id)).duration_minutes
+                appointment = Appointment(
+                    patient_id=patient_id,
+                    dentist_id=dentist_id,
+                    treatment_id=treatment_id,
+                    datetime=datetime,
+                    end_datetime=datetime + timedelta(minutes=duration),
+                    notes=notes,
+                    status=AppointmentStatus.SCHEDULED,
+                    created_by_id=created_by_id
+                )
+                db.add(appointment)
+                db.add(AppointmentEvent(
+                    appointment=appointment,
+                    event_type=AppointmentEventType.CREATED,
+                    to_status=AppointmentStatus.SCHEDULED,
+                    note=notes or None,
+                    actor_id=created_by_id
+                ))
+                await db.run_sync(AppointmentSystem._commit_booking, [dentist_id])
+            return appointment
+
+        appointment = await async_with_retry(db, book)
+        await db.refresh(appointment)
+
+        appointment_index.add(
+            dentist_id,
+            appointment.datetime,
+            appointment.end_datetime,
+            appointment.id
+        )
+        return appointment
+
+    @staticmethod
+    async def schedule_appointments_bulk(
+        db: AsyncSession,
+        bookings: List[Dict[str, Any]],
+        created_by_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Schedule many appointments in a single transaction.
+
+        See AppointmentSystem.schedule_appointments_bulk. The dentists' locks are
+        awaited before the batch check runs.
+        """
+        results = AppointmentSystem._bulk_results(bookings)
+        if not bookings:
+            return results
+
+        async def book() -> List[Tuple[Tuple[int, datetime], int]]:
+            async with async_dentist_locks(db, {b['dentist_id'] for b in bookings}):
+                return await db.run_sync(
+                    AppointmentSystem._book_batch, bookings, created_by_id, results
+                )
+
+        AppointmentSystem._record_batch(bookings, results, await async_with_retry(db, book))
+        return results
+
+    @staticmethod
+    async def has_conflict(
+        db: AsyncSession,
+        dentist_id: int,
+        datetime: datetime,
+        treatment_id: int
+    ) -> bool:
+        """
+        Check for scheduling conflicts with existing appointments.
+
+        See AppointmentSystem.has_conflict.
+        """
+        treatment = await treatment_catalog.aget(db, treatment_id)
+        if not treatment:
+            raise ValueError("Treatment not found")
+
+        end_time = datetime + timedelta(minutes=treatment.duration_minutes)
+
+        return await db.run_sync(appointment_index.lookup, dentist_id, datetime, end_time)
+
+    @staticmethod
+    async def find_overlapping_appointment(
+        db: AsyncSession,
+        dentist_id: int,
+        start_time: datetime,
+        end_time: datetime
+    ) -> Optional[int]:
+        """Find an active appointment overlapping a time interval in the database."""
+        return await db.scalar(
+            select(Appointment.id).where(
+                Appointment.dentist_id == dentist_id,
+                status_in(ACTIVE_STATUSES),
+                Appointment.datetime < end_time,
+                Appointment.end_datetime > start_time
+            ).limit(1)
+        )
+
+    @staticmethod
+    async def update_appointment_status(
+        db: AsyncSession,
+        appointment_id: int,
+        new_status: AppointmentStatus,
+        notes: Optional[str] = None,
+        actor_id: Optional[int] = None
+    ) -> Appointment:
+        """
+        Update the status of an existing appointment.
+
+        See AppointmentSystem.update_appointment_status.
+        """
+        row = await db.run_sync(
+            AppointmentSystem._change_status, appointment_id, new_status, notes, actor_id
+        )
+        appointment = await db.get(Appointment, row.id, populate_existing=True)
+        AppointmentSystem._reindex_transitioned([row], new_status)
+        return appointment
+
+    @staticmethod
+    async def transition_statuses(
+        db: AsyncSession,
+        new_status: AppointmentStatus,
+        dentist_id: Optional[int] = None,
+        before: Optional[datetime] = None,
+        from_statuses: Optional[List[AppointmentStatus]] = None,
+        appointment_ids: Optional[List[int]] = None,
+        notes: Optional[str] = None,
+        actor_id: Optional[int] = None
+    ) -> List[int]:
+        """
+        Move every matching appointment to a new status in one statement.
+
+        See AppointmentSystem.transition_statuses.
+        """
+        statements = AppointmentSystem.transition_statements(
+            db.get_bind().dialect.name, new_status, dentist_id, before, from_statuses, appointment_ids
+        )
+        rows = [row for statement in statements for row in await db.execute(statement)]
+        if rows:
+            await db.execute(
+                insert(AppointmentEvent),
+                AppointmentSystem._transition_events(rows, new_status, notes, actor_id)
             )
-        ).order_by(Appointment.datetime).all()
\ No newline at end of file
+            await db.execute(schedule_version_bump({row.dentist_id for row in rows}))
+            for statement in rollup_statements(
+                db.get_bind().dialect.name, [(row.id, row.from_status) for row in rows], new_status
+            ):
+                await db.execute(statement)
+        await db.commit()
+
+        AppointmentSystem._reindex_transitioned(rows, new_status)
+        return [row.id for row in rows]
+
+    @staticmethod
+    async def get_appointment_events(
+        db: AsyncSession,
+        appointment_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[AppointmentEvent], Optional[str]]:
+        """
+        Retrieve one page of an appointment's history, oldest first.
+
+        See AppointmentSystem.get_appointment_events.
+        """
+        statement = AppointmentSystem.events_statement(appointment_id, cursor)
+        rows = (await db.scalars(statement.limit(limit + 1))).all()
+        return split_page(rows, limit, 'id')
+
+    @staticmethod
+    async def get_dentist_schedule(
+        db: AsyncSession,
+        dentist_id: int,
+        start_date: datetime,
+        end_date: datetime
+    ) -> List[Appointment]:
+        """Retrieve a dentist's active appointments within a date range, with their notes deferred."""
+        result = await db.scalars(
+            select(Appointment).options(defer(Appointment.notes)).where(
+                Appointment.dentist_id == dentist_id,
+                Appointment.datetime >= start_date,
+                Appointment.datetime <= end_date,
+                status_in(ACTIVE_STATUSES)
+            ).order_by(Appointment.datetime)
+        )
+        return list(result.all())
+
+    @staticmethod
+    async def get_schedule_version(db: AsyncSession, dentist_id: int) -> Optional[int]:
+        """Read a dentist's schedule version. See AppointmentSystem.get_schedule_version."""
+        return await db.scalar(select(Dentist.schedule_version).where(Dentist.id == dentist_id))
+
+    @staticmethod
+    async def get_dentist_schedule_page(
+        db: AsyncSession,
+        dentist_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[Appointment], Optional[str]]:
+        """
+        Retrieve one page of a dentist's schedule.
+
+        See AppointmentSystem.get_dentist_schedule_page.
+        """
+        statement = AppointmentSystem.schedule_statement(
+            (Appointment,), dentist_id, start_date, end_date, cursor
+        ).options(defer(Appointment.notes))
+        rows = (await db.scalars(statement.limit(limit + 1))).all()
+        return split_page(rows, limit, 'datetime', 'id')
+
+    @staticmethod
+    async def stream_dentist_schedule(
+        db: AsyncSession,
+        dentist_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        batch_size: int = 500
+    ) -> AsyncIterator[RowMapping]:
+        """
+        Stream a dentist's schedule as column rows.
+
+        See AppointmentSystem.iter_dentist_schedule. On asyncpg the rows come
+        from a server-side cursor.
+        """
+        statement = AppointmentSystem.schedule_statement(
+            SCHEDULE_COLUMNS, dentist_id, start_date, end_date
+        ).execution_options(yield_per=batch_size)
+        result = await db.stream(statement)
+        async for row in result.mappings():
+            yield row
+
+    @staticmethod
+    async def find_available_slots(
+        db: AsyncSession,
+        dentist_ids: List[int],
+        treatment_id: int,
+        date_range: Tuple[date, date],
+        step_minutes: int = 15
+    ) -> List[Dict[str, Any]]:
+        """
+        Find open appointment slots for a treatment across several dentists.
+
+        See AppointmentSystem.find_available_slots.
+        """
+        return await db.run_sync(
+            AppointmentSystem.find_available_slots,
+            dentist_ids,
+            treatment_id,
+            date_range,
+            step_minutes
+        )
@@ -0,0 +1,90 @@
+"""
+Availability Bitmaps
+
+This module provides the minute-level arithmetic behind free-slot search.
+Each dentist day is represented as an integer bitmap where bit `m` is set when
+minute `m` after midnight is free. Working windows are OR-ed in, booked
+intervals are masked out, and the starts of runs long enough for a treatment
+are found with a handful of shifts instead of a per-slot scan.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+WEEKDAY_NAMES = (
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"
+)
+
+
+def weekday_index(day_of_week: str) -> Optional[int]:
+    """
+    Map a DentistSchedule.day_of_week value to date.weekday() numbering.
+
+    Accepts full or three-letter English names in any case.
+    """
+    key = day_of_week.strip().lower()
+    for index, name in enumerate(WEEKDAY_NAMES):
+        if key in (name, name[:3]):
+            return index
+    return None
+
+
+def minute_of_day(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def span_mask(start_minute: int, end_minute: int) -> int:
+    """Bitmap with minutes [start_minute, end_minute) set."""
+    start_minute = max(start_minute, 0)
+    end_minute = min(end_minute, MINUTES_PER_DAY)
+    if end_minute <= start_minute:
+        return 0
+    return ((1 << (end_minute - start_minute)) - 1) << start_minute
+
+
+def working_mask(windows: Iterable[Tuple[time, time]]) -> int:
+    """Bitmap of the minutes covered by a set of (start_time, end_time) windows."""
+    mask = 0
+    for start_time, end_time in windows:
+        mask |= span_mask(minute_of_day(start_time), minute_of_day(end_time))
+    return mask
+
+
+def booked_mask(day: date, intervals: Iterable[Tuple[datetime, datetime]]) -> int:
+    """Bitmap of the minutes of `day` covered by booked intervals, clipped to the day."""
+    midnight = datetime.combine(day, time.min)
+    mask = 0
+    for start, end in intervals:
+        start_minute = (start - midnight) // timedelta(minutes=1)
+        end_minute = -((midnight - end) // timedelta(minutes=1))
+        mask |= span_mask(start_minute, end_minute)
+    return mask
+
+
+def run_starts(free: int, length: int) -> int:
+    """
+    Bitmap of minutes that start a run of at least `length` free minutes.
+
+    Runs are found by repeatedly AND-ing the bitmap with a shifted copy of
+    itself, doubling the covered length each step.
+    """
+    if length <= 0:
+        return free
+    starts = free
+    covered = 1
+    while covered < length:
+        shift = min(covered, length - covered)
+        starts &= starts >> shift
+        covered += shift
+    return starts
+
+
+def slot_starts(free: int, length: int, step: int) -> List[int]:
+    """Minutes on a `step` grid at which `length` free minutes begin."""
+    starts = run_starts(free, length)
+    return [
+        minute for minute in range(0, MINUTES_PER_DAY, step)
+        if starts >> minute & 1
+    ]
@@ -0,0 +1,171 @@
+"""
+Per-Dentist Booking Locks
+
+This module serializes bookings for the same dentist while letting bookings for
+different dentists proceed in parallel. On PostgreSQL a transaction-scoped
+advisory lock keyed by dentist_id is taken, so the serialization holds across
+every worker process and is released by the commit or rollback that ends the
+booking. Other databases fall back to process-local locks, which the sync and
+async helpers share, so a sync and an async booking for the same dentist in
+one process exclude each other too. Each helper has an async counterpart for
+AsyncSession.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, TypeVar
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# First key of the two-key advisory lock, reserving a namespace for bookings
+ADVISORY_LOCK_NAMESPACE = 4021
+
+# How often a booking is attempted when the database reports a transient failure
+MAX_BOOKING_ATTEMPTS = 5
+
+# Upper bound of the first backoff; doubled after every failed attempt
+RETRY_BACKOFF_SECONDS = 0.02
+
+# SQLSTATEs for serialization failure and deadlock
+RETRYABLE_SQLSTATES = ("40001", "40P01")
+
+# How long an async booking waits before trying a busy process-local lock again
+ASYNC_LOCK_POLL_SECONDS = 0.005
+
+T = TypeVar("T")
+
+_process_locks: Dict[int, threading.Lock] = {}
+_process_locks_guard = threading.Lock()
+
+ADVISORY_LOCK_SQL = text("SELECT pg_advisory_xact_lock(:namespace, :dentist_id)")
+
+
+def _process_lock(dentist_id: int) -> threading.Lock:
+    with _process_locks_guard:
+        lock = _process_locks.get(dentist_id)
+        if lock is None:
+            lock = _process_locks[dentist_id] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def dentist_locks(db: Session, dentist_ids: Iterable[int]) -> Iterator[None]:
+    """
+    Hold the booking locks of several dentists.
+
+    Locks are always taken in ascending dentist_id order so that two bookings
+    touching overlapping sets of dentists cannot deadlock. The body must end the
+    transaction before leaving the block, since on PostgreSQL that is what
+    releases the advisory locks; if the body raises, the transaction is rolled
+    back here.
+
+    Args:
+        db: Database session whose transaction will hold the locks
+        dentist_ids: IDs of the dentists to lock
+    """
+    ordered = sorted(set(dentist_ids))
+    held = []
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            for dentist_id in ordered:
+                db.execute(
+                    ADVISORY_LOCK_SQL,
+                    {"namespace": ADVISORY_LOCK_NAMESPACE, "dentist_id": dentist_id}
+                )
+        else:
+            for dentist_id in ordered:
+                lock = _process_lock(dentist_id)
+                lock.acquire()
+                held.append(lock)
+        yield
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        for lock in reversed(held):
+            lock.release()
+
+
+@asynccontextmanager
+async def async_dentist_locks(db: AsyncSession, dentist_ids: Iterable[int]) -> AsyncIterator[None]:
+    """
+    Async counterpart of dentist_locks.
+
+    Outside PostgreSQL the process-local locks of dentist_locks are taken
+    without blocking: while a lock is busy the request sleeps and tries again,
+    so waiting suspends it instead of blocking the event loop, and no lock is
+    tied to one event loop.
+    """
+    ordered = sorted(set(dentist_ids))
+    held = []
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            for dentist_id in ordered:
+                await db.execute(
+                    ADVISORY_LOCK_SQL,
+                    {"namespace": ADVISORY_LOCK_NAMESPACE, "dentist_id": dentist_id}
+                )
+        else:
+            for dentist_id in ordered:
+                lock = _process_lock(dentist_id)
+                while not lock.acquire(blocking=False):
+                    await asyncio.sleep(ASYNC_LOCK_POLL_SECONDS)
+                held.append(lock)
+        yield
+    except BaseException:
+        await db.rollback()
+        raise
+    finally:
+        for lock in reversed(held):
+            lock.release()
+
+
+def is_retryable(error: DBAPIError) -> bool:
+    """Return True for transient failures that a fresh transaction may not hit."""
+    if getattr(error.orig, "pgcode", None) in RETRYABLE_SQLSTATES:
+        return True
+    return "database is locked" in str(error.orig)
+
+
+def with_retry(db: Session, operation: Callable[[], T]) -> T:
+    """
+    Run a booking operation, retrying it on serialization failures.
+
+    The transaction is rolled back before every new attempt and the wait between
+    attempts grows exponentially with random jitter. Errors that are not
+    transient, and any error of the final attempt, reach the caller.
+
+    Args:
+        db: Database session used by the operation
+        operation: Callable performing the whole booking, including its commit
+
+    Returns:
+        Whatever the operation returns
+    """
+    for attempt in range(1, MAX_BOOKING_ATTEMPTS):
+        try:
+            return operation()
+        except DBAPIError as e:
+            db.rollback()
+            if not is_retryable(e):
+                raise
+            time.sleep(random.uniform(0, RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)))
+    return operation()
+
+
+async def async_with_retry(db: AsyncSession, operation: Callable[[], Awaitable[T]]) -> T:
+    """Async counterpart of with_retry; backs off without blocking the event loop."""
+    for attempt in range(1, MAX_BOOKING_ATTEMPTS):
+        try:
+            return await operation()
+        except DBAPIError as e:
+            await db.rollback()
+            if not is_retryable(e):
+                raise
+            await asyncio.sleep(random.uniform(0, RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)))
+    return await operation()
@@ -0,0 +1,200 @@
+"""
+Appointment Interval Index
+
+This module keeps an in-process index of booked appointment intervals for each
+dentist, so that conflict detection can be answered without scanning the
+appointments table on every booking attempt. Intervals are grouped into day
+windows which are loaded lazily from the database and kept up to date as
+appointments are created or change status.
+"""
+
+import bisect
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.appointments import ACTIVE_STATUSES, Appointment, status_in
+
+# Longest appointment the index expects; bounds how far back a window is consulted
+MAX_APPOINTMENT_LENGTH = timedelta(days=1)
+
+
+class IntervalSet:
+    """
+    Booked intervals of one dentist, such as those starting on a single day.
+
+    Active appointments of a dentist never overlap, which the database
+    enforces, so intervals sorted by start time are sorted by end time too. An
+    overlap query is a single binary search, and add and discard are a binary
+    search plus one list insert or delete. Intervals the index should not
+    hold, such as another process's cancelled booking, can hide an overlap
+    until their window reloads; the database constraint still rejects it.
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[datetime, datetime, int]]):
+        self.loaded_at = time.monotonic()
+        ordered = sorted(intervals)
+        self.starts: List[datetime] = [start for start, _, _ in ordered]
+        self.ends: List[datetime] = [end for _, end, _ in ordered]
+        self.ids: List[int] = [appointment_id for _, _, appointment_id in ordered]
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        """Return True if any interval in the window intersects [start, end)."""
+        i = bisect.bisect_left(self.starts, end)
+        return i > 0 and self.ends[i - 1] > start
+
+    def add(self, start: datetime, end: datetime, appointment_id: int) -> None:
+        if self._position(start, appointment_id) is not None:
+            return
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, appointment_id)
+
+    def discard(self, start: datetime, appointment_id: int) -> None:
+        i = self._position(start, appointment_id)
+        if i is not None:
+            del self.starts[i], self.ends[i], self.ids[i]
+
+    def _position(self, start: datetime, appointment_id: int) -> Optional[int]:
+        """Index of an appointment among the intervals sharing its start, or None."""
+        i = bisect.bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            if self.ids[i] == appointment_id:
+                return i
+            i += 1
+        return None
+
+
+class AppointmentIntervalIndex:
+    """
+    Process-local index of active appointment intervals per dentist.
+
+    Windows are keyed by (dentist_id, day). A window is loaded from the database
+    the first time it is needed and reloaded once it is older than `ttl_seconds`,
+    which bounds how long changes made by other processes can go unnoticed.
+    Changes made through this process are applied immediately via `add` and
+    `discard`.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0):
+        self.ttl_seconds = ttl_seconds
+        self._windows: Dict[Tuple[int, date], IntervalSet] = {}
+        self._lock = threading.Lock()
+
+    def lookup(
+        self,
+        db: Session,
+        dentist_id: int,
+        start: datetime,
+        end: datetime
+    ) -> bool:
+        """
+        Check whether [start, end) overlaps any active appointment of a dentist.
+
+        Args:
+            db: Database session used to load missing or expired windows
+            dentist_id: ID of the dentist to check
+            start: Start of the proposed interval
+            end: End of the proposed interval
+
+        Returns:
+            True if the loaded windows hold an overlapping appointment
+        """
+        windows = self._windows_for(db, dentist_id, self._days_for(start, end))
+        # add and discard mutate windows in place, so they are read under the lock
+        with self._lock:
+            return any(window.overlaps(start, end) for window in windows)
+
+    def add(
+        self,
+        dentist_id: int,
+        start: datetime,
+        end: datetime,
+        appointment_id: int
+    ) -> None:
+        """Record a booked interval if its day window is currently loaded."""
+        with self._lock:
+            window = self._windows.get((dentist_id, start.date()))
+            if window is not None:
+                window.add(start, end, appointment_id)
+
+    def discard(self, dentist_id: int, start: datetime, appointment_id: int) -> None:
+        """Remove an appointment from its day window if that window is loaded."""
+        with self._lock:
+            window = self._windows.get((dentist_id, start.date()))
+            if window is not None:
+                window.discard(start, appointment_id)
+
+    def invalidate(self, dentist_id: Optional[int] = None) -> None:
+        """Drop loaded windows for one dentist, or for all dentists."""
+        with self._lock:
+            if dentist_id is None:
+                self._windows.clear()
+            else:
+                for key in [k for k in self._windows if k[0] == dentist_id]:
+                    del self._windows[key]
+
+    def clear(self) -> None:
+        """Drop every loaded window."""
+        self.invalidate()
+
+    @staticmethod
+    def _days_for(start: datetime, end: datetime) -> List[date]:
+        first = (start - MAX_APPOINTMENT_LENGTH).date()
+        last = end.date()
+        return [first + timedelta(days=n) for n in range((last - first).days + 1)]
+
+    def _windows_for(
+        self,
+        db: Session,
+        dentist_id: int,
+        days: List[date]
+    ) -> List[IntervalSet]:
+        now = time.monotonic()
+        with self._lock:
+            cached = {
+                day: self._windows.get((dentist_id, day))
+                for day in days
+            }
+        missing = [
+            day for day, window in cached.items()
+            if window is None or now - window.loaded_at > self.ttl_seconds
+        ]
+        if missing:
+            loaded = self._load(db, dentist_id, missing[0], missing[-1])
+            with self._lock:
+                for day in missing:
+                    window = IntervalSet(loaded.get(day, []))
+                    self._windows[(dentist_id, day)] = window
+                    cached[day] = window
+        return list(cached.values())
+
+    @staticmethod
+    def _load(
+        db: Session,
+        dentist_id: int,
+        first_day: date,
+        last_day: date
+    ) -> Dict[date, List[Tuple[datetime, datetime, int]]]:
+        """Read active intervals for a run of days in a single query."""
+        rows = db.query(
+            Appointment.id,
+            Appointment.datetime,
+            Appointment.end_datetime
+        ).filter(
+            Appointment.dentist_id == dentist_id,
+            status_in(ACTIVE_STATUSES),
+            Appointment.datetime >= datetime.combine(first_day, datetime.min.time()),
+            Appointment.datetime < datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+        ).all()
+
+        by_day: Dict[date, List[Tuple[datetime, datetime, int]]] = {}
+        for appointment_id, start, end in rows:
+            by_day.setdefault(start.date(), []).append((start, end, appointment_id))
+        return by_day
+
+
+# Shared index used by the appointment service
+appointment_index = AppointmentIntervalIndex()
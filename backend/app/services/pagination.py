@@ -0,0 +1,70 @@
+"""
+Keyset Pagination Helpers
+
+This module turns the sort key of the last row on a page into an opaque
+continuation token and back. Pages are then fetched with a row-value
+comparison on the sort key instead of an OFFSET, so every page costs the same
+and rows inserted mid-browse do not shift later pages.
+"""
+
+import base64
+import json
+from operator import attrgetter
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of a row as a URL-safe token."""
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, arity: int) -> List[Any]:
+    """
+    Decode a token produced by encode_cursor.
+
+    Args:
+        token: Continuation token received from a client
+        arity: Number of values the sort key is expected to have
+
+    Returns:
+        The sort key values, with datetimes restored
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != arity:
+            raise ValueError
+        return [
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in payload
+        ]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+
+def split_page(rows: Sequence[Any], limit: int, *key: str) -> Tuple[List[Any], Optional[str]]:
+    """
+    Split rows fetched with LIMIT limit + 1 into a page and the next page's token.
+
+    Args:
+        rows: Rows in sort order, at most limit + 1 of them
+        limit: Page size
+        key: Attribute names forming the sort key; dotted paths reach related objects
+
+    Returns:
+        The page and the token for the page after it, or None on the last page
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor(*(attrgetter(name)(last) for name in key))
@@ -0,0 +1,253 @@
+"""
+Patient Import
+
+This module bulk-loads patients migrated from another clinic system. Records
+are read from CSV or NDJSON as a stream and processed in chunks: each chunk is
+validated, deduplicated on email against itself and the database, and written
+as one multi-row INSERT into users and one into patients (on PostgreSQL, a
+COPY into a staging table followed by two set-based INSERTs), then committed.
+Memory is bounded by the chunk size whatever the size of the input, and
+records that cannot be imported are written to a rejects stream with the
+reason.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from app.models.patients import Patient
+from app.models.users import Role, User, normalize_phone, user_roles
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Imported accounts cannot log in until a password is set; "!" never verifies
+UNUSABLE_PASSWORD = "!"
+
+USER_FIELDS = ("email", "full_name", "phone_number")
+PATIENT_FIELDS = ("medical_history", "allergies", "emergency_contact", "notes")
+IMPORT_FIELDS = USER_FIELDS + PATIENT_FIELDS
+
+STAGING_COLUMNS = ("email", "full_name", "phone_number", "phone_digits") + PATIENT_FIELDS
+
+
+class ImportReport(NamedTuple):
+    """Outcome of an import."""
+    imported: int
+    rejected: int
+
+
+def read_records(stream: TextIO, format: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Read (line number, record) pairs from a CSV or NDJSON stream.
+
+    CSV input needs a header row naming the columns. NDJSON lines that are
+    not valid JSON are yielded as the raw line so the import can reject them.
+
+    Raises:
+        ValueError: If the format is not "csv" or "ndjson"
+    """
+    if format == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif format == "ndjson":
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError:
+                yield line_number, line.rstrip("\n")
+    else:
+        raise ValueError(f"Unsupported import format: {format}")
+
+
+def clean_record(record: Any) -> Tuple[Optional[Dict[str, Optional[str]]], Optional[str]]:
+    """
+    Validate a raw record and normalize its fields.
+
+    Returns:
+        The cleaned record and None, or None and the reason it is rejected
+    """
+    if not isinstance(record, dict):
+        return None, "malformed record"
+    cleaned = {}
+    for field in IMPORT_FIELDS:
+        value = record.get(field)
+        value = str(value).strip() if value is not None else ""
+        cleaned[field] = value or None
+    if not cleaned["full_name"]:
+        return None, "missing full_name"
+    if not cleaned["email"]:
+        return None, "missing email"
+    cleaned["email"] = cleaned["email"].lower()
+    local, _, domain = cleaned["email"].partition("@")
+    if not local or "." not in domain:
+        return None, "invalid email"
+    cleaned["phone_digits"] = normalize_phone(cleaned["phone_number"])
+    return cleaned, None
+
+
+class PatientImport:
+    """Streams patient records into the database in chunks."""
+
+    @staticmethod
+    def import_patients(
+        db: Session,
+        records: Iterable[Tuple[int, Any]],
+        rejects: Optional[TextIO] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> ImportReport:
+        """
+        Create a user and a patient for every valid record.
+
+        Each chunk is committed on its own, so an interrupted import keeps the
+        chunks already loaded and can be rerun: their emails are then rejected
+        as already registered. Imported users get the "patient" role if it
+        exists and an unusable password.
+
+        Args:
+            db: Database session
+            records: (line number, record) pairs, e.g. from read_records
+            rejects: Optional text stream receiving one JSON line per rejected record
+            chunk_size: Number of records written per transaction
+
+        Returns:
+            The number of imported and rejected records
+        """
+        patient_role_id = db.scalar(select(Role.id).where(Role.name == "patient"))
+        copy = db.get_bind().dialect.driver == "psycopg2"
+        imported = rejected = 0
+        records = iter(records)
+
+        while chunk := list(islice(records, chunk_size)):
+            rows, chunk_rejects = PatientImport._prepare_chunk(db, chunk)
+            if rows:
+                if copy:
+                    user_ids = PatientImport._copy_chunk(db, rows)
+                else:
+                    user_ids = PatientImport._insert_chunk(db, rows)
+                if patient_role_id is not None:
+                    db.execute(
+                        insert(user_roles),
+                        [{"user_id": user_id, "role_id": patient_role_id} for user_id in user_ids]
+                    )
+                db.commit()
+            imported += len(rows)
+            rejected += len(chunk_rejects)
+            if rejects is not None:
+                for line_number, record, reason in chunk_rejects:
+                    rejects.write(json.dumps(
+                        {"line": line_number, "reason": reason, "record": record},
+                        default=str
+                    ) + "\n")
+
+        return ImportReport(imported, rejected)
+
+    @staticmethod
+    def _prepare_chunk(
+        db: Session,
+        chunk: List[Tuple[int, Any]]
+    ) -> Tuple[List[Dict[str, Optional[str]]], List[Tuple[int, Any, str]]]:
+        """Split a chunk into rows to insert and (line, record, reason) rejects."""
+        rows, chunk_rejects, seen = [], [], set()
+        for line_number, record in chunk:
+            cleaned, reason = clean_record(record)
+            if cleaned is not None and cleaned["email"] in seen:
+                reason = "duplicate email"
+            if reason:
+                chunk_rejects.append((line_number, record, reason))
+                continue
+            seen.add(cleaned["email"])
+            rows.append((line_number, record, cleaned))
+
+        # Earlier chunks are committed, so this also catches duplicates across
+        # chunks; stored emails may differ in case from the lowercased ones
+        existing = set(db.scalars(
+            select(func.lower(User.email)).where(func.lower(User.email).in_(seen))
+        ))
+        for line_number, record, cleaned in rows:
+            if cleaned["email"] in existing:
+                chunk_rejects.append((line_number, record, "email already registered"))
+        chunk_rejects.sort(key=lambda reject: reject[0])
+        return [cleaned for _, _, cleaned in rows if cleaned["email"] not in existing], chunk_rejects
+
+    @staticmethod
+    def _insert_chunk(db: Session, rows: List[Dict[str, Optional[str]]]) -> List[int]:
+        """Insert a chunk with one multi-row INSERT per table; returns the new user ids."""
+        now = datetime.utcnow()
+        user_ids = db.execute(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [
+                {
+                    "email": row["email"],
+                    "full_name": row["full_name"],
+                    "phone_number": row["phone_number"],
+                    # Core inserts bypass User's validator, so set the digits here
+                    "phone_digits": row["phone_digits"],
+                    "hashed_password": UNUSABLE_PASSWORD,
+                    "is_active": True,
+                    "created_at": now,
+                    "updated_at": now
+                }
+                for row in rows
+            ]
+        ).scalars().all()
+        db.execute(
+            insert(Patient),
+            [
+                {
+                    "user_id": user_id,
+                    "under_treatment": False,
+                    "created_at": now,
+                    "updated_at": now,
+                    **{field: row[field] for field in PATIENT_FIELDS}
+                }
+                for user_id, row in zip(user_ids, rows)
+            ]
+        )
+        return user_ids
+
+    @staticmethod
+    def _copy_chunk(db: Session, rows: List[Dict[str, Optional[str]]]) -> List[int]:
+        """COPY a chunk into a staging table and insert from it (PostgreSQL)."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # COPY reads unquoted empty fields as NULL
+            writer.writerow(["" if row[c] is None else row[c] for c in STAGING_COLUMNS])
+        buffer.seek(0)
+
+        columns = ", ".join(STAGING_COLUMNS)
+        patient_columns = ", ".join(PATIENT_FIELDS)
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.execute(
+                "CREATE TEMP TABLE patient_import_staging "
+                f"({', '.join(f'{c} text' for c in STAGING_COLUMNS)}) ON COMMIT DROP"
+            )
+            cursor.copy_expert(
+                f"COPY patient_import_staging ({columns}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+            cursor.execute(
+                "WITH new_users AS ("
+                " INSERT INTO users (email, full_name, phone_number, phone_digits,"
+                " hashed_password, is_active, created_at, updated_at)"
+                " SELECT email, full_name, phone_number, phone_digits, %(password)s, true,"
+                " now() at time zone 'utc', now() at time zone 'utc'"
+                " FROM patient_import_staging RETURNING id, email"
+                f") INSERT INTO patients (user_id, under_treatment, created_at, updated_at, {patient_columns})"
+                " SELECT new_users.id, false, now() at time zone 'utc', now() at time zone 'utc',"
+                f" {', '.join(f's.{c}' for c in PATIENT_FIELDS)}"
+                " FROM new_users JOIN patient_import_staging s USING (email)"
+                " RETURNING user_id",
+                {"password": UNUSABLE_PASSWORD}
+            )
+            return [user_id for (user_id,) in cursor.fetchall()]
+        finally:
+            cursor.close()
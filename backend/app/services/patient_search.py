@@ -0,0 +1,98 @@
+"""
+Patient Search
+
+This module builds ranked patient search queries that an index can serve.
+Terms that look like a phone number are matched against the digits-only
+phone column, exactly or by prefix. Other terms go to a text search over
+names and emails: on PostgreSQL, pg_trgm GIN indexes answer substring and
+similarity matches and similarity provides the ranking; on SQLite, an FTS5
+trigram table answers substring matches ranked by bm25.
+"""
+
+import re
+from typing import Optional
+from sqlalchemy import Integer, Select, case, column, func, or_, select, table, text
+from app.models.patients import Patient
+from app.models.users import USER_SEARCH_FTS, User, normalize_phone
+
+# Shortest term the trigram indexes can serve; shorter ones fall back to LIKE
+MIN_TRIGRAM_LENGTH = 3
+
+# Shortest digit string treated as a phone number
+MIN_PHONE_DIGITS = 3
+
+PHONE_TERM = re.compile(r"^[\d\s()+.\-]+$")
+
+users_fts = table(USER_SEARCH_FTS, column("rowid", Integer), column("rank"))
+
+
+def phone_digits(search_term: str) -> Optional[str]:
+    """Digits of a term made only of phone number characters, or None."""
+    if not PHONE_TERM.match(search_term):
+        return None
+    digits = normalize_phone(search_term)
+    return digits if digits and len(digits) >= MIN_PHONE_DIGITS else None
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so a term is matched literally (escape character '\\')."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_statement(dialect_name: str, search_term: str, ranked: bool = True) -> Select:
+    """
+    Build a query for patients matching a search term, best matches first.
+
+    Ties are broken by (full_name, user id), so the order is total; a patient
+    has one user, and ix_users_full_name_id serves that order.
+
+    Args:
+        dialect_name: Name of the database dialect the query will run on
+        search_term: Text typed into the search box
+        ranked: If False, order by (full_name, user id) only, for keyset paging
+
+    Returns:
+        Select of Patient rows in rank order
+    """
+    term = search_term.strip()
+    base = select(Patient).join(User, Patient.user_id == User.id)
+    tiebreak = (User.full_name, User.id)
+
+    def ordered(statement, *rank):
+        return statement.order_by(*(rank if ranked else ()), *tiebreak)
+
+    digits = phone_digits(term)
+    if digits:
+        # Prefix as a range so a plain btree index serves it under any collation
+        return ordered(
+            base.where(User.phone_digits >= digits, User.phone_digits < digits + ":"),
+            case((User.phone_digits == digits, 0), else_=1)
+        )
+
+    pattern = f"%{escape_like(term)}%"
+    substring = or_(
+        User.full_name.ilike(pattern, escape="\\"),
+        User.email.ilike(pattern, escape="\\")
+    )
+
+    if dialect_name == "postgresql":
+        score = func.greatest(
+            func.similarity(User.full_name, term),
+            func.similarity(User.email, term)
+        )
+        matches = substring
+        if len(term) >= MIN_TRIGRAM_LENGTH:
+            # "%" is pg_trgm's similarity operator; it also catches misspellings
+            matches = or_(substring, User.full_name.op("%")(term), User.email.op("%")(term))
+        return ordered(base.where(matches), score.desc())
+
+    if dialect_name == "sqlite" and len(term) >= MIN_TRIGRAM_LENGTH:
+        phrase = '"' + term.replace('"', '""') + '"'
+        return ordered(
+            base.join(users_fts, users_fts.c.rowid == User.id).where(
+                text(f"{USER_SEARCH_FTS} MATCH :phrase").bindparams(phrase=phrase)
+            ),
+            users_fts.c.rank
+        )
+
+    return ordered(base.where(substring))
@@ -3,13 +3,39 @@ Patient Management Service
 
 This module provides the core functionality for managing patients in the dental clinic system.
 It handles patient registration, search, and profile management.
+Patient listings are paged by keyset on (full_name, user id) with opaque
+continuation tokens, and report a capped total instead of a full COUNT(*).
+AsyncPatientManagement offers the same operations over an AsyncSession for the API.
 """
 
-from typing import List
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from models.patients import Patient
-from models.users import User
+import warnings
+from typing import List, Optional, Tuple
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager, joinedload, raiseload, selectinload
+from app.models.appointments import Appointment
+from app.models.dentists import Dentist
+from app.models.patients import Patient
+from app.models.staff import Staff
+from app.models.users import User
+from app.services.pagination import decode_cursor, split_page
+from app.services.patient_search import search_statement
+
+# Listings count matching patients up to this many, then report "cap+"
+TOTAL_COUNT_CAP = 1000
+
+
+def search_page(statement: Select, page: int, per_page: int) -> Select:
+    """Apply search_patients' deprecated OFFSET paging, warning for pages after the first."""
+    if page != 1:
+        warnings.warn(
+            "search_patients(page=...) pages by OFFSET and is deprecated; "
+            "use list_patients(search_term=..., cursor=...) to page through matches",
+            DeprecationWarning,
+            stacklevel=3
+        )
+    return statement.offset((page - 1) * per_page).limit(per_page)
+
 
 class PatientManagement:
     """Handles all patient-related operations in the dental clinic system."""
@@ -57,20 +83,231 @@ class PatientManagement:
         """
         Search for patients using various criteria.
         
+        Phone-like terms match the digits of patients' phone numbers exactly or
+        by prefix; other terms match names and emails by substring, and on
+        PostgreSQL also by trigram similarity. Results are ranked by relevance
+        and every variant is served by an index (see app.services.patient_search).
+        
+        Relevance ranking has no stable key to page on, so this returns the
+        best matches only. Paging with `page` is deprecated: it skips rows with
+        OFFSET, which costs more the deeper the page and shifts when patients
+        are added. Use list_patients with the same search term, which pages by
+        cursor in name order.
+        
         Args:
             db: Database session
             search_term: Search string to match against patient records
-            page: Page number for pagination
-            per_page: Number of results per page
+            page: Deprecated; page number for OFFSET paging
+            per_page: Number of results to return
         
         Returns:
-            List of matching Patient objects
+            List of matching Patient objects, best matches first
+        """
+        statement = search_statement(db.get_bind().dialect.name, search_term)
+        return db.scalars(search_page(statement, page, per_page)).all()
+
+    @staticmethod
+    def listing_statement(
+        dialect_name: str,
+        search_term: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> Select:
         """
-        query = db.query(Patient).join(User).filter(
-            or_(
-                User.full_name.ilike(f"%{search_term}%"),
-                User.email.ilike(f"%{search_term}%"),
-                User.phone_number.ilike(f"%{search_term}%")
+        Build the patient listing query ordered by (full_name, user id).
+
+        Each patient has its own user, so the key is unique per patient, and
+        ix_users_full_name_id serves both the order and the cursor seek.
+
+        Args:
+            dialect_name: Name of the database dialect the query will run on
+            search_term: Optional filter, matched as in search_patients
+            cursor: Optional token from a previous page; only later rows are selected
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        if search_term and search_term.strip():
+            statement = search_statement(dialect_name, search_term, ranked=False)
+        else:
+            statement = select(Patient).join(User, Patient.user_id == User.id).order_by(
+                User.full_name, User.id
             )
+        if cursor:
+            after_name, after_id = decode_cursor(cursor, 2)
+            statement = statement.where(
+                tuple_(User.full_name, User.id) > tuple_(after_name, after_id)
+            )
+        return statement.options(contains_eager(Patient.user))
+
+    @staticmethod
+    def count_statement(
+        dialect_name: str,
+        search_term: Optional[str] = None,
+        cap: int = TOTAL_COUNT_CAP
+    ) -> Select:
+        """Count the patients a listing matches, stopping after cap + 1 of them."""
+        matches = PatientManagement.listing_statement(dialect_name, search_term)
+        capped = matches.with_only_columns(Patient.id).order_by(None).limit(cap + 1)
+        return select(func.count()).select_from(capped.subquery())
+
+    @staticmethod
+    def list_patients(
+        db: Session,
+        search_term: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[Patient], Optional[str]]:
+        """
+        Retrieve one page of patients in name order.
+        
+        Pages are keyed on (full_name, user id) rather than an offset, so
+        deep pages cost the same as the first and patients registered while
+        browsing do not shift rows between pages.
+        
+        Args:
+            db: Database session
+            search_term: Optional filter, matched as in search_patients
+            cursor: Token returned with the previous page, or None for the first
+            limit: Maximum number of patients per page
+        
+        Returns:
+            The patients of the page, with their users loaded, and the token of
+            the next page, or None if this is the last one
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        statement = PatientManagement.listing_statement(
+            db.get_bind().dialect.name, search_term, cursor
         )
-        return query.offset((page - 1) * per_page).limit(per_page).all()
\ No newline at end of file
+        rows = db.scalars(statement.limit(limit + 1)).all()
+        return split_page(rows, limit, 'user.full_name', 'user.id')
+
+    @staticmethod
+    def count_patients(
+        db: Session,
+        search_term: Optional[str] = None,
+        cap: int = TOTAL_COUNT_CAP
+    ) -> Tuple[int, bool]:
+        """
+        Count the patients a listing matches, up to a cap.
+        
+        The count stops after cap + 1 rows, so it stays cheap however many
+        patients match; the UI shows "1,000+" when the cap is exceeded.
+        
+        Args:
+            db: Database session
+            search_term: Optional filter, matched as in search_patients
+            cap: Largest total reported exactly
+        
+        Returns:
+            The total, capped at cap, and whether it is exact
+        """
+        statement = PatientManagement.count_statement(db.get_bind().dialect.name, search_term, cap)
+        total = db.scalar(statement)
+        return min(total, cap), total <= cap
+
+
+    @staticmethod
+    def chart_statement(patient_id: int) -> Select:
+        """
+        Build the query loading a patient's chart in three round trips.
+
+        The patient comes with its user; treatments and appointments follow in
+        one IN query each, the appointments joined to their treatment and to
+        their dentist's staff user for the name. Any other relationship raises
+        instead of lazy loading, so rendering cannot fall back to N+1 queries.
+        """
+        return select(Patient).where(Patient.id == patient_id).options(
+            joinedload(Patient.user),
+            selectinload(Patient.treatments),
+            selectinload(Patient.appointments).options(
+                joinedload(Appointment.treatment),
+                joinedload(Appointment.dentist).joinedload(Dentist.staff).joinedload(Staff.user)
+            ),
+            raiseload("*")
+        )
+
+    @staticmethod
+    def get_patient_chart(db: Session, patient_id: int) -> Optional[Patient]:
+        """
+        Retrieve a patient with everything its chart shows.
+        
+        The query count is fixed whatever the number of appointments.
+        
+        Args:
+            db: Database session
+            patient_id: ID of the patient
+        
+        Returns:
+            The patient with user, treatments and appointments (with treatment
+            and dentist) loaded, or None if it does not exist
+        """
+        return db.scalar(PatientManagement.chart_statement(patient_id))
+
+
+class AsyncPatientManagement:
+    """Async counterparts of the PatientManagement operations."""
+
+    @staticmethod
+    async def register_patient(
+        db: AsyncSession,
+        user_id: int,
+        medical_history: str = "",
+        allergies: str = "",
+        emergency_contact: str = "",
+    ) -> Patient:
+        """Register a new patient in the system. See PatientManagement.register_patient."""
+        patient = Patient(
+            user_id=user_id,
+            medical_history=medical_history,
+            allergies=allergies,
+            emergency_contact=emergency_contact,
+            under_treatment=False
+        )
+        db.add(patient)
+        await db.commit()
+        await db.refresh(patient)
+        return patient
+
+    @staticmethod
+    async def search_patients(
+        db: AsyncSession,
+        search_term: str,
+        page: int = 1,
+        per_page: int = 20
+    ) -> List[Patient]:
+        """Search for patients using various criteria. See PatientManagement.search_patients."""
+        statement = search_statement(db.get_bind().dialect.name, search_term)
+        result = await db.scalars(search_page(statement, page, per_page))
+        return list(result.all())
+
+    @staticmethod
+    async def list_patients(
+        db: AsyncSession,
+        search_term: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[Patient], Optional[str]]:
+        """Retrieve one page of patients in name order. See PatientManagement.list_patients."""
+        statement = PatientManagement.listing_statement(
+            db.get_bind().dialect.name, search_term, cursor
+        )
+        rows = (await db.scalars(statement.limit(limit + 1))).all()
+        return split_page(rows, limit, 'user.full_name', 'user.id')
+
+    @staticmethod
+    async def count_patients(
+        db: AsyncSession,
+        search_term: Optional[str] = None,
+        cap: int = TOTAL_COUNT_CAP
+    ) -> Tuple[int, bool]:
+        """Count the patients a listing matches, up to a cap. See PatientManagement.count_patients."""
+        statement = PatientManagement.count_statement(db.get_bind().dialect.name, search_term, cap)
+        total = await db.scalar(statement)
+        return min(total, cap), total <= cap
+
+    @staticmethod
+    async def get_patient_chart(db: AsyncSession, patient_id: int) -> Optional[Patient]:
+        """Retrieve a patient with everything its chart shows. See PatientManagement.get_patient_chart."""
+        return await db.scalar(PatientManagement.chart_statement(patient_id))
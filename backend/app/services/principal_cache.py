@@ -0,0 +1,328 @@
+"""
+Principal Cache
+
+This module resolves bearer tokens to principals: immutable snapshots of an
+active user holding the permissions of all their roles as one integer bitset,
+so an authorization check is a single bit test. Principals are cached per
+token id in an LRU; an entry lives at most ttl seconds and never past its
+token's expiry, and a request whose token is cached touches neither the
+database nor an ORM object.
+
+Each role's permissions JSON is compiled once into a role table that is
+reloaded after a role changes. Logging out revokes a token id in this worker
+until the token expires. Committed changes to a user or role drop the
+affected principals of this worker at once; other workers see them within ttl
+seconds.
+"""
+
+import enum
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from app.core.settings import settings
+from app.models.users import Role, User, user_roles
+
+
+class Permission(enum.IntFlag):
+    """Permissions a role can grant, named in Role.permissions like "appointments:write"."""
+    APPOINTMENTS_READ = enum.auto()
+    APPOINTMENTS_WRITE = enum.auto()
+    PATIENTS_READ = enum.auto()
+    PATIENTS_WRITE = enum.auto()
+    TREATMENTS_READ = enum.auto()
+    TREATMENTS_WRITE = enum.auto()
+    REPORTS_READ = enum.auto()
+    DIAGNOSTICS_READ = enum.auto()
+    USERS_MANAGE = enum.auto()
+
+
+PERMISSION_BITS = {permission.name.lower().replace("_", ":", 1): int(permission) for permission in Permission}
+ALL_PERMISSIONS = sum(PERMISSION_BITS.values())
+
+# Session.info key of the cache invalidations a transaction will apply on commit
+PENDING_INVALIDATIONS = "principal_cache_invalidations"
+
+
+def compile_permissions(permissions: Any) -> int:
+    """
+    Bitset of a Role.permissions value.
+
+    Accepts a list of permission names or a dict mapping names to booleans;
+    "*" grants every permission. Unknown names and other values grant nothing.
+    """
+    if isinstance(permissions, dict):
+        permissions = [name for name, granted in permissions.items() if granted]
+    if not isinstance(permissions, (list, tuple)):
+        return 0
+    if "*" in permissions:
+        return ALL_PERMISSIONS
+    bits = 0
+    for name in permissions:
+        bits |= PERMISSION_BITS.get(name, 0)
+    return bits
+
+
+def permission_mask(names: Iterable[str]) -> int:
+    """
+    Bitset of permission names, for checks declared in code.
+
+    Raises:
+        ValueError: If a name is not a known permission
+    """
+    bits = 0
+    for name in names:
+        if name not in PERMISSION_BITS:
+            raise ValueError(f"Unknown permission: {name}")
+        bits |= PERMISSION_BITS[name]
+    return bits
+
+
+def token_id(token: str, claims: Dict[str, Any]) -> str:
+    """Cache key of a token: its "jti" claim, or a digest of the token if it has none."""
+    return claims.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+
+class Principal(NamedTuple):
+    """Immutable snapshot of an authenticated user, safe to share between requests and threads."""
+    id: int
+    email: str
+    full_name: str
+    roles: Tuple[str, ...]
+    permissions: int
+
+    def has(self, required: int) -> bool:
+        """Whether every permission in the required bitset is granted."""
+        return self.permissions & required == required
+
+
+class CompiledRole(NamedTuple):
+    """A role's name and permissions bitset."""
+    name: str
+    permissions: int
+
+
+class PrincipalCache:
+    """
+    Process-local TTL LRU of principals keyed by token id.
+
+    hits counts tokens resolved from memory alone; misses counts tokens whose
+    user had to be read from the database.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._revoked: Dict[str, float] = {}  # token id -> token expiry
+        self._roles: Optional[Dict[int, CompiledRole]] = None
+        # Bumped by every invalidation, so loads that raced one are not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def resolve(
+        self,
+        db: Session,
+        token_id: str,
+        user_id: int,
+        token_expires: Optional[float] = None
+    ) -> Optional[Principal]:
+        """
+        The principal of a token, loading it on a miss.
+
+        Args:
+            db: Session used on a miss
+            token_id: Cache key of the token, see token_id
+            user_id: User the token was issued to
+            token_expires: Token expiry in seconds since the epoch, if it has one
+
+        Returns:
+            The principal, or None if the token was revoked or the user is
+            unknown or inactive
+        """
+        principal = self._cached(token_id)
+        if principal is None:
+            principal = self._load(db, token_id, user_id, token_expires)
+        return principal
+
+    async def aresolve(
+        self,
+        db: AsyncSession,
+        token_id: str,
+        user_id: int,
+        token_expires: Optional[float] = None
+    ) -> Optional[Principal]:
+        """The principal of a token through an async session. See resolve."""
+        principal = self._cached(token_id)
+        if principal is None:
+            principal = await db.run_sync(self._load, token_id, user_id, token_expires)
+        return principal
+
+    def revoke_token(self, token_id: str, token_expires: Optional[float] = None) -> None:
+        """Reject a token from now until it expires, e.g. on logout."""
+        now = time.time()
+        with self._lock:
+            self._generation += 1
+            self._revoked = {key: expires for key, expires in self._revoked.items() if expires > now}
+            self._revoked[token_id] = token_expires if token_expires is not None else float("inf")
+            entry = self._entries.pop(token_id, None)
+            if entry is not None:
+                self._forget(token_id, entry[1].id)
+
+    def revoke_user(self, user_id: int) -> None:
+        """Drop the cached principals of a user, whose roles or account changed."""
+        with self._lock:
+            self._generation += 1
+            for key in self._tokens_by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+
+    def invalidate_roles(self) -> None:
+        """Recompile the role table and drop every principal; call after a role changed."""
+        with self._lock:
+            self._generation += 1
+            self._roles = None
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def clear(self) -> None:
+        """Drop every principal, revocation and compiled role and reset the counters."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._tokens_by_user.clear()
+            self._revoked.clear()
+            self._roles = None
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit and miss counters and the number of cached principals and revoked tokens."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'principals': len(self._entries),
+            'revoked_tokens': len(self._revoked)
+        }
+
+    def _cached(self, token_id: str) -> Optional[Principal]:
+        """The cached principal of a token id, marked as recently used, or None."""
+        with self._lock:
+            entry = self._entries.get(token_id)
+            if entry is None:
+                return None
+            expires, principal = entry
+            if expires <= time.time():
+                del self._entries[token_id]
+                self._forget(token_id, principal.id)
+                return None
+            self._entries.move_to_end(token_id)
+            self.hits += 1
+            return principal
+
+    def _load(
+        self,
+        db: Session,
+        token_id: str,
+        user_id: int,
+        token_expires: Optional[float]
+    ) -> Optional[Principal]:
+        """Read the user and their role ids, build the principal and cache it."""
+        now = time.time()
+        with self._lock:
+            self.misses += 1
+            if self._revoked.get(token_id, now) > now:
+                return None
+            generation, roles = self._generation, self._roles
+
+        rows = db.execute(
+            select(User.id, User.email, User.full_name, User.is_active, user_roles.c.role_id)
+            .outerjoin(user_roles, user_roles.c.user_id == User.id)
+            .where(User.id == user_id)
+        ).all()
+        if not rows or not rows[0].is_active:
+            return None
+        role_ids = [row.role_id for row in rows if row.role_id is not None]
+        if roles is None or any(role_id not in roles for role_id in role_ids):
+            roles = {
+                role_id: CompiledRole(name, compile_permissions(permissions))
+                for role_id, name, permissions in db.execute(select(Role.id, Role.name, Role.permissions))
+            }
+            with self._lock:
+                if self._generation == generation:
+                    self._roles = roles
+
+        granted = [roles[role_id] for role_id in role_ids if role_id in roles]
+        permissions = 0
+        for role in granted:
+            permissions |= role.permissions
+        user = rows[0]
+        principal = Principal(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            roles=tuple(sorted(role.name for role in granted)),
+            permissions=permissions
+        )
+        expires = now + self.ttl if token_expires is None else min(now + self.ttl, token_expires)
+        with self._lock:
+            if self._generation == generation:
+                self._entries[token_id] = (expires, principal)
+                self._entries.move_to_end(token_id)
+                self._tokens_by_user.setdefault(principal.id, set()).add(token_id)
+                while len(self._entries) > self.max_entries:
+                    key, (_, evicted) = self._entries.popitem(last=False)
+                    self._forget(key, evicted.id)
+        return principal
+
+    def _forget(self, token_id: str, user_id: int) -> None:
+        """Remove a token id from its user's index; call with the lock held."""
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token_id)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+
+# Shared cache used by get_current_user
+principal_cache = PrincipalCache(
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES
+)
+
+
+# A changed user or role is only invalidated once its transaction commits, so
+# a concurrent miss cannot cache the old rows again afterwards
+def _queue_invalidation(target, invalidation: Tuple[str, Optional[int]]) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(PENDING_INVALIDATIONS, set()).add(invalidation)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    # Role collection changes count as updates too
+    _queue_invalidation(target, ("user", target.id))
+
+@event.listens_for(Role, "after_insert")
+@event.listens_for(Role, "after_update")
+@event.listens_for(Role, "after_delete")
+def _invalidate_roles(mapper, connection, target):
+    _queue_invalidation(target, ("roles", None))
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session):
+    for kind, user_id in session.info.pop(PENDING_INVALIDATIONS, ()):
+        if kind == "roles":
+            principal_cache.invalidate_roles()
+        else:
+            principal_cache.revoke_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session):
+    session.info.pop(PENDING_INVALIDATIONS, None)
@@ -0,0 +1,84 @@
+"""
+Schedule Response Cache
+
+This module keeps recently served dentist schedule pages in serialized form.
+Entries are keyed by the dentist's schedule version together with the
+requested window, so a booking or status change makes every older entry of
+that dentist unreachable without an explicit invalidation; stale entries are
+then pushed out by the LRU policy.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Hashable, NamedTuple, Optional, Tuple
+
+
+class CachedSchedule(NamedTuple):
+    """Serialized JSON body of a schedule page and the cursor of the next page."""
+    body: bytes
+    next_cursor: Optional[str]
+
+
+class ScheduleCache:
+    """
+    Process-local LRU of serialized schedule pages.
+
+    Keys are (dentist_id, version, window) where window holds the requested
+    range and page parameters.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int, Hashable], CachedSchedule]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, dentist_id: int, version: int, window: Hashable) -> Optional[CachedSchedule]:
+        """Return a cached page and mark it as recently used, or None."""
+        key = (dentist_id, version, window)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, dentist_id: int, version: int, window: Hashable, entry: CachedSchedule) -> None:
+        """Store a page, evicting the least recently used entries beyond the limit."""
+        key = (dentist_id, version, window)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached page."""
+        with self._lock:
+            self._entries.clear()
+
+
+def schedule_etag(dentist_id: int, version: int) -> str:
+    """Entity tag of any schedule window of a dentist at a given version."""
+    return f'"schedule-{dentist_id}-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value lists the given entity tag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag.removeprefix("W/") for tag in candidates)
+
+
+def window_key(
+    start_date: datetime,
+    end_date: datetime,
+    cursor: Optional[str],
+    limit: int
+) -> Hashable:
+    """Cache key component for one requested schedule page."""
+    return (start_date, end_date, cursor, limit)
+
+
+# Shared cache used by the schedule endpoint
+schedule_cache = ScheduleCache()
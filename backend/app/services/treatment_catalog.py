@@ -0,0 +1,166 @@
+"""
+Treatment Catalog Cache
+
+This module keeps the whole treatment catalog in process memory. The catalog
+is small and rarely changes, so it is loaded in one query and then serves
+lookups by id and by category from dicts. Every change to a treatment bumps
+the catalog's row in catalog_versions; each worker re-reads that version at
+most once per staleness window and reloads the catalog when it moved, so a
+change made by another worker is visible within max_staleness seconds. The
+worker making a change through the treatment service sees it immediately.
+"""
+
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.treatments import TREATMENT_CATALOG, CatalogVersion, Treatment
+
+# Longest time a worker may serve a catalog older than the database's
+DEFAULT_MAX_STALENESS = 5.0
+
+
+class CatalogTreatment(NamedTuple):
+    """Immutable copy of a treatment row, safe to share between sessions and threads."""
+    id: int
+    name: str
+    description: Optional[str]
+    duration_minutes: int
+    price: float
+    category: Optional[str]
+
+
+class CatalogSnapshot(NamedTuple):
+    """One loaded version of the catalog."""
+    version: Optional[int]
+    by_id: Dict[int, CatalogTreatment]
+    by_category: Dict[Optional[str], List[CatalogTreatment]]
+    by_name: List[CatalogTreatment]
+
+
+CATALOG_COLUMNS = tuple(getattr(Treatment, field) for field in CatalogTreatment._fields)
+
+
+class TreatmentCatalog:
+    """
+    Process-local, versioned cache of the treatment catalog.
+
+    hits counts lookups served from memory alone; misses counts lookups that
+    had to read the catalog version or reload the catalog first.
+    """
+
+    def __init__(self, max_staleness: float = DEFAULT_MAX_STALENESS):
+        self.max_staleness = max_staleness
+        self.hits = 0
+        self.misses = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = float("-inf")
+        # Bumped by every invalidation, so checks that raced one do not count as fresh
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, treatment_id: int) -> Optional[CatalogTreatment]:
+        """Look up a treatment by id, or None if it does not exist."""
+        treatment = self._current(db).by_id.get(treatment_id)
+        if treatment is None:
+            # Possibly created by another worker since the last check
+            treatment = self._current(db, force=True).by_id.get(treatment_id)
+        return treatment
+
+    def by_category(self, db: Session, category: Optional[str] = None) -> List[CatalogTreatment]:
+        """Treatments of a category, or all treatments if category is None, ordered by name."""
+        snapshot = self._current(db)
+        if category is None:
+            return list(snapshot.by_name)
+        return list(snapshot.by_category.get(category, ()))
+
+    async def aget(self, db: AsyncSession, treatment_id: int) -> Optional[CatalogTreatment]:
+        """Look up a treatment by id through an async session. See get."""
+        return await db.run_sync(self.get, treatment_id)
+
+    async def aby_category(
+        self,
+        db: AsyncSession,
+        category: Optional[str] = None
+    ) -> List[CatalogTreatment]:
+        """Treatments of a category through an async session. See by_category."""
+        return await db.run_sync(self.by_category, category)
+
+    def invalidate(self) -> None:
+        """Re-check the version on the next lookup; call after committing a treatment change."""
+        with self._lock:
+            self._generation += 1
+            self._checked_at = float("-inf")
+
+    def clear(self) -> None:
+        """Drop the loaded catalog and reset the counters."""
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+            self._checked_at = float("-inf")
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """Hit and miss counters and the loaded catalog version."""
+        snapshot = self._snapshot
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'version': snapshot.version if snapshot else None,
+            'treatments': len(snapshot.by_id) if snapshot else 0
+        }
+
+    def _current(self, db: Session, force: bool = False) -> CatalogSnapshot:
+        """
+        The loaded catalog, after re-reading the version if the window has passed.
+
+        The lock is never held across a query: async callers reach this through
+        run_sync, and a lock held while one of them waits on the database would
+        block the event loop for every other caller. Concurrent misses may each
+        read the catalog; the newest version read is the one kept.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            fresh = time.monotonic() - self._checked_at < self.max_staleness
+            if snapshot is not None and fresh and not force:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+            generation = self._generation
+
+        checked_at = time.monotonic()
+        version = db.scalar(
+            select(CatalogVersion.version).where(CatalogVersion.name == TREATMENT_CATALOG)
+        )
+        if snapshot is None or version is None or version != snapshot.version:
+            snapshot = self._load(db, version)
+
+        with self._lock:
+            current = self._snapshot
+            if (
+                current is None
+                or snapshot.version is None
+                or (current.version is not None and snapshot.version >= current.version)
+            ):
+                self._snapshot = current = snapshot
+            if self._generation == generation:
+                self._checked_at = max(self._checked_at, checked_at)
+            return current
+
+    @staticmethod
+    def _load(db: Session, version: Optional[int]) -> CatalogSnapshot:
+        """Read every treatment and index it."""
+        rows = [
+            CatalogTreatment(*row)
+            for row in db.execute(select(*CATALOG_COLUMNS).order_by(Treatment.name, Treatment.id))
+        ]
+        by_category: Dict[Optional[str], List[CatalogTreatment]] = {}
+        for treatment in rows:
+            by_category.setdefault(treatment.category, []).append(treatment)
+        return CatalogSnapshot(version, {t.id: t for t in rows}, by_category, rows)
+
+
+# Shared catalog used by the appointment and treatment services
+treatment_catalog = TreatmentCatalog()
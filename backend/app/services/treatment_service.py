@@ -4,15 +4,54 @@ Treatment Management Service
 This module provides functionality for managing dental treatments, including
 creation, categorization, and tracking of treatment history. It supports the
 core business operations related to dental procedures and services.
+AsyncTreatmentManagement offers the same operations over an AsyncSession for the API.
 """
 
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+from datetime import date, datetime
+from typing import AsyncIterator, Iterator, List, Optional, Dict, Any, Tuple, Union
+from sqlalchemy.engine import RowMapping
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from models.treatments import Treatment
-from models.appointments import Appointment, AppointmentStatus
-from models.dentists import Dentist
+from sqlalchemy import Select, select
+from app.models.treatments import Treatment
+from app.models.appointments import Appointment, AppointmentStatus
+from app.services.treatment_catalog import CatalogTreatment, treatment_catalog
+from app.services.treatment_stats import statistics_statement
+
+# Fields of a treatment history entry, selected without loading whole rows
+HISTORY_COLUMNS = (
+    Appointment.datetime.label('appointment_date'),
+    Treatment.name.label('treatment_name'),
+    Treatment.category.label('treatment_category'),
+    Appointment.dentist_id,
+    Appointment.notes,
+    Treatment.price
+)
+
+# History fields plus the keys needed to identify rows in exports
+EXPORT_COLUMNS = (
+    Appointment.id.label('appointment_id'),
+    Appointment.patient_id
+) + HISTORY_COLUMNS
+
+# Treatment attributes that update_treatment may change
+TREATMENT_FIELDS = ("name", "description", "duration_minutes", "price", "category")
+
+def _as_date(value: Union[date, datetime]) -> date:
+    """The day of a date or datetime."""
+    return value.date() if isinstance(value, datetime) else value
+
+def _apply_treatment_changes(treatment: Treatment, changes: Dict[str, Any]) -> None:
+    """Validate and set new treatment attribute values."""
+    unknown = set(changes) - set(TREATMENT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown treatment fields: {', '.join(sorted(unknown))}")
+    if changes.get('duration_minutes', 1) <= 0:
+        raise ValueError("Duration must be positive")
+    if changes.get('price', 0) < 0:
+        raise ValueError("Price cannot be negative")
+    for field, value in changes.items():
+        setattr(treatment, field, value)
 
 class TreatmentManagement:
     """
@@ -65,6 +104,40 @@ class TreatmentManagement:
         db.add(treatment)
         db.commit()
         db.refresh(treatment)
+        treatment_catalog.invalidate()
+        return treatment
+
+    @staticmethod
+    def update_treatment(
+        db: Session,
+        treatment_id: int,
+        **changes: Any
+    ) -> Treatment:
+        """
+        Update the attributes of a treatment in the catalog.
+        
+        The change bumps the catalog version, so every worker's cached catalog
+        picks it up within its staleness window.
+        
+        Args:
+            db: Database session
+            treatment_id: ID of the treatment to update
+            changes: New values for name, description, duration_minutes, price
+                     or category
+        
+        Returns:
+            Updated Treatment object
+        
+        Raises:
+            ValueError: If the treatment doesn't exist or a value is invalid
+        """
+        treatment = db.get(Treatment, treatment_id)
+        if not treatment:
+            raise ValueError("Treatment not found")
+        _apply_treatment_changes(treatment, changes)
+        db.commit()
+        db.refresh(treatment)
+        treatment_catalog.invalidate()
         return treatment
 
     @staticmethod
@@ -79,6 +152,8 @@ class TreatmentManagement:
         
         This method compiles a comprehensive history of all completed treatments
         for a patient, including details about the treatment, dentist, and date.
+        Only the returned fields are selected; for long histories use
+        iter_treatment_history, which streams them.
         
         Args:
             db: Database session
@@ -89,61 +164,97 @@ class TreatmentManagement:
         Returns:
             List of dictionaries containing treatment history details
         """
-        query = db.query(
-            Appointment,
-            Treatment,
-            Dentist
-        ).join(
-            Treatment,
-            Appointment.treatment_id == Treatment.id
-        ).join(
-            Dentist,
-            Appointment.dentist_id == Dentist.id
-        ).filter(
-            and_(
-                Appointment.patient_id == patient_id,
-                Appointment.status == AppointmentStatus.COMPLETED
-            )
+        statement = TreatmentManagement.history_statement(
+            HISTORY_COLUMNS, patient_id=patient_id, start_date=start_date, end_date=end_date
         )
+        return [dict(row) for row in db.execute(statement).mappings()]
+
+    @staticmethod
+    def history_statement(
+        columns: Tuple[Any, ...],
+        patient_id: Optional[int] = None,
+        dentist_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> Select:
+        """
+        Build the completed-treatment history query, newest first.
+
+        Only the given columns are selected, so no ORM entities are built.
 
+        Args:
+            columns: Labeled columns to select, e.g. HISTORY_COLUMNS
+            patient_id: Optional patient whose history is selected
+            dentist_id: Optional dentist whose treatments are selected
+            start_date: Optional start date for filtering
+            end_date: Optional end date for filtering
+        """
+        statement = select(*columns).join(
+            Treatment, Appointment.treatment_id == Treatment.id
+        ).where(Appointment.status == AppointmentStatus.COMPLETED)
+        if patient_id is not None:
+            statement = statement.where(Appointment.patient_id == patient_id)
+        if dentist_id is not None:
+            statement = statement.where(Appointment.dentist_id == dentist_id)
         if start_date:
-            query = query.filter(Appointment.datetime >= start_date)
+            statement = statement.where(Appointment.datetime >= start_date)
         if end_date:
-            query = query.filter(Appointment.datetime <= end_date)
+            statement = statement.where(Appointment.datetime <= end_date)
+        return statement.order_by(Appointment.datetime.desc(), Appointment.id.desc())
 
-        results = query.order_by(Appointment.datetime.desc()).all()
+    @staticmethod
+    def iter_treatment_history(
+        db: Session,
+        patient_id: Optional[int] = None,
+        dentist_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        batch_size: int = 1000
+    ) -> Iterator[RowMapping]:
+        """
+        Stream completed treatments for exports, for one patient or the whole clinic.
+        
+        Rows are fetched `batch_size` at a time through a server-side cursor
+        where the driver supports one, so memory use does not depend on the
+        length of the history.
+        
+        Args:
+            db: Database session
+            patient_id: Optional patient whose history is exported
+            dentist_id: Optional dentist whose treatments are exported
+            start_date: Optional start date for filtering
+            end_date: Optional end date for filtering
+            batch_size: Number of rows fetched per round trip
         
-        return [{
-            'appointment_date': appt.datetime,
-            'treatment_name': treatment.name,
-            'treatment_category': treatment.category,
-            'dentist_id': dentist.id,
-            'notes': appt.notes,
-            'price': treatment.price
-        } for appt, treatment, dentist in results]
+        Returns:
+            Iterator of mappings with the EXPORT_COLUMNS of each treatment
+        """
+        statement = TreatmentManagement.history_statement(
+            EXPORT_COLUMNS, patient_id, dentist_id, start_date, end_date
+        ).execution_options(yield_per=batch_size)
+        yield from db.execute(statement).mappings()
 
     @staticmethod
     def get_treatments_by_category(
         db: Session,
         category: Optional[str] = None
-    ) -> List[Treatment]:
+    ) -> List[CatalogTreatment]:
         """
         Retrieve treatments filtered by category.
         
         This method returns all treatments in a specific category, or all
-        treatments if no category is specified.
+        treatments if no category is specified. It is served from the
+        in-process treatment catalog, which may lag changes made by other
+        workers by up to its staleness window.
         
         Args:
             db: Database session
             category: Optional category to filter by
         
         Returns:
-            List of Treatment objects
+            List of read-only treatment records, ordered by name
         """
-        query = db.query(Treatment)
-        if category:
-            query = query.filter(Treatment.category == category)
-        return query.order_by(Treatment.name).all()
+        return treatment_catalog.by_category(db, category or None)
 
     @staticmethod
     def calculate_treatment_statistics(
@@ -155,7 +266,11 @@ class TreatmentManagement:
         Calculate statistics about treatments performed.
         
         This method generates insights about treatment patterns, including
-        popular treatments, average durations, and revenue statistics.
+        popular treatments, average durations, and revenue statistics. It reads
+        the daily rollup maintained on status changes (see
+        app.services.treatment_stats), so its cost grows with the number of
+        days in the period rather than the number of appointments. The period
+        covers whole days: from the day of start_date to the day of end_date.
         
         Args:
             db: Database session
@@ -165,25 +280,136 @@ class TreatmentManagement:
         Returns:
             Dictionary containing various treatment statistics
         """
-        completed_treatments = db.query(
-            Treatment,
-            func.count(Appointment.id).label('count'),
-            func.sum(Treatment.price).label('revenue')
-        ).join(
-            Appointment
-        ).filter(
-            and_(
-                Appointment.status == AppointmentStatus.COMPLETED,
-                Appointment.datetime >= start_date,
-                Appointment.datetime <= end_date
-            )
-        ).group_by(Treatment.id).all()
+        completed_treatments = db.execute(
+            statistics_statement(_as_date(start_date), _as_date(end_date))
+        ).all()
+
+        return {
+            'total_treatments': sum(t.count for t in completed_treatments),
+            'total_revenue': sum(t.revenue for t in completed_treatments),
+            'treatment_counts': {
+                t.name: {'count': t.count, 'revenue': t.revenue}
+                for t in completed_treatments
+            }
+        }
+
+
+class AsyncTreatmentManagement:
+    """Async counterparts of the TreatmentManagement operations."""
+
+    @staticmethod
+    async def create_treatment(
+        db: AsyncSession,
+        name: str,
+        description: str,
+        duration_minutes: int,
+        price: float,
+        category: Optional[str] = None
+    ) -> Treatment:
+        """Create a new treatment type. See TreatmentManagement.create_treatment."""
+        if duration_minutes <= 0:
+            raise ValueError("Duration must be positive")
+        if price < 0:
+            raise ValueError("Price cannot be negative")
+
+        treatment = Treatment(
+            name=name,
+            description=description,
+            duration_minutes=duration_minutes,
+            price=price,
+            category=category
+        )
+        db.add(treatment)
+        await db.commit()
+        await db.refresh(treatment)
+        treatment_catalog.invalidate()
+        return treatment
+
+    @staticmethod
+    async def update_treatment(
+        db: AsyncSession,
+        treatment_id: int,
+        **changes: Any
+    ) -> Treatment:
+        """Update the attributes of a treatment. See TreatmentManagement.update_treatment."""
+        treatment = await db.get(Treatment, treatment_id)
+        if not treatment:
+            raise ValueError("Treatment not found")
+        _apply_treatment_changes(treatment, changes)
+        await db.commit()
+        await db.refresh(treatment)
+        treatment_catalog.invalidate()
+        return treatment
+
+    @staticmethod
+    async def get_patient_treatment_history(
+        db: AsyncSession,
+        patient_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve treatment history for a specific patient.
+
+        See TreatmentManagement.get_patient_treatment_history.
+        """
+        statement = TreatmentManagement.history_statement(
+            HISTORY_COLUMNS, patient_id=patient_id, start_date=start_date, end_date=end_date
+        )
+        result = await db.execute(statement)
+        return [dict(row) for row in result.mappings()]
+
+    @staticmethod
+    async def stream_treatment_history(
+        db: AsyncSession,
+        patient_id: Optional[int] = None,
+        dentist_id: Optional[int] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[RowMapping]:
+        """
+        Stream completed treatments for exports.
+
+        See TreatmentManagement.iter_treatment_history. On asyncpg the rows
+        come from a server-side cursor.
+        """
+        statement = TreatmentManagement.history_statement(
+            EXPORT_COLUMNS, patient_id, dentist_id, start_date, end_date
+        ).execution_options(yield_per=batch_size)
+        result = await db.stream(statement)
+        async for row in result.mappings():
+            yield row
+
+    @staticmethod
+    async def get_treatments_by_category(
+        db: AsyncSession,
+        category: Optional[str] = None
+    ) -> List[CatalogTreatment]:
+        """Retrieve treatments filtered by category. See TreatmentManagement.get_treatments_by_category."""
+        return await treatment_catalog.aby_category(db, category or None)
+
+    @staticmethod
+    async def calculate_treatment_statistics(
+        db: AsyncSession,
+        start_date: datetime,
+        end_date: datetime
+    ) -> Dict[str, Any]:
+        """
+        Calculate statistics about treatments performed.
+
+        See TreatmentManagement.calculate_treatment_statistics.
+        """
+        result = await db.execute(
+            statistics_statement(_as_date(start_date), _as_date(end_date))
+        )
+        completed_treatments = result.all()
 
         return {
-            'total_treatments': sum(t[1] for t in completed_treatments),
-            'total_revenue': sum(t[2] for t in completed_treatments),
+            'total_treatments': sum(t.count for t in completed_treatments),
+            'total_revenue': sum(t.revenue for t in completed_treatments),
             'treatment_counts': {
-                t[0].name: {'count': t[1], 'revenue': t[2]}
+                t.name: {'count': t.count, 'revenue': t.revenue}
                 for t in completed_treatments
             }
-        }
\ No newline at end of file
+        }
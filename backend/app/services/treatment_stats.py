@@ -0,0 +1,146 @@
+"""
+Treatment Statistics Rollup
+
+This module maintains treatment_daily_stats, the number of completed
+appointments and their revenue per (day, treatment, dentist). The rollup is
+updated in the same transaction as every status change that moves an
+appointment into or out of COMPLETED, with one INSERT ... SELECT ... ON
+CONFLICT DO UPDATE that adds the signed counts to the affected rows, so
+statistics over a range read one row per day and treatment instead of every
+appointment. backfill rebuilds the rollup from the appointments table.
+
+Revenue is counted at the price an appointment records when it completes, so
+reversing a completion after the treatment's price changed subtracts what was
+added.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import Date, Delete, Insert, ScalarSelect, Select, cast, delete, func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.appointments import Appointment, AppointmentStatus
+from app.models.treatments import Treatment, TreatmentDailyStats
+
+ROLLUP_KEY = ("day", "treatment_id", "dentist_id")
+
+# Current price of the treatment of the appointment being updated; the value
+# stored as Appointment.completed_price when it moves into COMPLETED
+COMPLETION_PRICE: ScalarSelect = select(Treatment.price).where(
+    Treatment.id == Appointment.treatment_id
+).scalar_subquery()
+
+
+def day_of(dialect_name: str, column):
+    """SQL expression for the calendar day of a datetime column."""
+    if dialect_name == "sqlite":
+        # Same 'YYYY-MM-DD' text the Date type stores on SQLite
+        return func.date(column)
+    return cast(column, Date)
+
+
+def aggregate_statement(dialect_name: str, sign: int = 1) -> Select:
+    """
+    Completed-appointment counts and revenue grouped by rollup key, multiplied by sign.
+
+    Revenue sums the prices recorded at completion; rows completed before
+    prices were recorded fall back to the treatment's current price.
+    """
+    day = day_of(dialect_name, Appointment.datetime)
+    price = func.coalesce(Appointment.completed_price, Treatment.price)
+    return select(
+        day.label("day"),
+        Appointment.treatment_id,
+        Appointment.dentist_id,
+        (func.count() * literal(sign)).label("count"),
+        (func.sum(price) * literal(sign)).label("revenue")
+    ).join(
+        Treatment, Appointment.treatment_id == Treatment.id
+    ).group_by(day, Appointment.treatment_id, Appointment.dentist_id)
+
+
+def upsert_statement(dialect_name: str, rows: Select) -> Insert:
+    """Add the counts selected by rows to the rollup, creating missing rows."""
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = dialect_insert(TreatmentDailyStats).from_select(
+        [*ROLLUP_KEY, "count", "revenue"], rows
+    )
+    return statement.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEY),
+        set_={
+            "count": TreatmentDailyStats.count + statement.excluded.count,
+            "revenue": TreatmentDailyStats.revenue + statement.excluded.revenue
+        }
+    )
+
+
+def rollup_statements(
+    dialect_name: str,
+    transitions: Iterable[Tuple[int, Optional[AppointmentStatus]]],
+    new_status: AppointmentStatus
+) -> List[Insert]:
+    """
+    Build the rollup updates for appointments changing status.
+
+    Args:
+        dialect_name: Name of the database dialect the statements will run on
+        transitions: (appointment id, status before the change) pairs
+        new_status: Status the appointments move to
+
+    Returns:
+        At most one statement; empty if no appointment enters or leaves COMPLETED
+    """
+    completed = AppointmentStatus.COMPLETED
+    changed = [
+        appointment_id for appointment_id, from_status in transitions
+        if (from_status == completed) != (new_status == completed)
+    ]
+    if not changed:
+        return []
+    sign = 1 if new_status == completed else -1
+    rows = aggregate_statement(dialect_name, sign).where(Appointment.id.in_(changed))
+    return [upsert_statement(dialect_name, rows)]
+
+
+def backfill_statements(
+    dialect_name: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> Tuple[Delete, Insert]:
+    """Build the statements replacing the rollup rows of a day range (default: all days)."""
+    clear = delete(TreatmentDailyStats)
+    rows = aggregate_statement(dialect_name).where(Appointment.status == AppointmentStatus.COMPLETED)
+    if start_date is not None:
+        clear = clear.where(TreatmentDailyStats.day >= start_date)
+        rows = rows.where(Appointment.datetime >= datetime.combine(start_date, time.min))
+    if end_date is not None:
+        clear = clear.where(TreatmentDailyStats.day <= end_date)
+        rows = rows.where(Appointment.datetime < datetime.combine(end_date + timedelta(days=1), time.min))
+    return clear, upsert_statement(dialect_name, rows)
+
+
+def backfill(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> None:
+    """
+    Rebuild the rollup for a day range from the appointments table and commit.
+
+    Use after loading appointments outside the service layer, or to repair
+    drift after rows were changed without the service.
+    """
+    for statement in backfill_statements(db.get_bind().dialect.name, start_date, end_date):
+        db.execute(statement)
+    db.commit()
+
+
+def statistics_statement(start_date: date, end_date: date) -> Select:
+    """Per-treatment totals of the rollup rows of a day range."""
+    count = func.sum(TreatmentDailyStats.count)
+    return select(
+        Treatment.name,
+        count.label("count"),
+        func.sum(TreatmentDailyStats.revenue).label("revenue")
+    ).join(
+        Treatment, TreatmentDailyStats.treatment_id == Treatment.id
+    ).where(
+        TreatmentDailyStats.day >= start_date,
+        TreatmentDailyStats.day <= end_date
+    ).group_by(Treatment.id, Treatment.name).having(count > 0)
@@ -0,0 +1,245 @@
+"""
+Dentist Utilization Reports
+
+This module reports how full each dentist's days and weeks are. Working
+windows from DentistSchedule and appointment intervals are fetched as column
+arrays in three queries, laid out on a per-minute timeline of the report range
+with NumPy, and reduced per dentist and day or week:
+
+- available_minutes: working minutes in the dentist's schedule
+- booked_minutes: minutes covered by kept (scheduled, confirmed or completed)
+  appointments, inside or outside working hours
+- no_show_minutes: minutes of no-show appointments not also covered by a kept one
+- idle_minutes: working minutes covered by no appointment
+- idle_gaps: number of separate idle stretches within working hours
+- utilization: booked working minutes divided by available minutes
+
+Appointment intervals end at end_datetime, which holds the treatment duration
+fixed at booking. Cancelled appointments free their time and are ignored.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.appointments import ACTIVE_STATUSES, Appointment, AppointmentStatus
+from app.models.dentists import Dentist
+from app.models.schedules import DentistSchedule
+from app.services.availability import MINUTES_PER_DAY, minute_of_day, weekday_index
+
+# Longest range a report may cover
+MAX_REPORT_DAYS = 366
+
+# Dentists laid out on the timeline at once, bounding memory for long ranges
+DENTIST_BLOCK = 32
+
+KEPT_STATUSES = ACTIVE_STATUSES + (AppointmentStatus.COMPLETED,)
+
+PERIODS = ("day", "week")
+
+
+class UtilizationData(NamedTuple):
+    """Column arrays a report is computed from."""
+    first_day: date
+    days: int
+    dentist_ids: np.ndarray      # sorted dentist ids
+    week_masks: np.ndarray       # (dentists, 7, minutes of day) working minutes per weekday
+    appointment_dentist: np.ndarray
+    appointment_start: np.ndarray  # minutes since the start of first_day
+    appointment_end: np.ndarray
+    appointment_kept: np.ndarray   # True for kept appointments, False for no-shows
+
+
+def load_utilization_data(
+    db: Session,
+    first_day: date,
+    last_day: date,
+    dentist_ids: Optional[Sequence[int]] = None
+) -> UtilizationData:
+    """
+    Fetch the schedules and appointments of a report range as arrays.
+
+    Args:
+        db: Database session
+        first_day: First day of the report
+        last_day: Last day of the report, inclusive
+        dentist_ids: Optional dentists to report on (default: all)
+
+    Raises:
+        ValueError: If the range is empty or longer than MAX_REPORT_DAYS
+    """
+    days = (last_day - first_day).days + 1
+    if days <= 0:
+        raise ValueError("End of date range must not precede its start")
+    if days > MAX_REPORT_DAYS:
+        raise ValueError(f"Reports cover at most {MAX_REPORT_DAYS} days")
+
+    dentists = select(Dentist.id).order_by(Dentist.id)
+    if dentist_ids is not None:
+        dentists = dentists.where(Dentist.id.in_(dentist_ids))
+    ids = np.fromiter(db.scalars(dentists), dtype=np.int64)
+
+    week_masks = np.zeros((len(ids), 7, MINUTES_PER_DAY), dtype=bool)
+    for dentist_id, day_of_week, start_time, end_time in db.execute(
+        select(
+            DentistSchedule.dentist_id,
+            DentistSchedule.day_of_week,
+            DentistSchedule.start_time,
+            DentistSchedule.end_time
+        ).where(
+            DentistSchedule.dentist_id.in_(ids.tolist()),
+            DentistSchedule.is_active.is_(True)
+        )
+    ):
+        weekday = weekday_index(day_of_week)
+        if weekday is not None:
+            position = np.searchsorted(ids, dentist_id)
+            week_masks[position, weekday, minute_of_day(start_time):minute_of_day(end_time)] = True
+
+    range_start = datetime.combine(first_day, time.min)
+    rows = db.execute(
+        select(
+            Appointment.dentist_id,
+            Appointment.datetime,
+            Appointment.end_datetime,
+            Appointment.status
+        ).where(
+            Appointment.dentist_id.in_(ids.tolist()),
+            Appointment.datetime < range_start + timedelta(days=days),
+            Appointment.end_datetime > range_start,
+            Appointment.status.in_(KEPT_STATUSES + (AppointmentStatus.NO_SHOW,))
+        )
+    ).all()
+    # Plain timedelta arithmetic is much faster than converting datetimes to datetime64
+    minute = timedelta(minutes=1)
+    dentist_column, start_column, end_column, status_column = zip(*rows) if rows else ((), (), (), ())
+    return UtilizationData(
+        first_day=first_day,
+        days=days,
+        dentist_ids=ids,
+        week_masks=week_masks,
+        appointment_dentist=np.searchsorted(ids, np.array(dentist_column, dtype=np.int64)),
+        appointment_start=np.fromiter(
+            ((value - range_start) // minute for value in start_column), np.int64, len(rows)
+        ),
+        appointment_end=np.fromiter(
+            (-((range_start - value) // minute) for value in end_column), np.int64, len(rows)
+        ),
+        appointment_kept=np.fromiter(
+            (status != AppointmentStatus.NO_SHOW for status in status_column), bool, len(rows)
+        )
+    )
+
+
+def _coverage(dentists: int, minutes: int, positions, starts, ends) -> np.ndarray:
+    """(dentists, minutes) mask of the minutes covered by any of the intervals."""
+    starts = np.clip(starts, 0, minutes)
+    ends = np.clip(ends, 0, minutes)
+    width = minutes + 1
+    size = dentists * width
+    depth = np.bincount(positions * width + starts, minlength=size).astype(np.int32)
+    depth -= np.bincount(positions * width + ends, minlength=size).astype(np.int32)
+    return np.cumsum(depth.reshape(dentists, width), axis=1, dtype=np.int32)[:, :minutes] > 0
+
+
+def compute_utilization(data: UtilizationData, period: str = "day") -> List[Dict[str, Any]]:
+    """
+    Reduce report data to one row per dentist and day or week.
+
+    Weeks start on Monday; the first and last week may be partial.
+
+    Returns:
+        Dictionaries with dentist_id, period_start and the metrics described
+        in the module docstring, ordered by dentist and period
+
+    Raises:
+        ValueError: If period is not "day" or "week"
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Period must be one of: {', '.join(PERIODS)}")
+    days = data.days
+    minutes = days * MINUTES_PER_DAY
+    weekdays = (data.first_day.weekday() + np.arange(days)) % 7
+
+    if period == "day":
+        group_starts = np.arange(days)
+        period_starts = [data.first_day + timedelta(days=int(d)) for d in group_starts]
+    else:
+        week = (data.first_day.weekday() + np.arange(days)) // 7
+        group_starts = np.flatnonzero(np.diff(week, prepend=-1))
+        monday = data.first_day - timedelta(days=data.first_day.weekday())
+        period_starts = [monday + timedelta(weeks=int(w)) for w in week[group_starts]]
+
+    report = []
+    for block in range(0, len(data.dentist_ids), DENTIST_BLOCK):
+        block_ids = data.dentist_ids[block:block + DENTIST_BLOCK]
+        count = len(block_ids)
+        in_block = (data.appointment_dentist >= block) & (data.appointment_dentist < block + count)
+        kept = in_block & data.appointment_kept
+        no_show = in_block & ~data.appointment_kept
+
+        shape = (count, days, MINUTES_PER_DAY)
+        available = data.week_masks[block:block + count][:, weekdays, :]
+        booked = _coverage(
+            count, minutes, data.appointment_dentist[kept] - block,
+            data.appointment_start[kept], data.appointment_end[kept]
+        ).reshape(shape)
+        missed = _coverage(
+            count, minutes, data.appointment_dentist[no_show] - block,
+            data.appointment_start[no_show], data.appointment_end[no_show]
+        ).reshape(shape) & ~booked
+        idle = available & ~booked & ~missed
+        gap_starts = idle.copy()
+        gap_starts[:, :, 1:] &= ~idle[:, :, :-1]
+
+        metrics = {
+            'available_minutes': available.sum(axis=2),
+            'booked_minutes': booked.sum(axis=2),
+            'no_show_minutes': missed.sum(axis=2),
+            'idle_minutes': idle.sum(axis=2),
+            'idle_gaps': gap_starts.sum(axis=2),
+            'booked_working_minutes': (booked & available).sum(axis=2)
+        }
+        metrics = {name: np.add.reduceat(values, group_starts, axis=1) for name, values in metrics.items()}
+        booked_working = metrics.pop('booked_working_minutes')
+        utilization = np.divide(
+            booked_working, metrics['available_minutes'],
+            out=np.zeros(booked_working.shape), where=metrics['available_minutes'] > 0
+        )
+
+        for row, dentist_id in enumerate(block_ids):
+            for column, period_start in enumerate(period_starts):
+                entry = {'dentist_id': int(dentist_id), 'period_start': period_start}
+                entry.update({name: int(values[row, column]) for name, values in metrics.items()})
+                entry['utilization'] = round(float(utilization[row, column]), 4)
+                report.append(entry)
+    return report
+
+
+def dentist_utilization(
+    db: Session,
+    first_day: date,
+    last_day: date,
+    period: str = "day",
+    dentist_ids: Optional[Sequence[int]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Report utilization per dentist and day or week.
+
+    Args:
+        db: Database session
+        first_day: First day of the report
+        last_day: Last day of the report, inclusive
+        period: "day" or "week"
+        dentist_ids: Optional dentists to report on (default: all)
+
+    Returns:
+        One dictionary per dentist and period; see compute_utilization
+
+    Raises:
+        ValueError: If the range or period is invalid
+    """
+    if period not in PERIODS:
+        raise ValueError(f"Period must be one of: {', '.join(PERIODS)}")
+    return compute_utilization(load_utilization_data(db, first_day, last_day, dentist_ids), period)
@@ -0,0 +1,144 @@
+"""
+Benchmark for appointment conflict detection.
+
+Compares booking throughput of AppointmentSystem.schedule_appointment, which
+consults the in-process interval index, against the plain query path that
+loads the treatment and scans the appointments table on every attempt.
+The default volumes pack attempts into a few days, which mimics front-desk
+peak where most attempts hit an occupied slot; spreading them over more days
+shows the low-contention case, where both paths are dominated by the commit.
+
+Usage:
+    python benchmarks/conflict_detection.py [--dentists 20] [--days 5] [--attempts 5000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.base import Base
+from app.models.users import User, Role
+from app.models.patients import Patient
+from app.models.dentists import Dentist
+from app.models.staff import Staff
+from app.models.schedules import DentistSchedule
+from app.models.treatments import Treatment
+from app.models.appointments import Appointment, AppointmentStatus
+from app.services.appointment_service import AppointmentSystem
+from app.services.interval_index import appointment_index
+
+DURATIONS = [30, 45, 60, 90]
+
+
+def make_session(path: Path, dentists: int):
+    """Create a fresh SQLite database with dentists, a patient and treatments."""
+    path.unlink(missing_ok=True)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user = User(email="bench@example.com", full_name="Bench Patient", hashed_password="x")
+    db.add(user)
+    db.flush()
+    db.add(Patient(user_id=user.id))
+    db.add_all(Dentist(license_number=f"LIC{i}") for i in range(dentists))
+    db.add_all(
+        Treatment(name=f"T{minutes}", duration_minutes=minutes, price=minutes * 2.0)
+        for minutes in DURATIONS
+    )
+    db.commit()
+    return engine, db
+
+
+def attempts_for(seed: int, count: int, dentists: int, days: int):
+    """Generate a reproducible sequence of booking attempts on a 15 minute grid."""
+    rng = random.Random(seed)
+    base = datetime(2030, 1, 7, 8, 0)
+    return [
+        (
+            rng.randint(1, dentists),
+            rng.randint(1, len(DURATIONS)),
+            base + timedelta(days=rng.randrange(days), minutes=15 * rng.randrange(40))
+        )
+        for _ in range(count)
+    ]
+
+
+def book_via_query(db, patient_id, dentist_id, treatment_id, start):
+    """Booking path without the interval index: treatment lookup plus table scan."""
+    treatment = db.query(Treatment).filter(Treatment.id == treatment_id).first()
+    end = start + timedelta(minutes=treatment.duration_minutes)
+    if AppointmentSystem.find_overlapping_appointment(db, dentist_id, start, end) is not None:
+        raise ValueError("Time slot is not available for the specified dentist")
+    appointment = Appointment(
+        patient_id=patient_id,
+        dentist_id=dentist_id,
+        treatment_id=treatment_id,
+        datetime=start,
+        end_datetime=end,
+        status=AppointmentStatus.SCHEDULED
+    )
+    db.add(appointment)
+    db.commit()
+    db.refresh(appointment)
+
+
+def book_via_service(db, patient_id, dentist_id, treatment_id, start):
+    AppointmentSystem.schedule_appointment(
+        db=db,
+        patient_id=patient_id,
+        dentist_id=dentist_id,
+        treatment_id=treatment_id,
+        datetime=start
+    )
+
+
+def run(name, book, workdir: Path, args):
+    appointment_index.clear()
+    engine, db = make_session(workdir / f"{name}.db", args.dentists)
+    attempts = attempts_for(args.seed, args.attempts, args.dentists, args.days)
+    booked = 0
+    started = time.perf_counter()
+    for dentist_id, treatment_id, start in attempts:
+        try:
+            book(db, 1, dentist_id, treatment_id, start)
+            booked += 1
+        except ValueError:
+            db.rollback()
+    elapsed = time.perf_counter() - started
+    db.close()
+    engine.dispose()
+    print(
+        f"{name:<8} attempts={len(attempts):>6} booked={booked:>6} "
+        f"elapsed={elapsed:7.2f}s attempts/s={len(attempts) / elapsed:9.1f} "
+        f"bookings/s={booked / elapsed:9.1f}"
+    )
+    return booked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--dentists", type=int, default=20)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--attempts", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", type=Path, default=Path("/tmp"))
+    args = parser.parse_args()
+
+    query_booked = run("query", book_via_query, args.workdir, args)
+    index_booked = run("index", book_via_service, args.workdir, args)
+    if query_booked != index_booked:
+        print("WARNING: paths disagree on the number of bookings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+Rebuild the treatment statistics rollup.
+Recomputes treatment_daily_stats from the appointments table for a range of
+days, or for all days if no range is given. Run it after loading appointments
+outside the application.
+
+Usage:
+    python scripts/backfill_treatment_stats.py [--start 2025-01-01] [--end 2025-12-31]
+"""
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add the backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.db.base import SessionLocal
+from app.services.treatment_stats import backfill
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--start", type=date.fromisoformat, help="First day to rebuild (default: earliest)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day to rebuild (default: latest)")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        backfill(db, args.start, args.end)
+    print(f"Rebuilt treatment statistics from {args.start or 'the beginning'} to {args.end or 'the end'}")
+
+
+if __name__ == "__main__":
+    main()
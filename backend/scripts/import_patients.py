@@ -0,0 +1,53 @@
+"""
+Bulk patient import for onboarding a clinic.
+Reads patients from a CSV (with a header row) or NDJSON file and creates their
+user accounts and patient records in chunks. Columns: email, full_name,
+phone_number, medical_history, allergies, emergency_contact, notes.
+
+Usage:
+    python scripts/import_patients.py patients.csv [--rejects rejects.ndjson] [--chunk-size 2000]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.db.base import SessionLocal
+from app.services.patient_import import DEFAULT_CHUNK_SIZE, PatientImport, read_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("source", type=Path, help="CSV or NDJSON file to import")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Input format (default: from the file extension)")
+    parser.add_argument("--rejects", type=Path, help="File receiving rejected records (default: <source>.rejects.ndjson)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    format = args.format or ("csv" if args.source.suffix.lower() == ".csv" else "ndjson")
+    rejects_path = args.rejects or args.source.with_name(args.source.name + ".rejects.ndjson")
+
+    started = time.perf_counter()
+    with open(args.source, newline="", encoding="utf-8") as source, \
+            open(rejects_path, "w", encoding="utf-8") as rejects, \
+            SessionLocal() as db:
+        report = PatientImport.import_patients(
+            db, read_records(source, format), rejects=rejects, chunk_size=args.chunk_size
+        )
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"Imported {report.imported} patients, rejected {report.rejected} "
+        f"in {elapsed:.1f}s ({report.imported / elapsed:.0f} rows/s)"
+    )
+    if report.rejected:
+        print(f"Rejected records written to {rejects_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,49 +2,180 @@
 Test configuration and shared fixtures for the dental clinic system tests.
 """
 
+import os
+from contextlib import asynccontextmanager
+import httpx
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
 from datetime import datetime, timedelta
 
-from app.db.base import Base
+from app.models.base import Base
 from app.models.users import User, Role
 from app.models.patients import Patient
 from app.models.dentists import Dentist
 from app.models.treatments import Treatment
 from app.models.appointments import Appointment, AppointmentStatus
+from app.models.schedules import DentistSchedule
+from app.models.staff import Staff
+from app.services.interval_index import appointment_index
+from app.services.principal_cache import principal_cache
+from app.services.schedule_cache import schedule_cache
+from app.services.treatment_catalog import treatment_catalog
+from app.api.endpoints import appointments, patients, reports, treatments
+from app.db.base import async_read_router
+from app.core.dependencies import get_async_db, get_async_read_db, get_async_read_sessions, get_current_user
+from factories import dentist_factory, patient_factory, principal_factory, treatment_factory, user_factory
 
-# Create an in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+def enable_savepoints(engine):
+    """
+    Let SQLAlchemy issue BEGIN itself on a pysqlite or aiosqlite engine.
 
-@pytest.fixture(scope="function")
-def db_session():
-    """Create a fresh database session for each test."""
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
-    TestingSessionLocal = sessionmaker(bind=engine)
-    
+    The sqlite3 module otherwise starts and ends transactions on its own,
+    which breaks SAVEPOINT and so the per-test rollback below.
+    """
+    @event.listens_for(engine, "connect")
+    def _disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+@pytest.fixture(scope="session")
+def database_path(tmp_path_factory):
+    """SQLite file holding the schema, one per pytest-xdist worker."""
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    return tmp_path_factory.getbasetemp() / f"test-{worker}.db"
+
+@pytest.fixture(scope="session")
+def db_engine(database_path):
+    """Engine on the test database, with the schema created once per test run."""
+    engine = create_engine(f"sqlite:///{database_path}", connect_args={"check_same_thread": False})
+    enable_savepoints(engine)
     Base.metadata.create_all(engine)
-    session = TestingSessionLocal()
-    
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db_connection(db_engine):
+    """Connection inside a transaction that is rolled back after the test."""
+    with db_engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            yield connection
+        finally:
+            transaction.rollback()
+
+@pytest.fixture(scope="function")
+def db_session(db_connection):
+    """
+    Create a database session for each test.
+
+    The test runs inside a SAVEPOINT of db_connection: its commits release
+    nested savepoints and its rollbacks return to them, and everything is
+    rolled back afterwards, so every test starts from the same data.
+    """
+    savepoint = db_connection.begin_nested()
+    session = Session(bind=db_connection, join_transaction_mode="create_savepoint")
     try:
         yield session
     finally:
         session.close()
-        Base.metadata.drop_all(engine)
+        if savepoint.is_active:
+            savepoint.rollback()
+
+@pytest.fixture(scope="session")
+def async_db_engine(database_path, db_engine):
+    """Async engine on the same database file; NullPool keeps connections on their test's event loop."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool)
+    enable_savepoints(engine.sync_engine)
+    return engine
+
+@pytest_asyncio.fixture
+async def async_db_session(async_db_engine):
+    """Create an async database session for each test, rolled back like db_session."""
+    async with async_db_engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, expire_on_commit=False, join_transaction_mode="create_savepoint")
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+@pytest_asyncio.fixture
+async def standalone_async_engine(tmp_path, monkeypatch):
+    """
+    Async engine on a database of its own, used as the read replica by the real session dependencies.
+
+    For tests that exercise those dependencies instead of overriding them;
+    data must be committed to be seen by the sessions they open.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'standalone.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async def read_engine():
+        return engine
+
+    monkeypatch.setattr(async_read_router, "read_engine", read_engine)
+    yield engine
+    await engine.dispose()
+
+@pytest_asyncio.fixture
+async def async_sample_data(async_db_session):
+    """Create a patient, a dentist and a 30 minute treatment through the async session."""
+    patient = patient_factory(user=user_factory(email="async@example.com", full_name="Async User"))
+    dentist = dentist_factory(license_number="DEN456")
+    treatment = treatment_factory()
+    async_db_session.add_all([patient, dentist, treatment])
+    await async_db_session.commit()
+    return patient, dentist, treatment
+
+@pytest_asyncio.fixture
+async def async_client(async_db_session):
+    """HTTP client for the API routers, bound to the async test session and an administrator principal."""
+    app = FastAPI()
+    app.include_router(appointments.router)
+    app.include_router(patients.router)
+    app.include_router(treatments.router)
+    app.include_router(reports.router)
+    app.dependency_overrides[get_async_db] = lambda: async_db_session
+    app.dependency_overrides[get_async_read_db] = lambda: async_db_session
+
+    @asynccontextmanager
+    async def test_session():
+        # Streams share the test session, which the fixture closes
+        yield async_db_session
+
+    app.dependency_overrides[get_async_read_sessions] = lambda: test_session
+    app.dependency_overrides[get_current_user] = lambda: principal_factory(id=1, email="api@example.com")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+@pytest.fixture(autouse=True)
+def reset_appointment_index():
+    """Keep the process-wide interval index and caches from leaking between tests, whose rows are rolled back."""
+    appointment_index.clear()
+    schedule_cache.clear()
+    treatment_catalog.clear()
+    principal_cache.clear()
+    yield
+    appointment_index.clear()
+    schedule_cache.clear()
+    treatment_catalog.clear()
+    principal_cache.clear()
 
 @pytest.fixture
 def sample_user(db_session):
     """Create a sample user for testing."""
-    user = User(
-        email="test@example.com",
-        full_name="Test User",
-        hashed_password="dummy_hashed_password"
-    )
+    user = user_factory(email="test@example.com", full_name="Test User")
     db_session.add(user)
     db_session.commit()
     return user
@@ -52,11 +183,7 @@ def sample_user(db_session):
 @pytest.fixture
 def sample_dentist(db_session, sample_user):
     """Create a sample dentist for testing."""
-    dentist = Dentist(
-        staff_id=1,
-        specialization="General Dentistry",
-        license_number="DEN123"
-    )
+    dentist = dentist_factory(staff_id=1, license_number="DEN123")
     db_session.add(dentist)
     db_session.commit()
     return dentist
@@ -64,13 +191,7 @@ def sample_dentist(db_session, sample_user):
 @pytest.fixture
 def sample_treatment(db_session):
     """Create a sample treatment for testing."""
-    treatment = Treatment(
-        name="Regular Checkup",
-        description="Standard dental examination",
-        duration_minutes=30,
-        price=50.00,
-        category="Examination"
-    )
+    treatment = treatment_factory()
     db_session.add(treatment)
     db_session.commit()
     return treatment
@@ -78,8 +199,8 @@ def sample_treatment(db_session):
 @pytest.fixture
 def sample_patient(db_session, sample_user):
     """Create a sample patient for testing."""
-    patient = Patient(
-        user_id=sample_user.id,
+    patient = patient_factory(
+        user=sample_user,
         medical_history="No significant history",
         allergies="None",
         emergency_contact="123-456-7890"
@@ -0,0 +1,62 @@
+"""
+Model factories for the dental clinic system tests.
+Each factory builds an unsaved model instance with unique, valid defaults;
+keyword arguments override any column. Add the result to a sync or async
+session and flush or commit it as the test requires. principal_factory
+builds the authenticated principal that route tests sign in as.
+"""
+
+from itertools import count
+
+from app.models.dentists import Dentist
+from app.models.patients import Patient
+from app.models.treatments import Treatment
+from app.models.users import User
+from app.services.principal_cache import ALL_PERMISSIONS, Principal
+
+_sequence = count(1)
+
+def user_factory(**fields) -> User:
+    """A user with a unique email."""
+    n = next(_sequence)
+    return User(**{
+        "email": f"user{n}@example.com",
+        "full_name": f"Test User {n}",
+        "hashed_password": "dummy_hashed_password",
+        **fields
+    })
+
+def patient_factory(user: User = None, **fields) -> Patient:
+    """A patient with a new user of their own unless one is given."""
+    return Patient(user=user if user is not None else user_factory(), **fields)
+
+def dentist_factory(**fields) -> Dentist:
+    """A general dentist with a unique license number."""
+    return Dentist(**{
+        "specialization": "General Dentistry",
+        "license_number": f"DEN{next(_sequence):05d}",
+        **fields
+    })
+
+def treatment_factory(**fields) -> Treatment:
+    """A 30 minute examination."""
+    return Treatment(**{
+        "name": "Regular Checkup",
+        "description": "Standard dental examination",
+        "duration_minutes": 30,
+        "price": 50.00,
+        "category": "Examination",
+        **fields
+    })
+
+def principal_factory(**fields) -> Principal:
+    """An administrator holding every permission."""
+    n = next(_sequence)
+    return Principal(**{
+        "id": n,
+        "email": f"user{n}@example.com",
+        "full_name": f"Test User {n}",
+        "roles": ("admin",),
+        "permissions": ALL_PERMISSIONS,
+        **fields
+    })
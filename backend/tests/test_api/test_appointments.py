@@ -0,0 +1,170 @@
+"""
+Tests for the appointment API endpoints.
+"""
+
+import json
+import subprocess
+import sys
+import time
+import httpx
+import pytest
+from datetime import datetime, timedelta
+from pathlib import Path
+from fastapi import FastAPI
+from jose import jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.endpoints import appointments
+from app.core.dependencies import get_async_db, get_async_read_db, get_async_read_sessions, get_current_user
+from app.core.settings import settings
+from app.models.appointments import Appointment, AppointmentStatus
+from app.models.users import Role
+from app.services.principal_cache import principal_cache
+from factories import dentist_factory, patient_factory, principal_factory, treatment_factory, user_factory
+
+@pytest.mark.asyncio
+async def test_dentist_schedule_paging_and_ndjson(async_client, async_db_session, async_sample_data):
+    """Test that the schedule endpoint pages via X-Next-Cursor and streams NDJSON."""
+    patient, dentist, treatment = async_sample_data
+    base_time = datetime(2030, 1, 7, 8, 0)
+    for i in range(3):
+        async_db_session.add(Appointment(
+            patient_id=patient.id,
+            dentist_id=dentist.id,
+            treatment_id=treatment.id,
+            datetime=base_time + timedelta(hours=i),
+            end_datetime=base_time + timedelta(hours=i, minutes=30),
+            status=AppointmentStatus.SCHEDULED
+        ))
+    await async_db_session.commit()
+    url = f"/appointments/dentist/{dentist.id}/schedule"
+    params = {"start_date": base_time.isoformat(), "end_date": (base_time + timedelta(days=1)).isoformat()}
+
+    first = await async_client.get(url, params={**params, "limit": 2})
+    second = await async_client.get(url, params={**params, "limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert [a["datetime"] for a in first.json() + second.json()] == [
+        (base_time + timedelta(hours=i)).isoformat() for i in range(3)
+    ]
+    assert "X-Next-Cursor" not in second.headers
+
+    streamed = await async_client.get(url, params={**params, "stream": "true"})
+    assert streamed.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in streamed.text.splitlines()]
+    assert [line["id"] for line in lines] == [a["id"] for a in first.json() + second.json()]
+    assert "notes" not in first.json()[0] and "notes" not in lines[0]
+
+@pytest.mark.asyncio
+async def test_dentist_schedule_etag(async_client, async_db_session, async_sample_data):
+    """Test that an unchanged schedule answers 304 and a booking changes the ETag."""
+    patient, dentist, treatment = async_sample_data
+    base_time = datetime(2030, 1, 7, 8, 0)
+    url = f"/appointments/dentist/{dentist.id}/schedule"
+    params = {"start_date": base_time.isoformat(), "end_date": (base_time + timedelta(days=1)).isoformat()}
+
+    first = await async_client.get(url, params=params)
+    assert first.json() == []
+    etag = first.headers["ETag"]
+    unchanged = await async_client.get(url, params=params, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+
+    created = await async_client.post("/appointments/", json={
+        "patient_id": patient.id,
+        "dentist_id": dentist.id,
+        "treatment_id": treatment.id,
+        "datetime": base_time.isoformat()
+    })
+    assert created.status_code == 200
+    changed = await async_client.get(url, params=params, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [a["id"] for a in changed.json()] == [created.json()["id"]]
+
+@pytest.mark.asyncio
+async def test_schedule_stream_owns_its_session(standalone_async_engine):
+    """Test that the NDJSON schedule reads on its own session, with the real session dependencies."""
+    base_time = datetime(2030, 1, 7, 8, 0)
+    async with AsyncSession(standalone_async_engine, expire_on_commit=False) as db:
+        patient, dentist, treatment = patient_factory(), dentist_factory(), treatment_factory()
+        db.add_all([patient, dentist, treatment])
+        await db.flush()
+        db.add_all(
+            Appointment(
+                patient_id=patient.id,
+                dentist_id=dentist.id,
+                treatment_id=treatment.id,
+                datetime=base_time + timedelta(hours=i),
+                end_datetime=base_time + timedelta(hours=i, minutes=30),
+                status=AppointmentStatus.SCHEDULED
+            )
+            for i in range(3)
+        )
+        await db.commit()
+    window = dict(start_date=base_time, end_date=base_time + timedelta(days=1))
+
+    app = FastAPI()
+    app.include_router(appointments.router)
+    app.dependency_overrides[get_current_user] = lambda: principal_factory(id=1, email="api@example.com")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        streamed = await client.get(
+            f"/appointments/dentist/{dentist.id}/schedule",
+            params={**{k: v.isoformat() for k, v in window.items()}, "stream": "true"}
+        )
+    assert len(streamed.text.splitlines()) == 3
+
+    # FastAPI 0.106 to 0.117 close the request's session before sending the body
+    request_session = get_async_read_db()
+    response = await appointments.get_dentist_schedule(
+        dentist_id=dentist.id, stream=True, if_none_match=None,
+        db=await request_session.__anext__(), open_session=get_async_read_sessions(),
+        _current_user=None, **window
+    )
+    await request_session.aclose()
+    lines = [json.loads(line) async for chunk in response.body_iterator for line in chunk.splitlines()]
+    assert [line["datetime"] for line in lines] == [
+        (base_time + timedelta(hours=i)).isoformat() for i in range(3)
+    ]
+    # The stream closed the session it opened
+    assert standalone_async_engine.pool.checkedout() == 0
+
+@pytest.mark.asyncio
+async def test_routes_check_the_principals_permissions(async_db_session, async_sample_data):
+    """Test that a bearer token's role permissions decide which routes it may call."""
+    patient, dentist, treatment = async_sample_data
+    start = datetime(2030, 1, 7, 9, 0)
+    appointment = Appointment(
+        patient_id=patient.id,
+        dentist_id=dentist.id,
+        treatment_id=treatment.id,
+        datetime=start,
+        end_datetime=start + timedelta(minutes=30),
+        status=AppointmentStatus.SCHEDULED
+    )
+    user = user_factory(roles=[Role(name="patient", permissions=["appointments:read", "treatments:read"])])
+    async_db_session.add_all([appointment, user])
+    await async_db_session.commit()
+    claims = {"sub": str(user.id), "jti": "patient-token", "exp": int(time.time()) + 3600}
+    headers = {"Authorization": f"Bearer {jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)}"}
+
+    app = FastAPI()
+    app.include_router(appointments.router)
+    app.dependency_overrides[get_async_db] = lambda: async_db_session
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get(f"/appointments/{appointment.id}", headers=headers)).status_code == 200
+        booking = {
+            "patient_id": patient.id, "dentist_id": dentist.id, "treatment_id": treatment.id,
+            "datetime": (start + timedelta(hours=1)).isoformat()
+        }
+        assert (await client.post("/appointments/", json=booking, headers=headers)).status_code == 403
+        cancel = await client.patch(
+            f"/appointments/{appointment.id}/status", params={"status": "cancelled"}, headers=headers
+        )
+        assert cancel.status_code == 403
+        principal_cache.revoke_token("patient-token", claims["exp"])
+        assert (await client.get(f"/appointments/{appointment.id}", headers=headers)).status_code == 401
+
+def test_router_imports_on_its_own():
+    """Test that the router imports in a fresh interpreter, without the models preloaded."""
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.api.endpoints.appointments"],
+        cwd=Path(__file__).resolve().parents[2], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
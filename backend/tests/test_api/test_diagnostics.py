@@ -0,0 +1,40 @@
+"""
+Tests for the query statistics header and the diagnostics endpoints.
+"""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from app.api.endpoints import diagnostics, patients
+from app.core.dependencies import get_async_db, get_current_user
+from app.core.middleware import QueryStatsMiddleware
+from app.db.instrumentation import instrument_engine
+from factories import principal_factory
+
+@pytest.mark.asyncio
+async def test_query_stats_header(async_db_session, async_sample_data):
+    """Test that responses report the queries their request ran."""
+    patient, _, _ = async_sample_data
+    instrument_engine(async_db_session.bind.engine, slow_query_ms=1000)
+    app = FastAPI()
+    app.include_router(patients.router)
+    app.include_router(diagnostics.router)
+    app.add_middleware(QueryStatsMiddleware, expose_header=True)
+    app.dependency_overrides[get_async_db] = lambda: async_db_session
+    app.dependency_overrides[get_current_user] = lambda: principal_factory(id=1, email="api@example.com")
+    async_db_session.expunge_all()
+    # Open the test's SAVEPOINT outside the measured requests
+    await async_db_session.connection()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        chart = await client.get(f"/patients/{patient.id}/chart")
+        gauges = await client.get("/diagnostics/database")
+
+    assert chart.status_code == 200
+    assert chart.headers["X-DB-Stats"].startswith("queries=3; db_ms=")
+    assert gauges.status_code == 200
+    assert gauges.headers["X-DB-Stats"].startswith("queries=0;")
+    pools = gauges.json()["pools"]
+    assert pools["sync"]["size"] == pools["async"]["size"] == 5
+    assert "hits" in gauges.json()["treatment_catalog"]
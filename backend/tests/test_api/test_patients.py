@@ -0,0 +1,37 @@
+"""
+Tests for the patient API endpoints.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from app.models.appointments import Appointment, AppointmentStatus
+
+@pytest.mark.asyncio
+async def test_patient_chart(async_client, async_db_session, async_sample_data):
+    """Test that the chart lists treatments and appointments newest first."""
+    patient, dentist, treatment = async_sample_data
+    base_time = datetime(2030, 1, 7, 8, 0)
+    for i in range(2):
+        async_db_session.add(Appointment(
+            patient_id=patient.id,
+            dentist_id=dentist.id,
+            treatment_id=treatment.id,
+            datetime=base_time + timedelta(days=i),
+            end_datetime=base_time + timedelta(days=i, minutes=30),
+            status=AppointmentStatus.SCHEDULED
+        ))
+    await async_db_session.commit()
+    patient_id = patient.id
+    async_db_session.expunge_all()
+
+    response = await async_client.get(f"/patients/{patient_id}/chart")
+    assert response.status_code == 200
+    chart = response.json()
+    assert chart["full_name"] == "Async User"
+    assert [a["datetime"] for a in chart["appointments"]] == [
+        (base_time + timedelta(days=i)).isoformat() for i in (1, 0)
+    ]
+    assert chart["appointments"][0]["treatment"]["name"] == "Regular Checkup"
+    assert chart["appointments"][0]["dentist_name"] is None
+
+    assert (await async_client.get("/patients/999/chart")).status_code == 404
@@ -0,0 +1,39 @@
+"""
+Tests for the reporting API endpoints.
+"""
+
+import pytest
+from datetime import datetime, time, timedelta
+from app.models.appointments import Appointment, AppointmentStatus
+from app.models.schedules import DentistSchedule
+
+@pytest.mark.asyncio
+async def test_utilization_report(async_client, async_db_session, async_sample_data):
+    """Test the weekly utilization report and range validation."""
+    patient, dentist, treatment = async_sample_data
+    async_db_session.add(DentistSchedule(
+        dentist_id=dentist.id, day_of_week="Monday", start_time=time(9), end_time=time(10)
+    ))
+    start = datetime(2030, 1, 7, 9, 0)
+    async_db_session.add(Appointment(
+        patient_id=patient.id,
+        dentist_id=dentist.id,
+        treatment_id=treatment.id,
+        datetime=start,
+        end_datetime=start + timedelta(minutes=15),
+        status=AppointmentStatus.COMPLETED
+    ))
+    await async_db_session.commit()
+
+    response = await async_client.get("/reports/utilization", params={
+        "start_date": "2030-01-07", "end_date": "2030-01-13", "period": "week", "dentist_id": dentist.id
+    })
+    assert response.status_code == 200
+    assert response.json() == [{
+        "dentist_id": dentist.id, "period_start": "2030-01-07",
+        "available_minutes": 60, "booked_minutes": 15, "no_show_minutes": 0,
+        "idle_minutes": 45, "idle_gaps": 1, "utilization": 0.25
+    }]
+
+    invalid = await async_client.get("/reports/utilization", params={"start_date": "2030-01-07", "end_date": "2030-01-01"})
+    assert invalid.status_code == 400
@@ -0,0 +1,89 @@
+"""
+Tests for the treatment API endpoints.
+"""
+
+import csv
+import io
+import json
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.endpoints import treatments
+from app.core.dependencies import get_async_read_sessions
+from app.models.appointments import Appointment, AppointmentStatus
+from app.models.dentists import Dentist
+from factories import dentist_factory, patient_factory, treatment_factory
+
+@pytest.mark.asyncio
+async def test_export_treatment_history(async_client, async_db_session, async_sample_data):
+    """Test CSV and NDJSON exports of completed treatments with dentist and date filters."""
+    patient, dentist, treatment = async_sample_data
+    other = Dentist(license_number="DEN789")
+    async_db_session.add(other)
+    await async_db_session.flush()
+    base_time = datetime(2030, 1, 7, 8, 0)
+    for day, dentist_id, status in [
+        (0, dentist.id, AppointmentStatus.COMPLETED),
+        (1, dentist.id, AppointmentStatus.COMPLETED),
+        (2, other.id, AppointmentStatus.COMPLETED),
+        (3, dentist.id, AppointmentStatus.CANCELLED),
+        (40, dentist.id, AppointmentStatus.COMPLETED),
+    ]:
+        async_db_session.add(Appointment(
+            patient_id=patient.id,
+            dentist_id=dentist_id,
+            treatment_id=treatment.id,
+            datetime=base_time + timedelta(days=day),
+            end_datetime=base_time + timedelta(days=day, minutes=30),
+            status=status
+        ))
+    await async_db_session.commit()
+    params = {
+        "patient_id": patient.id,
+        "dentist_id": dentist.id,
+        "end_date": (base_time + timedelta(days=30)).isoformat()
+    }
+
+    ndjson = await async_client.get("/treatments/history/export", params=params)
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [line["appointment_date"] for line in lines] == [
+        (base_time + timedelta(days=day)).isoformat() for day in (1, 0)
+    ]
+    assert lines[0]["treatment_name"] == "Regular Checkup" and lines[0]["price"] == 50.0
+
+    exported = await async_client.get("/treatments/history/export", params={**params, "format": "csv"})
+    assert exported.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(exported.text)))
+    assert [int(row["appointment_id"]) for row in rows] == [line["appointment_id"] for line in lines]
+
+    clinic_wide = await async_client.get("/treatments/history/export")
+    assert len(clinic_wide.text.splitlines()) == 4
+
+@pytest.mark.asyncio
+async def test_export_reads_on_its_own_session(standalone_async_engine):
+    """Test that an export body opens and closes its own session through the real dependency."""
+    async with AsyncSession(standalone_async_engine) as db:
+        patient, dentist, treatment = patient_factory(), dentist_factory(), treatment_factory()
+        db.add_all([patient, dentist, treatment])
+        await db.flush()
+        db.add(Appointment(
+            patient=patient,
+            dentist=dentist,
+            treatment=treatment,
+            datetime=datetime(2030, 1, 7, 8, 0),
+            end_datetime=datetime(2030, 1, 7, 8, 30),
+            status=AppointmentStatus.COMPLETED
+        ))
+        await db.commit()
+
+    response = await treatments.export_treatment_history(
+        format=treatments.ExportFormat.CSV,
+        open_session=get_async_read_sessions(),
+        current_user=None
+    )
+    # Nothing is read until the body is sent
+    assert standalone_async_engine.pool.checkedout() == 0
+    body = "".join([chunk async for chunk in response.body_iterator])
+    assert [row["treatment_name"] for row in csv.DictReader(io.StringIO(body))] == ["Regular Checkup"]
+    assert standalone_async_engine.pool.checkedout() == 0
@@ -2,10 +2,25 @@
 Tests for the appointment management service.
 """
 
+import asyncio
+import threading
 import pytest
-from datetime import datetime, timedelta
-from app.services.appointment_service import AppointmentSystem
-from app.models.appointments import AppointmentStatus
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from sqlalchemy import Update, create_engine, event, inspect, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.services.appointment_service import AppointmentSystem, AsyncAppointmentSystem
+from app.services.booking_lock import async_dentist_locks, dentist_locks
+from app.models.base import Base
+from app.models.appointments import OVERLAP_CONSTRAINT, Appointment, AppointmentEventType, AppointmentStatus
+from app.models.dentists import Dentist
+from app.models.patients import Patient
+from app.models.users import User
+from app.models.treatments import Treatment
+from app.models.schedules import DentistSchedule
+from app.services.interval_index import IntervalSet, appointment_index
 
 def test_schedule_appointment(db_session, sample_patient, sample_dentist, sample_treatment):
     """Test creating a new appointment."""
@@ -70,7 +85,10 @@ def test_update_appointment_status(db_session, sample_patient, sample_dentist, s
     )
     
     assert updated_appointment.status == AppointmentStatus.CONFIRMED
-    assert "Confirmed by patient" in updated_appointment.notes
+    events, _ = AppointmentSystem.get_appointment_events(db_session, appointment.id)
+    assert [e.event_type for e in events] == [AppointmentEventType.CREATED, AppointmentEventType.STATUS_CHANGED]
+    assert events[1].from_status == AppointmentStatus.SCHEDULED
+    assert events[1].note == "Confirmed by patient"
 
 def test_get_dentist_schedule(db_session, sample_patient, sample_dentist, sample_treatment):
     """Test retrieving a dentist's schedule."""
@@ -97,4 +115,487 @@ def test_get_dentist_schedule(db_session, sample_patient, sample_dentist, sample
     )
     
     assert len(schedule) == 3
-    assert all(appt.id in [a.id for a in appointments] for appt in schedule)
\ No newline at end of file
+    assert all(appt.id in [a.id for a in appointments] for appt in schedule)
+def test_conflict_uses_existing_treatment_duration(db_session, sample_patient, sample_dentist, sample_treatment):
+    """Test that a long existing appointment blocks a shorter one starting inside it."""
+    long_treatment = Treatment(
+        name="Root Canal",
+        description="Endodontic treatment",
+        duration_minutes=90,
+        price=400.00,
+        category="Endodontics"
+    )
+    db_session.add(long_treatment)
+    db_session.commit()
+    appointment_time = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    AppointmentSystem.schedule_appointment(
+        db=db_session,
+        patient_id=sample_patient.id,
+        dentist_id=sample_dentist.id,
+        treatment_id=long_treatment.id,
+        datetime=appointment_time
+    )
+
+    # Checked once from a cold index and once from the warm index
+    for _ in range(2):
+        assert AppointmentSystem.has_conflict(
+            db_session, sample_dentist.id, appointment_time + timedelta(minutes=60), sample_treatment.id
+        )
+        appointment_index.clear()
+    assert not AppointmentSystem.has_conflict(
+        db_session, sample_dentist.id, appointment_time + timedelta(minutes=90), sample_treatment.id
+    )
+
+def test_interval_set_updates_in_place():
+    """Test overlap queries against intervals added and discarded one by one."""
+    day = datetime(2030, 1, 7, 8, 0)
+    window = IntervalSet([(day + timedelta(hours=2), day + timedelta(hours=3), 2)])
+    window.add(day, day + timedelta(hours=1), 1)
+    window.add(day, day + timedelta(hours=1), 1)
+    assert window.ids == [1, 2]
+    assert window.overlaps(day + timedelta(minutes=30), day + timedelta(minutes=45))
+    assert not window.overlaps(day + timedelta(hours=1), day + timedelta(hours=2))
+    assert window.overlaps(day + timedelta(hours=1), day + timedelta(hours=2, minutes=1))
+    window.discard(day + timedelta(hours=2), 2)
+    window.discard(day + timedelta(hours=2), 2)
+    assert window.ids == [1]
+    assert not window.overlaps(day + timedelta(hours=1), day + timedelta(hours=4))
+
+def test_warm_windows_are_trusted_until_they_expire(
+    db_session, sample_patient, sample_dentist, sample_treatment, monkeypatch
+):
+    """Test that warm windows answer without a query and the database catches what they miss."""
+    appointment_time = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    appointment = AppointmentSystem.schedule_appointment(
+        db=db_session,
+        patient_id=sample_patient.id,
+        dentist_id=sample_dentist.id,
+        treatment_id=sample_treatment.id,
+        datetime=appointment_time
+    )
+    assert AppointmentSystem.has_conflict(db_session, sample_dentist.id, appointment_time, sample_treatment.id)
+    statements = []
+    event.listen(db_session.connection(), "before_execute", lambda *args: statements.append(args[1]))
+
+    # Cancelled by another worker, whose change reaches this index once the window expires
+    db_session.execute(
+        update(Appointment).where(Appointment.id == appointment.id).values(status=AppointmentStatus.CANCELLED)
+    )
+    db_session.commit()
+    dentist_id, treatment_id = sample_dentist.id, sample_treatment.id
+    statements.clear()
+    assert AppointmentSystem.has_conflict(db_session, dentist_id, appointment_time, treatment_id)
+    assert statements == []
+    monkeypatch.setattr(appointment_index, "ttl_seconds", 0)
+    assert not AppointmentSystem.has_conflict(db_session, sample_dentist.id, appointment_time, sample_treatment.id)
+    monkeypatch.undo()
+
+    # Booked by another worker: the warm window misses it, the overlap constraint does not
+    later = appointment_time + timedelta(hours=1)
+    db_session.add(Appointment(
+        patient_id=sample_patient.id,
+        dentist_id=sample_dentist.id,
+        treatment_id=sample_treatment.id,
+        datetime=later,
+        end_datetime=later + timedelta(minutes=30),
+        status=AppointmentStatus.SCHEDULED
+    ))
+    db_session.commit()
+    assert not AppointmentSystem.has_conflict(db_session, sample_dentist.id, later, sample_treatment.id)
+    with pytest.raises(ValueError, match="Time slot is not available"):
+        AppointmentSystem.schedule_appointment(
+            db=db_session,
+            patient_id=sample_patient.id,
+            dentist_id=sample_dentist.id,
+            treatment_id=sample_treatment.id,
+            datetime=later
+        )
+    assert AppointmentSystem.has_conflict(db_session, sample_dentist.id, later, sample_treatment.id)
+
+def test_cancelled_appointment_frees_slot(db_session, sample_patient, sample_dentist, sample_treatment):
+    """Test that the interval index releases a slot when its appointment is cancelled."""
+    appointment_time = datetime.now() + timedelta(days=1)
+
+    appointment = AppointmentSystem.schedule_appointment(
+        db=db_session,
+        patient_id=sample_patient.id,
+        dentist_id=sample_dentist.id,
+        treatment_id=sample_treatment.id,
+        datetime=appointment_time
+    )
+    assert AppointmentSystem.has_conflict(db_session, sample_dentist.id, appointment_time, sample_treatment.id)
+
+    AppointmentSystem.update_appointment_status(
+        db=db_session,
+        appointment_id=appointment.id,
+        new_status=AppointmentStatus.CANCELLED
+    )
+    assert not AppointmentSystem.has_conflict(db_session, sample_dentist.id, appointment_time, sample_treatment.id)
+
+def test_reactivation_into_overlap_is_rejected(db_session, sample_patient, sample_dentist, sample_treatment):
+    """Test that reactivating a cancelled appointment over a newer booking raises a ValueError."""
+    appointment_time = datetime.now() + timedelta(days=1)
+    booking = dict(
+        patient_id=sample_patient.id,
+        dentist_id=sample_dentist.id,
+        treatment_id=sample_treatment.id,
+        datetime=appointment_time
+    )
+
+    cancelled = AppointmentSystem.schedule_appointment(db=db_session, **booking)
+    AppointmentSystem.update_appointment_status(db_session, cancelled.id, AppointmentStatus.CANCELLED)
+    AppointmentSystem.schedule_appointment(db=db_session, **dict(booking, datetime=appointment_time + timedelta(minutes=15)))
+
+    with pytest.raises(ValueError, match="Time slot is not available"):
+        AppointmentSystem.update_appointment_status(db_session, cancelled.id, AppointmentStatus.SCHEDULED)
+    assert db_session.get(Appointment, cancelled.id).status == AppointmentStatus.CANCELLED
+
+def test_concurrent_status_change_applies_once(db_session, sample_patient, sample_dentist, sample_treatment):
+    """Test that a status change whose old status was changed meanwhile is rejected, not counted twice."""
+    appointment = AppointmentSystem.schedule_appointment(
+        db=db_session,
+        patient_id=sample_patient.id,
+        dentist_id=sample_dentist.id,
+        treatment_id=sample_treatment.id,
+        datetime=datetime.now() + timedelta(days=1)
+    )
+    raced = []
+
+    # Another request completes the appointment between the status read and the update
+    @event.listens_for(db_session.connection(), "before_execute")
+    def complete_first(conn, statement, *args):
+        if isinstance(statement, Update) and not raced:
+            raced.append(statement)
+            conn.execute(
+                update(Appointment).where(Appointment.id == appointment.id).values(status=AppointmentStatus.COMPLETED)
+            )
+
+    with pytest.raises(ValueError, match="changed by another request"):
+        AppointmentSystem.update_appointment_status(db_session, appointment.id, AppointmentStatus.COMPLETED)
+    assert raced
+    assert [e.event_type for e in AppointmentSystem.get_appointment_events(db_session, appointment.id)[0]] == [
+        AppointmentEventType.CREATED
+    ]
+
+def test_find_available_slots(db_session, sample_patient, sample_dentist, sample_treatment):
+    """Test that booked intervals are subtracted from the dentist's working hours."""
+    day = (datetime.now() + timedelta(days=7)).date()
+    db_session.add(DentistSchedule(
+        dentist_id=sample_dentist.id,
+        day_of_week=day.strftime("%A"),
+        start_time=time(9, 0),
+        end_time=time(11, 0)
+    ))
+    db_session.commit()
+    AppointmentSystem.schedule_appointment(
+        db=db_session,
+        patient_id=sample_patient.id,
+        dentist_id=sample_dentist.id,
+        treatment_id=sample_treatment.id,
+        datetime=datetime.combine(day, time(9, 30))
+    )
+
+    slots = AppointmentSystem.find_available_slots(
+        db=db_session,
+        dentist_ids=[sample_dentist.id],
+        treatment_id=sample_treatment.id,
+        date_range=(day, day + timedelta(days=1)),
+        step_minutes=15
+    )
+
+    starts = [slot['start'].time() for slot in slots]
+    assert starts == [time(9, 0), time(10, 0), time(10, 15), time(10, 30)]
+    assert all(slot['end'] - slot['start'] == timedelta(minutes=30) for slot in slots)
+
+def test_schedule_appointments_bulk(db_session, sample_patient, sample_dentist, sample_treatment):
+    """Test bulk booking against existing appointments and within the batch."""
+    base_time = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    AppointmentSystem.schedule_appointment(
+        db=db_session,
+        patient_id=sample_patient.id,
+        dentist_id=sample_dentist.id,
+        treatment_id=sample_treatment.id,
+        datetime=base_time
+    )
+    booking = {
+        'patient_id': sample_patient.id,
+        'dentist_id': sample_dentist.id,
+        'treatment_id': sample_treatment.id
+    }
+
+    results = AppointmentSystem.schedule_appointments_bulk(
+        db=db_session,
+        bookings=[
+            dict(booking, datetime=base_time + timedelta(minutes=15)),
+            dict(booking, datetime=base_time + timedelta(minutes=60)),
+            dict(booking, datetime=base_time + timedelta(minutes=75)),
+            dict(booking, datetime=base_time + timedelta(minutes=120), treatment_id=999),
+            dict(booking, datetime=base_time + timedelta(minutes=120)),
+        ]
+    )
+
+    assert [r['status'] for r in results] == ['rejected', 'booked', 'rejected', 'rejected', 'booked']
+    assert results[3]['reason'] == "Treatment not found"
+    assert db_session.query(Appointment).count() == 3
+    assert AppointmentSystem.has_conflict(
+        db_session, sample_dentist.id, base_time + timedelta(minutes=130), sample_treatment.id
+    )
+
+def test_database_rejects_overlapping_rows(db_session, sample_patient, sample_dentist, sample_treatment):
+    """Test that the database refuses overlaps written around the service."""
+    appointment_time = datetime.now() + timedelta(days=1)
+    first = AppointmentSystem.schedule_appointment(
+        db=db_session,
+        patient_id=sample_patient.id,
+        dentist_id=sample_dentist.id,
+        treatment_id=sample_treatment.id,
+        datetime=appointment_time
+    )
+    assert first.end_datetime == appointment_time + timedelta(minutes=30)
+
+    db_session.add(Appointment(
+        patient_id=sample_patient.id,
+        dentist_id=sample_dentist.id,
+        treatment_id=sample_treatment.id,
+        datetime=appointment_time + timedelta(minutes=20),
+        end_datetime=appointment_time + timedelta(minutes=50),
+        status=AppointmentStatus.SCHEDULED
+    ))
+    with pytest.raises(IntegrityError, match=OVERLAP_CONSTRAINT):
+        db_session.commit()
+
+def test_concurrent_bookings_never_overlap(tmp_path):
+    """Test that parallel clients booking the same slots never double-book a dentist."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'stress.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    Base.metadata.create_all(engine)
+    SessionFactory = sessionmaker(bind=engine)
+    with SessionFactory() as db:
+        user = User(email="stress@example.com", full_name="Stress Test", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add(Patient(user_id=user.id))
+        db.add_all(Dentist(license_number=f"LIC{i}") for i in range(2))
+        db.add(Treatment(name="Cleaning", duration_minutes=30, price=40.0))
+        db.commit()
+
+    base_time = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    attempts = [
+        (dentist_id, base_time + timedelta(minutes=15 * step))
+        for dentist_id in (1, 2)
+        for step in range(8)
+    ]
+
+    def client(seed):
+        booked = 0
+        with SessionFactory() as db:
+            for dentist_id, start in attempts[seed:] + attempts[:seed]:
+                try:
+                    AppointmentSystem.schedule_appointment(
+                        db=db, patient_id=1, dentist_id=dentist_id, treatment_id=1, datetime=start
+                    )
+                    booked += 1
+                except ValueError:
+                    pass
+        return booked
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        booked = sum(pool.map(client, range(8)))
+
+    with SessionFactory() as db:
+        rows = db.query(Appointment.dentist_id, Appointment.datetime, Appointment.end_datetime).all()
+    engine.dispose()
+
+    assert booked == len(rows)
+    for dentist_id in (1, 2):
+        intervals = sorted((start, end) for d, start, end in rows if d == dentist_id)
+        assert len(intervals) == 4
+        assert all(prev[1] <= cur[0] for prev, cur in zip(intervals, intervals[1:]))
+
+def test_sync_and_async_bookings_share_dentist_locks(db_session):
+    """Test that the fallback locks exclude sync and async bookings alike, on any event loop."""
+    async_engine = create_async_engine("sqlite+aiosqlite://")
+    held, release = threading.Event(), threading.Event()
+
+    def hold_sync():
+        with dentist_locks(db_session, [1]):
+            held.set()
+            release.wait()
+
+    async def book(hold_for=0):
+        async with AsyncSession(async_engine) as db:
+            async with async_dentist_locks(db, [1]):
+                await asyncio.sleep(hold_for)
+
+    async def contend():
+        await asyncio.gather(book(hold_for=0.02), book())
+
+    # Each asyncio.run is a new event loop
+    for _ in range(2):
+        holder = threading.Thread(target=hold_sync)
+        holder.start()
+        held.wait()
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                asyncio.run(asyncio.wait_for(book(), 0.05))
+        finally:
+            release.set()
+            holder.join()
+        asyncio.run(contend())
+        held.clear()
+        release.clear()
+
+@pytest.mark.asyncio
+async def test_async_schedule_and_conflict(async_db_session, async_sample_data):
+    """Test booking, conflict detection and schedule reads through the async service."""
+    # Plain ids, since the rollback after a rejected booking expires loaded objects
+    patient_id, dentist_id, treatment_id = (obj.id for obj in async_sample_data)
+    appointment_time = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    appointment = await AsyncAppointmentSystem.schedule_appointment(
+        db=async_db_session,
+        patient_id=patient_id,
+        dentist_id=dentist_id,
+        treatment_id=treatment_id,
+        datetime=appointment_time
+    )
+    assert appointment.end_datetime == appointment_time + timedelta(minutes=30)
+
+    with pytest.raises(ValueError, match="Time slot is not available"):
+        await AsyncAppointmentSystem.schedule_appointment(
+            db=async_db_session,
+            patient_id=patient_id,
+            dentist_id=dentist_id,
+            treatment_id=treatment_id,
+            datetime=appointment_time + timedelta(minutes=15)
+        )
+
+    schedule = await AsyncAppointmentSystem.get_dentist_schedule(
+        db=async_db_session,
+        dentist_id=dentist_id,
+        start_date=appointment_time.replace(hour=0),
+        end_date=appointment_time.replace(hour=23)
+    )
+    assert [a.id for a in schedule] == [appointment.id]
+
+    await AsyncAppointmentSystem.update_appointment_status(
+        db=async_db_session,
+        appointment_id=appointment.id,
+        new_status=AppointmentStatus.CANCELLED
+    )
+    assert not await AsyncAppointmentSystem.has_conflict(
+        async_db_session, dentist_id, appointment_time, treatment_id
+    )
+
+    await AsyncAppointmentSystem.schedule_appointment(
+        db=async_db_session,
+        patient_id=patient_id,
+        dentist_id=dentist_id,
+        treatment_id=treatment_id,
+        datetime=appointment_time + timedelta(minutes=15)
+    )
+    with pytest.raises(ValueError, match="Time slot is not available"):
+        await AsyncAppointmentSystem.update_appointment_status(
+            db=async_db_session,
+            appointment_id=appointment.id,
+            new_status=AppointmentStatus.SCHEDULED
+        )
+
+@pytest.mark.asyncio
+async def test_async_bulk_booking(async_db_session, async_sample_data):
+    """Test that the async bulk path runs the batch check on the async connection."""
+    patient, dentist, treatment = async_sample_data
+    base_time = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    booking = {'patient_id': patient.id, 'dentist_id': dentist.id, 'treatment_id': treatment.id}
+
+    results = await AsyncAppointmentSystem.schedule_appointments_bulk(
+        db=async_db_session,
+        bookings=[
+            dict(booking, datetime=base_time),
+            dict(booking, datetime=base_time + timedelta(minutes=15)),
+        ]
+    )
+
+    assert [r['status'] for r in results] == ['booked', 'rejected']
+
+def test_dentist_schedule_pages_and_stream(db_session, sample_patient, sample_dentist, sample_treatment):
+    """Test keyset paging over a schedule and streaming the same range."""
+    base_time = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    for i in range(5):
+        AppointmentSystem.schedule_appointment(
+            db=db_session,
+            patient_id=sample_patient.id,
+            dentist_id=sample_dentist.id,
+            treatment_id=sample_treatment.id,
+            datetime=base_time + timedelta(hours=i)
+        )
+    window = dict(
+        dentist_id=sample_dentist.id,
+        start_date=base_time,
+        end_date=base_time + timedelta(days=1)
+    )
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = AppointmentSystem.get_dentist_schedule_page(
+            db=db_session, cursor=cursor, limit=2, **window
+        )
+        seen.extend(appointment.datetime for appointment in page)
+        if cursor is None:
+            break
+
+    assert seen == [base_time + timedelta(hours=i) for i in range(5)]
+    streamed = list(AppointmentSystem.iter_dentist_schedule(db=db_session, batch_size=2, **window))
+    assert [row['datetime'] for row in streamed] == seen
+
+    # Schedule reads leave the notes column unloaded
+    assert 'notes' not in streamed[0]
+    db_session.expire_all()
+    page, _ = AppointmentSystem.get_dentist_schedule_page(db=db_session, **window)
+    assert all('notes' in inspect(appointment).unloaded for appointment in page)
+    with pytest.raises(ValueError, match="Invalid pagination cursor"):
+        AppointmentSystem.get_dentist_schedule_page(db=db_session, cursor="not-a-cursor", **window)
+
+def test_transition_statuses(db_session, sample_patient, sample_dentist, sample_treatment):
+    """Test end-of-day NO_SHOW marking in one statement, skipping final statuses."""
+    base_time = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    ids = [
+        AppointmentSystem.schedule_appointment(
+            db=db_session,
+            patient_id=sample_patient.id,
+            dentist_id=sample_dentist.id,
+            treatment_id=sample_treatment.id,
+            datetime=base_time + timedelta(hours=i)
+        ).id
+        for i in range(4)
+    ]
+    AppointmentSystem.update_appointment_status(db_session, ids[0], AppointmentStatus.COMPLETED)
+    AppointmentSystem.update_appointment_status(db_session, ids[1], AppointmentStatus.CONFIRMED)
+
+    changed = AppointmentSystem.transition_statuses(
+        db=db_session,
+        new_status=AppointmentStatus.NO_SHOW,
+        dentist_id=sample_dentist.id,
+        before=base_time + timedelta(hours=3),
+        notes="Closed day"
+    )
+
+    assert sorted(changed) == ids[1:3]
+    db_session.expire_all()
+    statuses = {a.id: a.status for a in db_session.query(Appointment)}
+    assert [statuses[i] for i in ids] == [
+        AppointmentStatus.COMPLETED,
+        AppointmentStatus.NO_SHOW,
+        AppointmentStatus.NO_SHOW,
+        AppointmentStatus.SCHEDULED
+    ]
+    events, _ = AppointmentSystem.get_appointment_events(db_session, ids[1])
+    assert [(e.from_status, e.to_status, e.note) for e in events[-1:]] == [
+        (AppointmentStatus.CONFIRMED, AppointmentStatus.NO_SHOW, "Closed day")
+    ]
+    assert not AppointmentSystem.has_conflict(db_session, sample_dentist.id, base_time + timedelta(hours=1), sample_treatment.id)
+    with pytest.raises(ValueError, match="No appointment can move"):
+        AppointmentSystem.transition_statuses(db_session, AppointmentStatus.SCHEDULED, dentist_id=sample_dentist.id)
@@ -0,0 +1,62 @@
+"""
+Tests for the query instrumentation.
+"""
+
+import logging
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.db.instrumentation import (
+    TimedQueuePool, current_stats, instrument_engine, pool_gauges, redact_parameters, track_queries
+)
+
+@pytest.fixture
+def instrumented_engine(tmp_path):
+    """A file-backed SQLite engine on a timed queue pool, logging every statement as slow."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}", poolclass=TimedQueuePool, pool_size=2)
+    instrument_engine(engine, slow_query_ms=0)
+    yield engine
+    engine.dispose()
+
+def test_track_queries_counts_statements(instrumented_engine):
+    """Test that statements inside a scope are counted and timed, and outside ones are not."""
+    with instrumented_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    with track_queries() as stats:
+        assert current_stats() is stats
+        with instrumented_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+            conn.execute(text("SELECT 3"))
+    assert current_stats() is None
+    assert stats.queries == 3
+    assert stats.slow_queries == 3
+    assert stats.db_time > 0
+    assert stats.pool_wait > 0
+    assert stats.header_value().startswith("queries=3; db_ms=")
+
+def test_slow_query_log_redacts_parameters(instrumented_engine, caplog):
+    """Test that slow statements are logged with parameter types instead of values."""
+    with caplog.at_level(logging.WARNING, logger="app.db.instrumentation"):
+        with instrumented_engine.connect() as conn:
+            conn.execute(text("SELECT :email"), {"email": "secret@example.com"})
+    assert "SELECT ?" in caplog.text
+    assert "secret@example.com" not in caplog.text
+    assert "['str']" in caplog.text
+
+def test_redact_parameters():
+    """Test redaction of named, positional and executemany parameters."""
+    assert redact_parameters({"a": 1, "b": "x"}) == {"a": "int", "b": "str"}
+    assert redact_parameters((1, None)) == ["int", "NoneType"]
+    assert redact_parameters([{"a": 1}] * 5) == [{"a": "int"}] * 3 + ["... 2 more"]
+
+def test_pool_gauges(instrumented_engine):
+    """Test that gauges follow connections checked out of the pool."""
+    with instrumented_engine.connect():
+        gauges = pool_gauges(instrumented_engine)
+    assert gauges == {'size': 2, 'overflow': 0, 'checked_out': 1, 'checked_in': 0}
+    assert pool_gauges(instrumented_engine)['checked_out'] == 0
@@ -0,0 +1,190 @@
+"""
+Tests for the patient management service.
+"""
+
+import io
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app.models.appointments import Appointment, AppointmentStatus
+from app.models.dentists import Dentist
+from app.models.patients import Patient
+from app.models.staff import Staff
+from app.models.treatments import Treatment
+from app.models.users import User
+from app.services.patient_import import ImportReport, PatientImport, read_records
+from app.services.patient_services import PatientManagement
+
+def make_patients(db_session, people):
+    """Register a patient for each (full_name, email, phone_number)."""
+    for full_name, email, phone_number in people:
+        user = User(full_name=full_name, email=email, phone_number=phone_number, hashed_password="x")
+        db_session.add(user)
+        db_session.flush()
+        PatientManagement.register_patient(db_session, user_id=user.id)
+
+def test_search_patients_by_name_and_email(db_session):
+    """Test case-insensitive substring search over names and emails."""
+    make_patients(db_session, [
+        ("Maria Gonzalez", "maria@example.com", "+1 (555) 010-2000"),
+        ("Mario Rossi", "rossi@example.org", "555-010-3000"),
+        ("Ana Lopez", "ana.gonzalez@example.net", None),
+    ])
+
+    by_name = PatientManagement.search_patients(db_session, "gonz")
+    assert {p.user.full_name for p in by_name} == {"Maria Gonzalez", "Ana Lopez"}
+    assert [p.user.full_name for p in PatientManagement.search_patients(db_session, "ROSSI")] == ["Mario Rossi"]
+    assert [p.user.full_name for p in PatientManagement.search_patients(db_session, "ma")] == ["Maria Gonzalez", "Mario Rossi"]
+
+def test_search_patients_by_phone(db_session):
+    """Test that phone terms ignore formatting and rank exact matches first."""
+    make_patients(db_session, [
+        ("Maria Gonzalez", "maria@example.com", "(555) 010-2000"),
+        ("Mario Rossi", "rossi@example.org", "555-010-20"),
+        ("Ana Lopez", "ana@example.net", "+1 555 999 0000"),
+    ])
+
+    assert db_session.query(User).filter(User.email == "ana@example.net").one().phone_digits == "15559990000"
+    exact_first = PatientManagement.search_patients(db_session, "555 010 20")
+    assert [p.user.full_name for p in exact_first] == ["Mario Rossi", "Maria Gonzalez"]
+    assert [p.user.full_name for p in PatientManagement.search_patients(db_session, "1-555")] == ["Ana Lopez"]
+
+def test_list_patients_pages_by_name(db_session):
+    """Test keyset paging in name order, stable under inserts, with a capped total."""
+    make_patients(db_session, [
+        ("Carla Diaz", "carla@example.com", None),
+        ("Ana Lopez", "ana@example.com", None),
+        ("Bruno Diaz", "bruno@example.com", None),
+        ("Ana Lopez", "ana2@example.com", None),
+        ("Diego Diaz", "diego@example.com", None),
+    ])
+
+    first, cursor = PatientManagement.list_patients(db_session, limit=2)
+    assert [(p.user.full_name, p.id) for p in first] == [("Ana Lopez", 2), ("Ana Lopez", 4)]
+
+    # A patient sorting before the cursor does not shift the following pages
+    make_patients(db_session, [("Aaron Abel", "aaron@example.com", None)])
+    second, cursor = PatientManagement.list_patients(db_session, cursor=cursor, limit=2)
+    third, last = PatientManagement.list_patients(db_session, cursor=cursor, limit=2)
+    assert [p.user.full_name for p in second + third] == ["Bruno Diaz", "Carla Diaz", "Diego Diaz"]
+    assert last is None
+
+    diaz, _ = PatientManagement.list_patients(db_session, search_term="diaz", limit=10)
+    assert [p.user.full_name for p in diaz] == ["Bruno Diaz", "Carla Diaz", "Diego Diaz"]
+    assert PatientManagement.count_patients(db_session, "diaz") == (3, True)
+    assert PatientManagement.count_patients(db_session, cap=4) == (4, False)
+
+    # Pages seek the (full_name, id) users index instead of sorting
+    _, cursor = PatientManagement.list_patients(db_session, limit=2)
+    listing = PatientManagement.listing_statement("sqlite", cursor=cursor).limit(2)
+    sql = str(listing.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True}))
+    plan = [row[3] for row in db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    assert any("ix_users_full_name_id" in step for step in plan)
+    assert not any("TEMP B-TREE" in step for step in plan)
+
+def test_search_patients_offset_paging_is_deprecated(db_session):
+    """Test that asking search_patients for a later page warns and points to list_patients."""
+    make_patients(db_session, [
+        ("Bruno Diaz", "bruno@example.com", None),
+        ("Carla Diaz", "carla@example.com", None),
+    ])
+    assert len(PatientManagement.search_patients(db_session, "diaz", per_page=1)) == 1
+    with pytest.warns(DeprecationWarning, match="list_patients"):
+        second = PatientManagement.search_patients(db_session, "diaz", page=2, per_page=1)
+    assert len(second) == 1
+
+def test_import_patients_dedupes_and_reports_rejects(db_session):
+    """Test chunked import with duplicates within and across chunks and invalid rows."""
+    # Registered before emails were normalized, so stored in mixed case
+    make_patients(db_session, [("Existing Patient", "Taken@Example.com", None)])
+    source = io.StringIO(
+        "email,full_name,phone_number,allergies\n"
+        "Ana@Example.com,Ana Lopez,+1 (555) 010-2000,Penicillin\n"
+        "ana@example.com,Ana Again,,\n"
+        "bruno@example.com,Bruno Diaz,,\n"
+        "ANA@example.com,Ana Later,,\n"
+        "taken@example.com,Someone Else,,\n"
+        "not-an-email,Broken Row,,\n"
+        "carla@example.com,,,\n"
+    )
+    rejects = io.StringIO()
+
+    report = PatientImport.import_patients(
+        db_session, read_records(source, "csv"), rejects=rejects, chunk_size=2
+    )
+
+    assert report == ImportReport(imported=2, rejected=5)
+    ana = db_session.query(User).filter(User.email == "ana@example.com").one()
+    assert ana.phone_digits == "15550102000"
+    assert ana.patient_profile.allergies == "Penicillin"
+    assert db_session.query(Patient).count() == 3
+    assert [(r["line"], r["reason"]) for r in map(json.loads, rejects.getvalue().splitlines())] == [
+        (3, "duplicate email"),
+        (5, "email already registered"),
+        (6, "email already registered"),
+        (7, "invalid email"),
+        (8, "missing full_name"),
+    ]
+
+    # The case-insensitive lookup is served by the lower(email) index
+    lookup = select(User.id).where(func.lower(User.email).in_(["taken@example.com"]))
+    sql = str(lookup.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True}))
+    plan = [row[3] for row in db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    assert any("ix_users_email_lower" in step for step in plan)
+
+@contextmanager
+def count_queries(db_session):
+    """Count the statements a session sends to the database."""
+    statements = []
+    engine = db_session.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+def test_patient_chart_query_count_is_constant(db_session, sample_patient):
+    """Test that loading a chart costs the same number of queries for 1 or 20 appointments."""
+    patient_id = sample_patient.id
+
+    def book(count):
+        patient = db_session.get(Patient, patient_id)
+        for i in range(count):
+            user = User(email=f"dentist{i}.{count}@example.com", full_name=f"Dr. {i}", hashed_password="x")
+            staff = Staff(user=user, position="Dentist", hire_date=datetime(2020, 1, 1))
+            treatment = Treatment(name=f"Treatment {i}", duration_minutes=30, price=40.0)
+            patient.treatments.append(treatment)
+            start = datetime(2030, 1, 7, 8, 0) + timedelta(days=i, hours=count)
+            db_session.add(Appointment(
+                patient=patient,
+                dentist=Dentist(staff=staff, license_number=f"LIC{i}.{count}"),
+                treatment=treatment,
+                datetime=start,
+                end_datetime=start + timedelta(minutes=30),
+                status=AppointmentStatus.SCHEDULED
+            ))
+        db_session.commit()
+        db_session.expunge_all()
+
+    def render_chart():
+        # Open the test's SAVEPOINT before counting, as BEGIN is not counted either
+        db_session.connection()
+        with count_queries(db_session) as statements:
+            patient = PatientManagement.get_patient_chart(db_session, patient_id)
+            rendered = [
+                (a.treatment.name, a.dentist.staff.user.full_name) for a in patient.appointments
+            ] + [t.name for t in patient.treatments]
+        db_session.expunge_all()
+        return len(statements), rendered
+
+    book(1)
+    few, _ = render_chart()
+    book(19)
+    many, rendered = render_chart()
+    assert few == many == 3
+    assert len(rendered) == 40
@@ -0,0 +1,114 @@
+"""
+Tests for the principal cache and the authentication dependencies.
+"""
+
+import time
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app.core.dependencies import get_current_user, require_permissions
+from app.core.settings import settings
+from app.models.users import Role
+from app.services.principal_cache import (
+    ALL_PERMISSIONS, Permission, PrincipalCache, compile_permissions, permission_mask, principal_cache
+)
+from factories import user_factory
+
+def access_token(user_id, jti, expires_in=3600):
+    return jwt.encode(
+        {"sub": str(user_id), "jti": jti, "exp": int(time.time()) + expires_in},
+        settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM
+    )
+
+def test_compile_permissions():
+    """Test that role permission JSON compiles into bitsets."""
+    assert compile_permissions(["appointments:read", "patients:write", "unknown"]) == (
+        Permission.APPOINTMENTS_READ | Permission.PATIENTS_WRITE
+    )
+    assert compile_permissions({"reports:read": True, "users:manage": False}) == Permission.REPORTS_READ
+    assert compile_permissions(["*"]) == ALL_PERMISSIONS
+    assert compile_permissions(None) == compile_permissions("appointments:read") == 0
+    with pytest.raises(ValueError, match="Unknown permission"):
+        permission_mask(["appointments:delete"])
+
+@pytest.mark.asyncio
+async def test_current_user_is_cached_per_token(async_db_session):
+    """Test that a resolved token is served without the database until it is revoked."""
+    role = Role(name="receptionist", permissions=["appointments:read", "appointments:write"])
+    user = user_factory(roles=[role])
+    async_db_session.add(user)
+    await async_db_session.commit()
+    token, other_token = access_token(user.id, "first"), access_token(user.id, "second")
+
+    principal = await get_current_user(token=token, db=async_db_session)
+    assert (principal.id, principal.roles) == (user.id, ("receptionist",))
+    assert principal.has(permission_mask(["appointments:read", "appointments:write"]))
+    assert not principal.has(Permission.REPORTS_READ)
+    # A hit never touches the session
+    assert await get_current_user(token=token, db=None) is principal
+    assert principal_cache.stats()['hits'] == 1 and principal_cache.stats()['misses'] == 1
+
+    check = require_permissions("reports:read")
+    with pytest.raises(HTTPException) as forbidden:
+        await check(principal)
+    assert forbidden.value.status_code == 403
+    assert await require_permissions("appointments:write")(principal) is principal
+
+    # Logging out rejects that token only
+    principal_cache.revoke_token("first", jwt.get_unverified_claims(token)["exp"])
+    with pytest.raises(HTTPException) as unauthorized:
+        await get_current_user(token=token, db=async_db_session)
+    assert unauthorized.value.status_code == 401
+    assert (await get_current_user(token=other_token, db=async_db_session)).id == user.id
+
+def test_committed_changes_invalidate_principals(db_session):
+    """Test that role and account changes apply once committed, and rolled back ones never."""
+    role = Role(name="dentist", permissions=["appointments:read"])
+    user = user_factory(roles=[role])
+    db_session.add(user)
+    db_session.commit()
+    resolve = lambda: principal_cache.resolve(db_session, "token", user.id)
+    assert resolve().permissions == Permission.APPOINTMENTS_READ
+
+    role.permissions = ["appointments:read", "reports:read"]
+    db_session.flush()
+    assert resolve().permissions == Permission.APPOINTMENTS_READ
+    db_session.rollback()
+    assert principal_cache.stats()['principals'] == 1
+
+    role.permissions = ["*"]
+    db_session.commit()
+    assert resolve().permissions == ALL_PERMISSIONS
+
+    user.roles = []
+    db_session.commit()
+    assert resolve().roles == ()
+
+    user.is_active = False
+    db_session.commit()
+    assert resolve() is None
+
+def test_entries_expire_and_are_evicted(db_session):
+    """Test the TTL, the token expiry bound and the LRU limit."""
+    users = [user_factory() for _ in range(3)]
+    db_session.add_all(users)
+    db_session.commit()
+
+    cache = PrincipalCache(ttl=0, max_entries=10)
+    cache.resolve(db_session, "token", users[0].id)
+    cache.resolve(db_session, "token", users[0].id)
+    assert cache.stats()['misses'] == 2
+
+    cache = PrincipalCache(ttl=60, max_entries=10)
+    cache.resolve(db_session, "expired", users[0].id, token_expires=time.time() - 1)
+    cache.resolve(db_session, "expired", users[0].id, token_expires=time.time() - 1)
+    assert cache.stats()['misses'] == 2
+
+    cache = PrincipalCache(ttl=60, max_entries=2)
+    for n, user in enumerate(users):
+        cache.resolve(db_session, f"token{n}", user.id)
+    assert cache.stats()['principals'] == 2
+    cache.resolve(db_session, "token2", users[2].id)
+    cache.resolve(db_session, "token0", users[0].id)
+    assert cache.stats() == {'hits': 1, 'misses': 4, 'principals': 2, 'revoked_tokens': 0}
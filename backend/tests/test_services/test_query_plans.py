@@ -0,0 +1,197 @@
+"""
+Query plan regression tests.
+
+Each case runs a service call against a seeded database, captures the SQL it
+sends, and asks the planner how it would run every statement touching a hot
+table. A full scan of a hot table means an index stopped serving the query.
+"""
+
+import re
+import pytest
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import event, insert, text
+from sqlalchemy.orm import Session
+
+from app.models.appointments import Appointment, AppointmentEvent, AppointmentEventType, AppointmentStatus
+from app.models.schedules import DentistSchedule
+from app.services.appointment_service import AppointmentSystem
+from app.services.patient_services import PatientManagement
+from app.services.treatment_service import TreatmentManagement
+from app.services.treatment_stats import backfill
+from app.services.utilization import load_utilization_data
+from factories import dentist_factory, patient_factory, treatment_factory
+
+HOT_TABLES = ("appointments", "appointment_events", "dentist_schedules", "treatment_daily_stats")
+
+FULL_SCAN = re.compile(r"^SCAN (%s)\b" % "|".join(HOT_TABLES))
+
+DAY = datetime(2030, 1, 7)
+
+@pytest.fixture(scope="module")
+def db_connection(db_engine):
+    """A transaction for the whole module, so the clinic below is seeded once; each test rolls back to it."""
+    with db_engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            yield connection
+        finally:
+            transaction.rollback()
+
+@pytest.fixture(scope="module")
+def clinic(db_connection):
+    """Twenty dentists with weekly schedules, finished appointments before DAY and active ones after."""
+    db_session = Session(bind=db_connection, join_transaction_mode="create_savepoint")
+    patients = [patient_factory() for _ in range(4)]
+    dentists = [dentist_factory() for _ in range(20)]
+    treatment = treatment_factory(name="Cleaning", price=80, category="Hygiene")
+    db_session.add_all(patients + dentists + [treatment])
+    db_session.flush()
+    db_session.add_all(
+        DentistSchedule(dentist_id=dentist.id, day_of_week=day, start_time=time(9), end_time=time(17))
+        for dentist in dentists
+        for day in ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+    )
+    # Like a live clinic: past appointments are finished, future ones active
+    past = [AppointmentStatus.COMPLETED, AppointmentStatus.COMPLETED, AppointmentStatus.CANCELLED, AppointmentStatus.NO_SHOW]
+    future = [AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED]
+    db_session.execute(insert(Appointment), [
+        {
+            "patient_id": patients[i % len(patients)].id,
+            "dentist_id": dentists[i % len(dentists)].id,
+            "treatment_id": treatment.id,
+            "datetime": DAY + timedelta(hours=i),
+            "end_datetime": DAY + timedelta(hours=i, minutes=30),
+            "status": (future if i >= 0 else past)[i % (len(future) if i >= 0 else len(past))]
+        }
+        for i in range(-1500, 1500)
+    ])
+    appointment_id = db_session.scalar(text("SELECT max(id) FROM appointments"))
+    db_session.execute(insert(AppointmentEvent), [
+        {"appointment_id": i, "event_type": AppointmentEventType.CREATED, "created_at": DAY}
+        for i in range(1, appointment_id + 1)
+    ])
+    db_session.commit()
+    db_session.execute(text("ANALYZE"))
+    db_session.commit()
+    seed = [d.id for d in dentists], [p.id for p in patients], treatment.id, appointment_id
+    db_session.close()
+    return seed
+
+@pytest.fixture
+def seeded_db(db_session, clinic):
+    return (db_session, *clinic)
+
+@contextmanager
+def captured_statements(db_session):
+    """Collect the (statement, parameters) pairs sent to the database."""
+    statements = []
+    engine = db_session.get_bind()
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+def plan_steps(db_session, statements):
+    """(plan step, statement) pairs of every statement touching a hot table."""
+    steps = []
+    for statement, parameters in statements:
+        if not any(re.search(rf"\b{table}\b", statement) for table in HOT_TABLES):
+            continue
+        plan = db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        steps.extend((detail, statement) for _, _, _, detail in plan)
+    return steps
+
+SERVICE_CALLS = {
+    "conflict check": lambda db, dentists, patients, treatment, appointment: AppointmentSystem.has_conflict(
+        db, dentists[0], DAY + timedelta(days=30, hours=10), treatment
+    ),
+    "overlap lookup": lambda db, dentists, patients, treatment, appointment: AppointmentSystem.find_overlapping_appointment(
+        db, dentists[0], DAY + timedelta(hours=10), DAY + timedelta(hours=11)
+    ),
+    "dentist schedule": lambda db, dentists, patients, treatment, appointment: AppointmentSystem.get_dentist_schedule(
+        db, dentists[1], DAY, DAY + timedelta(days=7)
+    ),
+    "dentist schedule page": lambda db, dentists, patients, treatment, appointment: AppointmentSystem.get_dentist_schedule_page(
+        db, dentists[1], DAY, DAY + timedelta(days=30), limit=5
+    ),
+    "schedule stream": lambda db, dentists, patients, treatment, appointment: list(AppointmentSystem.iter_dentist_schedule(
+        db, dentists[1], DAY, DAY + timedelta(days=7)
+    )),
+    "available slots": lambda db, dentists, patients, treatment, appointment: AppointmentSystem.find_available_slots(
+        db, dentists[:3], treatment, (DAY.date(), DAY.date() + timedelta(days=6))
+    ),
+    "appointment events": lambda db, dentists, patients, treatment, appointment: AppointmentSystem.get_appointment_events(
+        db, appointment
+    ),
+    "status change": lambda db, dentists, patients, treatment, appointment: AppointmentSystem.update_appointment_status(
+        db, appointment, AppointmentStatus.CANCELLED
+    ),
+    "dentist status sweep": lambda db, dentists, patients, treatment, appointment: AppointmentSystem.transition_statuses(
+        db, AppointmentStatus.CONFIRMED, dentist_id=dentists[2], before=DAY - timedelta(days=50)
+    ),
+    "status sweep": lambda db, dentists, patients, treatment, appointment: AppointmentSystem.transition_statuses(
+        db, AppointmentStatus.NO_SHOW, before=DAY - timedelta(days=60)
+    ),
+    "patient history": lambda db, dentists, patients, treatment, appointment: TreatmentManagement.get_patient_treatment_history(
+        db, patients[0], DAY - timedelta(days=30), DAY
+    ),
+    "patient export": lambda db, dentists, patients, treatment, appointment: list(TreatmentManagement.iter_treatment_history(
+        db, patient_id=patients[1]
+    )),
+    "dentist export": lambda db, dentists, patients, treatment, appointment: list(TreatmentManagement.iter_treatment_history(
+        db, dentist_id=dentists[0], start_date=DAY
+    )),
+    "clinic export": lambda db, dentists, patients, treatment, appointment: list(TreatmentManagement.iter_treatment_history(
+        db, start_date=DAY, end_date=DAY + timedelta(days=7)
+    )),
+    "treatment statistics": lambda db, dentists, patients, treatment, appointment: TreatmentManagement.calculate_treatment_statistics(
+        db, DAY, DAY + timedelta(days=30)
+    ),
+    "statistics backfill": lambda db, dentists, patients, treatment, appointment: backfill(
+        db, date(2030, 1, 1), date(2030, 1, 31)
+    ),
+    "utilization report": lambda db, dentists, patients, treatment, appointment: load_utilization_data(
+        db, date(2030, 1, 1), date(2030, 1, 31), dentists[:2]
+    ),
+    "patient chart": lambda db, dentists, patients, treatment, appointment: PatientManagement.get_patient_chart(
+        db, patients[2]
+    ),
+}
+
+# Index each call is designed around; the partial index must not lose to the full ones
+EXPECTED_INDEXES = {
+    "conflict check": "ix_appointments_dentist_active",
+    "overlap lookup": "ix_appointments_dentist_active",
+    "dentist schedule": "ix_appointments_dentist_active",
+    "dentist schedule page": "ix_appointments_dentist_active",
+    "schedule stream": "ix_appointments_dentist_active",
+    "available slots": "ix_appointments_dentist_active",
+    "appointment events": "ix_appointment_events_appointment_id_id",
+    "status sweep": "ix_appointments_status_datetime",
+    "patient history": "ix_appointments_patient_status_datetime",
+    "patient export": "ix_appointments_patient_status_datetime",
+    "dentist export": "ix_appointments_dentist_datetime",
+    "clinic export": "ix_appointments_status_datetime",
+    "statistics backfill": "ix_appointments_status_datetime",
+    "utilization report": "ix_appointments_dentist_datetime",
+    "patient chart": "ix_appointments_patient_status_datetime",
+}
+
+@pytest.mark.parametrize("name", SERVICE_CALLS)
+def test_service_query_uses_indexes(seeded_db, name):
+    """Test that no statement of a service call scans a hot table."""
+    db_session, *seed = seeded_db
+    with captured_statements(db_session) as statements:
+        SERVICE_CALLS[name](db_session, *seed)
+    steps = plan_steps(db_session, statements)
+    assert steps, "the call no longer queries a hot table"
+    assert [(detail, statement) for detail, statement in steps if FULL_SCAN.match(detail)] == []
+    if name in EXPECTED_INDEXES:
+        assert any(f"INDEX {EXPECTED_INDEXES[name]} " in detail for detail, _ in steps)
+
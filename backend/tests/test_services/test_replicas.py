@@ -0,0 +1,81 @@
+"""
+Tests for read replica routing, on a pair of SQLite files.
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+from app.db.replicas import AsyncReplicaRouter, ReplicaRouter
+
+@pytest.fixture
+def database_pair(tmp_path):
+    """Primary and replica SQLite files holding a different marker row."""
+    engines = []
+    for name in ("primary", "replica"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE marker (name TEXT)"))
+            conn.execute(text("INSERT INTO marker VALUES (:name)"), {"name": name})
+        engines.append(engine)
+    yield engines
+    for engine in engines:
+        engine.dispose()
+
+def read_marker(engine):
+    with Session(engine) as db:
+        return db.scalar(text("SELECT name FROM marker"))
+
+def test_reads_go_to_healthy_replica(database_pair):
+    """Test that reads use the replica and fall back once it lags too far."""
+    primary, replica = database_pair
+    lag = {"seconds": 0.0}
+    router = ReplicaRouter(primary, [replica], max_lag=5, check_interval=0,
+                           lag_probe=lambda conn: lag["seconds"])
+    assert read_marker(router.read_engine()) == "replica"
+    assert router.status()[0]["usable"] is True
+
+    lag["seconds"] = 30.0
+    assert read_marker(router.read_engine()) == "primary"
+    assert router.status()[0] == {'url': str(replica.url), 'usable': False, 'lag_seconds': 30.0}
+
+def test_unreachable_replica_falls_back(database_pair, tmp_path):
+    """Test that a replica that cannot be connected to is skipped until its next check."""
+    primary, _ = database_pair
+    down = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    router = ReplicaRouter(primary, [down], max_lag=5, check_interval=60)
+    assert router.read_engine() is primary
+    assert router.status()[0]["usable"] is False
+    assert router.read_engine() is primary
+
+def test_health_is_checked_once_per_interval(database_pair):
+    """Test that a fresh health check is reused instead of probing every read."""
+    primary, replica = database_pair
+    probes = []
+    router = ReplicaRouter(primary, [replica], max_lag=5, check_interval=60,
+                           lag_probe=lambda conn: probes.append(1) or 0.0)
+    for _ in range(3):
+        assert router.read_engine() is replica
+    assert len(probes) == 1
+
+def test_no_replicas_reads_primary(database_pair):
+    """Test that without replicas every read uses the primary."""
+    primary, _ = database_pair
+    assert ReplicaRouter(primary, [], max_lag=5, check_interval=0).read_engine() is primary
+
+@pytest.mark.asyncio
+async def test_async_router(database_pair, tmp_path):
+    """Test routing of async engines, falling back past a replica that is down."""
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    down = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    try:
+        router = AsyncReplicaRouter(primary, [down, replica], max_lag=5, check_interval=0)
+        assert await router.read_engine() is replica
+        assert await router.read_engine() is replica
+        assert [status["usable"] for status in router.status()] == [False, True]
+        assert await AsyncReplicaRouter(primary, [down], max_lag=5, check_interval=0).read_engine() is primary
+    finally:
+        for engine in (primary, replica, down):
+            await engine.dispose()
@@ -0,0 +1,125 @@
+"""
+Tests for the treatment management service.
+"""
+
+import asyncio
+import threading
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.appointments import Appointment, AppointmentStatus
+from app.models.treatments import Treatment, TreatmentDailyStats
+from app.services.appointment_service import AppointmentSystem, AsyncAppointmentSystem
+from app.services.treatment_catalog import DEFAULT_MAX_STALENESS, TreatmentCatalog, treatment_catalog
+from app.services.treatment_service import AsyncTreatmentManagement, TreatmentManagement
+from app.services.treatment_stats import backfill
+
+@pytest.mark.asyncio
+async def test_async_treatment_statistics(async_db_session, async_sample_data):
+    """Test that only appointments completed in the range are counted."""
+    patient, dentist, treatment = async_sample_data
+    start = datetime(2030, 1, 7, 9, 0)
+    appointments = [
+        Appointment(
+            patient_id=patient.id,
+            dentist_id=dentist.id,
+            treatment_id=treatment.id,
+            datetime=start + timedelta(days=offset),
+            end_datetime=start + timedelta(days=offset, minutes=30),
+            status=AppointmentStatus.SCHEDULED
+        )
+        for offset in (0, 0.5, 1, 3)
+    ]
+    async_db_session.add_all(appointments)
+    await async_db_session.commit()
+    ids = [a.id for a in appointments]
+
+    await AsyncAppointmentSystem.transition_statuses(
+        async_db_session, AppointmentStatus.COMPLETED, appointment_ids=[ids[0], ids[1], ids[3]]
+    )
+    await AsyncAppointmentSystem.update_appointment_status(async_db_session, ids[2], AppointmentStatus.NO_SHOW)
+
+    stats = await AsyncTreatmentManagement.calculate_treatment_statistics(
+        async_db_session, start, start + timedelta(days=1)
+    )
+
+    assert stats['total_treatments'] == 2
+    assert stats['total_revenue'] == 100.0
+    assert stats['treatment_counts'] == {'Regular Checkup': {'count': 2, 'revenue': 100.0}}
+
+def test_treatment_rollup_tracks_completion_and_backfill(db_session, sample_patient, sample_dentist, sample_treatment):
+    """Test that leaving COMPLETED decrements the rollup and that a backfill rebuilds it."""
+    start = datetime(2030, 1, 7, 9, 0)
+    for hour in range(3):
+        db_session.add(Appointment(
+            patient_id=sample_patient.id,
+            dentist_id=sample_dentist.id,
+            treatment_id=sample_treatment.id,
+            datetime=start + timedelta(hours=hour),
+            end_datetime=start + timedelta(hours=hour, minutes=30),
+            status=AppointmentStatus.SCHEDULED
+        ))
+    db_session.commit()
+
+    completed = AppointmentSystem.transition_statuses(
+        db_session, AppointmentStatus.COMPLETED, dentist_id=sample_dentist.id
+    )
+    AppointmentSystem.update_appointment_status(db_session, completed[0], AppointmentStatus.CANCELLED)
+    stats = TreatmentManagement.calculate_treatment_statistics(db_session, start, start)
+    assert (stats['total_treatments'], stats['total_revenue']) == (2, 100.0)
+
+    rollup = lambda: [(r.day, r.count, r.revenue) for r in db_session.query(TreatmentDailyStats)]
+    incremental = rollup()
+    db_session.query(TreatmentDailyStats).delete()
+    backfill(db_session, start.date(), start.date())
+    assert rollup() == incremental == [(start.date(), 2, 100.0)]
+
+    # Reversals subtract the price recorded at completion, not the current one
+    TreatmentManagement.update_treatment(db_session, sample_treatment.id, price=80.0)
+    AppointmentSystem.update_appointment_status(db_session, completed[1], AppointmentStatus.NO_SHOW)
+    assert rollup() == [(start.date(), 1, 50.0)]
+    backfill(db_session, start.date(), start.date())
+    assert rollup() == [(start.date(), 1, 50.0)]
+
+def test_treatment_catalog_cache(db_session, sample_treatment):
+    """Test that lookups are served from memory and refreshed when the version moves."""
+    treatment_catalog.clear()
+    assert treatment_catalog.get(db_session, sample_treatment.id).duration_minutes == 30
+    assert [t.name for t in TreatmentManagement.get_treatments_by_category(db_session, "Examination")] == ["Regular Checkup"]
+    assert treatment_catalog.stats()['hits'] == 1 and treatment_catalog.stats()['misses'] == 1
+
+    # Changes through the service are visible to this worker at once
+    TreatmentManagement.update_treatment(db_session, sample_treatment.id, duration_minutes=45)
+    cleaning = TreatmentManagement.create_treatment(db_session, "Cleaning", "", 60, 80.0, "Hygiene")
+    assert treatment_catalog.get(db_session, sample_treatment.id).duration_minutes == 45
+    assert treatment_catalog.get(db_session, cleaning.id).name == "Cleaning"
+
+    # Other workers' changes show once the staleness window has passed
+    db_session.get(Treatment, cleaning.id).price = 90.0
+    db_session.commit()
+    assert treatment_catalog.get(db_session, cleaning.id).price == 80.0
+    treatment_catalog.max_staleness = 0
+    try:
+        assert treatment_catalog.get(db_session, cleaning.id).price == 90.0
+    finally:
+        treatment_catalog.max_staleness = DEFAULT_MAX_STALENESS
+    assert treatment_catalog.get(db_session, 999) is None
+
+def test_concurrent_async_catalog_misses(async_db_engine):
+    """Test that cold-cache lookups on separate async sessions run concurrently without deadlocking."""
+    catalog = TreatmentCatalog()
+
+    async def lookups():
+        async with AsyncSession(async_db_engine) as first, AsyncSession(async_db_engine) as second:
+            return await asyncio.gather(
+                catalog.aget(first, 999), catalog.aget(second, 999)
+            )
+
+    # Run on a loop of its own so that a blocked loop fails the test instead of hanging it
+    results = []
+    worker = threading.Thread(target=lambda: results.append(asyncio.run(lookups())), daemon=True)
+    worker.start()
+    worker.join(timeout=10)
+    assert not worker.is_alive(), "concurrent catalog loads blocked the event loop"
+    assert results == [[None, None]]
+    assert catalog.stats()['misses'] == 4
@@ -0,0 +1,59 @@
+"""
+Tests for the dentist utilization reports.
+"""
+
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import insert
+from app.models.appointments import Appointment, AppointmentStatus
+from app.models.schedules import DentistSchedule
+from app.services.utilization import dentist_utilization
+
+def test_dentist_utilization_by_day_and_week(db_session, sample_patient, sample_dentist, sample_treatment):
+    """Test booked, no-show and idle minutes and idle gaps against a morning schedule."""
+    monday = date(2030, 1, 7)
+    db_session.add_all([
+        DentistSchedule(dentist_id=sample_dentist.id, day_of_week="Monday", start_time=time(8), end_time=time(12)),
+        DentistSchedule(dentist_id=sample_dentist.id, day_of_week="tue", start_time=time(8), end_time=time(10)),
+    ])
+    # Neither counted nor offered by find_available_slots
+    db_session.execute(insert(DentistSchedule).values(
+        dentist_id=sample_dentist.id, day_of_week="Wednesday", start_time=time(8), end_time=time(12), is_active=None
+    ))
+    for start, minutes, status in [
+        (time(8, 0), 30, AppointmentStatus.COMPLETED),
+        (time(9, 0), 30, AppointmentStatus.NO_SHOW),
+        (time(10, 0), 60, AppointmentStatus.SCHEDULED),
+        (time(11, 0), 60, AppointmentStatus.CANCELLED),
+        (time(12, 30), 30, AppointmentStatus.CONFIRMED),
+    ]:
+        begin = datetime.combine(monday, start)
+        db_session.add(Appointment(
+            patient_id=sample_patient.id,
+            dentist_id=sample_dentist.id,
+            treatment_id=sample_treatment.id,
+            datetime=begin,
+            end_datetime=begin + timedelta(minutes=minutes),
+            status=status
+        ))
+    db_session.commit()
+
+    days = dentist_utilization(db_session, monday, monday + timedelta(days=1))
+    assert days == [
+        {
+            'dentist_id': sample_dentist.id, 'period_start': monday,
+            'available_minutes': 240, 'booked_minutes': 120, 'no_show_minutes': 30,
+            'idle_minutes': 120, 'idle_gaps': 3, 'utilization': 0.375
+        },
+        {
+            'dentist_id': sample_dentist.id, 'period_start': monday + timedelta(days=1),
+            'available_minutes': 120, 'booked_minutes': 0, 'no_show_minutes': 0,
+            'idle_minutes': 120, 'idle_gaps': 1, 'utilization': 0.0
+        },
+    ]
+
+    # Sunday falls in the previous week
+    weeks = dentist_utilization(db_session, monday - timedelta(days=1), monday + timedelta(days=6), period="week")
+    assert [(w['period_start'], w['available_minutes'], w['idle_gaps']) for w in weeks] == [
+        (monday - timedelta(days=7), 0, 0),
+        (monday, 360, 4),
+    ]